@@ -0,0 +1,215 @@
+"""
+Django management command для видалення старих показників сенсорів за рівнями зберігання
+Використання: python manage.py prune_sensor_data [--raw-days 14] [--hourly-days 365] [--dry-run] [--vacuum]
+
+Сирі показники (SensorData) зберігаються SENSOR_RETENTION_RAW_DAYS днів,
+погодинні агрегати - SENSOR_RETENTION_HOURLY_DAYS, добові -
+SENSOR_RETENTION_DAILY_DAYS (0 - назавжди). Графіки та статистика за
+довші періоди будуються з агрегатів, а стан рослини - з SensorLatestReading,
+тому старі сирі показники не потрібні.
+
+Місячні таблиці показників (SENSOR_PARTITIONING), що повністю старші за
+межу, видаляються через DROP TABLE; решта - частинами, як sensor_data.
+"""
+
+import os
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from apps.sensors import partitions
+from apps.sensors.models import SensorRollup
+
+
+class Command(BaseCommand):
+    help = 'Видалити старі показники сенсорів та агрегати за рівнями зберігання'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--raw-days',
+            type=int,
+            default=settings.SENSOR_RETENTION_RAW_DAYS,
+            help='Скільки днів зберігати сирі показники (0 - не видаляти; не менше SENSOR_RETENTION_RAW_DAYS)',
+        )
+        parser.add_argument(
+            '--hourly-days',
+            type=int,
+            default=settings.SENSOR_RETENTION_HOURLY_DAYS,
+            help='Скільки днів зберігати погодинні агрегати (0 - не видаляти)',
+        )
+        parser.add_argument(
+            '--daily-days',
+            type=int,
+            default=settings.SENSOR_RETENTION_DAILY_DAYS,
+            help='Скільки днів зберігати добові агрегати (0 - не видаляти)',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Рядків на одну транзакцію видалення',
+        )
+        parser.add_argument(
+            '--pause',
+            type=int,
+            default=50,
+            help='Пауза між транзакціями (мс), щоб запис показників не чекав блокування',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Тільки порахувати, що буде видалено',
+        )
+        parser.add_argument(
+            '--vacuum',
+            action='store_true',
+            help='Після видалення виконати VACUUM, щоб зменшити файл БД (блокує БД на час виконання)',
+        )
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be positive')
+
+        # Години після межі SENSOR_RETENTION_RAW_DAYS перераховуються з сирих
+        # показників (SensorRollupService.raw_since) - видалені раніше рядки
+        # зникли б з агрегатів при першому запізнілому показнику
+        raw_setting = settings.SENSOR_RETENTION_RAW_DAYS
+        if options['raw_days'] > 0 and (raw_setting <= 0 or options['raw_days'] < raw_setting):
+            raise CommandError(
+                f'--raw-days must be 0 or at least SENSOR_RETENTION_RAW_DAYS ({raw_setting}); '
+                'change the setting to keep less raw data'
+            )
+
+        now = timezone.now()
+        raw_cutoff = self.cutoff(now, options['raw_days'])
+        hourly_cutoff = self.cutoff(now, options['hourly_days'])
+        daily_cutoff = self.cutoff(now, options['daily_days'])
+
+        # Без агрегатів видалення сирих показників втратило б історію назавжди
+        if (
+            raw_cutoff
+            and not SensorRollup.objects.exists()
+            and any(queryset.exists() for queryset in partitions.readings(end=raw_cutoff))
+        ):
+            raise CommandError(
+                'No sensor rollups found - run "python manage.py rebuild_sensor_rollups" first'
+            )
+
+        free_before, size_before = self.database_space()
+        self.pause = options['pause'] / 1000
+        self.chunk_size = options['chunk_size']
+        dry_run = options['dry_run']
+
+        results = []
+
+        if raw_cutoff:
+            deleted = self.drop_partitions(raw_cutoff, dry_run)
+            expired = {partitions.table_name(key) for key in partitions.expired_keys(raw_cutoff)}
+            for queryset in partitions.readings(end=raw_cutoff):
+                # У dry-run прострочені таблиці вже пораховані drop_partitions
+                if queryset.model._meta.db_table not in expired:
+                    deleted += self.prune_per_plant(queryset, dry_run)
+            results.append(('Сирі показники', raw_cutoff, deleted))
+
+        for label, cutoff, resolution in (
+            ('Погодинні агрегати', hourly_cutoff, SensorRollup.RESOLUTION_HOUR),
+            ('Добові агрегати', daily_cutoff, SensorRollup.RESOLUTION_DAY),
+        ):
+            if cutoff:
+                queryset = SensorRollup.objects.filter(resolution=resolution, bucket_start__lt=cutoff)
+                results.append((label, cutoff, self.prune(queryset, dry_run)))
+
+        if options['vacuum'] and not dry_run:
+            self.stdout.write('Виконується VACUUM...')
+            with connection.cursor() as cursor:
+                cursor.execute('VACUUM')
+
+        free_after, size_after = self.database_space()
+
+        prefix = '[dry-run] ' if dry_run else ''
+        for label, cutoff, deleted in results:
+            self.stdout.write(f'  {prefix}{label} до {timezone.localtime(cutoff):%Y-%m-%d %H:%M}: {deleted} рядків')
+
+        if not results:
+            self.stdout.write(self.style.WARNING('Усі рівні зберігання вимкнені - нічого не видалено'))
+            return
+
+        if dry_run:
+            self.stdout.write(self.style.SUCCESS(f' Буде видалено рядків: {sum(row[2] for row in results)}'))
+            return
+
+        reclaimed = (free_after - free_before) + (size_before - size_after)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f' Видалено рядків: {sum(row[2] for row in results)}\n'
+                f'  Звільнено: {reclaimed / (1024 * 1024):.2f} MB\n'
+                f'  Розмір файлу БД: {size_before / (1024 * 1024):.2f} MB -> {size_after / (1024 * 1024):.2f} MB'
+                + ('' if options['vacuum'] else '\n  (вільні сторінки використовуються повторно; --vacuum зменшить файл)')
+            )
+        )
+
+    @staticmethod
+    def cutoff(now, days):
+        return now - timedelta(days=days) if days > 0 else None
+
+    def drop_partitions(self, cutoff, dry_run):
+        """Місячні таблиці, що закінчились до cutoff, видаляються цілком"""
+        deleted = 0
+        for key in partitions.expired_keys(cutoff):
+            count = partitions.partition_model(key).objects.count()
+            if not dry_run:
+                with transaction.atomic():
+                    partitions.drop_partition(key)
+                self.stdout.write(f'  Видалено таблицю {partitions.table_name(key)} ({count} рядків)')
+            deleted += count
+        return deleted
+
+    def prune_per_plant(self, queryset, dry_run):
+        """
+        Сирі показники видаляються по рослинах - так запит іде по
+        індексу (user_plant, -recorded_at), а не скануванням таблиці
+        """
+        deleted = 0
+        plant_ids = queryset.order_by().values_list('user_plant_id', flat=True).distinct()
+        for plant_id in list(plant_ids):
+            deleted += self.prune(queryset.filter(user_plant_id=plant_id), dry_run)
+        return deleted
+
+    def prune(self, queryset, dry_run):
+        """
+        Видалення частинами по chunk_size рядків у окремих транзакціях:
+        блокування запису SQLite утримується лише на час однієї частини
+        """
+        if dry_run:
+            return queryset.count()
+
+        deleted = 0
+        model = queryset.model
+        while True:
+            ids = list(queryset.order_by().values_list('id', flat=True)[:self.chunk_size])
+            if not ids:
+                return deleted
+
+            with transaction.atomic():
+                count, _ = model.objects.filter(id__in=ids).delete()
+            deleted += count
+
+            if self.pause:
+                time.sleep(self.pause)
+
+    @staticmethod
+    def database_space():
+        """(байти у вільних сторінках SQLite, розмір файлу БД)"""
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA page_size')
+            page_size = cursor.fetchone()[0]
+            cursor.execute('PRAGMA freelist_count')
+            free_pages = cursor.fetchone()[0]
+
+        db_path = settings.DATABASES['default']['NAME']
+        size = os.path.getsize(db_path) if os.path.exists(db_path) else 0
+        return free_pages * page_size, size
@@ -3,6 +3,7 @@ from datetime import date
 from django.utils.translation import gettext_lazy as _
 from .models import UserPlant
 from apps.plant_types.serializers import PlantTypeSerializer
+from apps.sensors.serializers import SensorLatestReadingSerializer
 
 
 class UserPlantSerializer(serializers.ModelSerializer):
@@ -11,6 +12,8 @@ class UserPlantSerializer(serializers.ModelSerializer):
     status_display = serializers.CharField(source='get_status_display', read_only=True)
     days_until_watering = serializers.SerializerMethodField()
     days_until_fertilizing = serializers.SerializerMethodField()
+    # ДОДАНО: останній показник сенсора (null, якщо показників ще немає)
+    latest_reading = SensorLatestReadingSerializer(read_only=True)
     
     class Meta:
         model = UserPlant
@@ -21,7 +24,7 @@ class UserPlantSerializer(serializers.ModelSerializer):
             'next_watering_date', 'next_fertilizing_date', 'next_repotting_date',
             'status', 'status_display', 'has_sensor', 'notes',
             'days_until_watering', 'days_until_fertilizing',
-            'created_at', 'updated_at'
+            'latest_reading', 'created_at', 'updated_at'
         ]
         read_only_fields = [
             'id', 'next_watering_date', 'next_fertilizing_date',
@@ -20,10 +20,25 @@ class PlantStatusService:
         
         return PlantStatusService._calculate_status_basic(watering_overdue)
     
+    @staticmethod
+    def get_latest_reading(plant):
+        """
+        Останній показник сенсора (SensorLatestReading) або None
+        
+        Знімок кешується на об'єкті рослини, тому статус і графік поливу
+        в одному complete_task читають його одним запитом.
+        """
+        from apps.sensors.models import SensorLatestReading
+        
+        try:
+            return plant.latest_reading
+        except SensorLatestReading.DoesNotExist:
+            return None
+    
     @staticmethod
     def _calculate_status_with_sensor(plant, watering_overdue):
         """Розрахунок статусу з урахуванням даних сенсорів"""
-        latest_sensor = plant.sensor_data.order_by('-recorded_at').first()
+        latest_sensor = PlantStatusService.get_latest_reading(plant)
         
         if not latest_sensor:
             return PlantStatusService._calculate_status_basic(watering_overdue)
@@ -81,7 +96,7 @@ class WateringScheduleService:
         Розрахунок корекції графіку на основі даних сенсорів
         Returns: int (днів для додавання/віднімання)
         """
-        latest_sensor = plant.sensor_data.order_by('-recorded_at').first()
+        latest_sensor = PlantStatusService.get_latest_reading(plant)
         
         if not latest_sensor:
             return 0
@@ -19,7 +19,7 @@ class UserPlantViewSet(mixins.CreateModelMixin,
     def get_queryset(self):
         return UserPlant.objects.filter(
             user=self.request.user
-        ).select_related('plant_type')
+        ).select_related('plant_type', 'latest_reading')
     
     def get_serializer_class(self):
         if self.action == 'create':
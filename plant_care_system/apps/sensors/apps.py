@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class SensorsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.sensors"
+
+    def ready(self):
+        from django.db.models.signals import pre_delete
+        from apps.plants.models import UserPlant
+        from .partitions import delete_plant_readings
+
+        pre_delete.connect(delete_plant_readings, sender=UserPlant, dispatch_uid='sensors_delete_plant_readings')
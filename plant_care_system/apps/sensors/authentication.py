@@ -0,0 +1,110 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework import authentication, exceptions
+
+
+class DeviceUser:
+    """
+    request.user для запитів з API ключем пристрою
+
+    Містить тільки те, що потрібно для ingest (власник, Premium статус,
+    дозволені рослини), і береться з кешу - без запиту до таблиці users.
+    """
+
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, device_id, user_id, plant_ids, is_premium_active):
+        self.device_id = device_id
+        self.id = self.pk = user_id
+        self.plant_ids = plant_ids
+        self.is_premium_active = is_premium_active
+
+    def __str__(self):
+        return f"device {self.device_id} (user {self.id})"
+
+
+def device_cache_key(key_hash):
+    return f'sensor-device:{key_hash}'
+
+
+def get_device_user(raw_key):
+    """
+    API ключ -> DeviceUser або None, якщо ключ невідомий чи вимкнений
+
+    Результат кешується на SENSOR_DEVICE_CACHE_TTL секунд, тому зміни
+    Premium статусу чи списку рослин діють не пізніше ніж через TTL.
+    """
+    from apps.sensors.models import SensorDevice
+
+    key_hash = SensorDevice.hash_key(raw_key)
+    cache_key = device_cache_key(key_hash)
+
+    device_user = cache.get(cache_key)
+    if device_user is not None:
+        return device_user
+
+    device = SensorDevice.objects.select_related('user').filter(
+        key_hash=key_hash,
+        is_active=True,
+        user__is_active=True
+    ).first()
+
+    if device is None:
+        return None
+
+    device_user = DeviceUser(
+        device.id,
+        device.user_id,
+        frozenset(device.plants.values_list('id', flat=True)),
+        device.user.is_premium_active
+    )
+    cache.set(cache_key, device_user, settings.SENSOR_DEVICE_CACHE_TTL)
+
+    # last_seen_at оновлюється раз на TTL, а не на кожен запит
+    SensorDevice.objects.filter(pk=device.pk).update(last_seen_at=timezone.now())
+
+    return device_user
+
+
+def invalidate_device(device):
+    """
+    Скинути кеш авторизації пристрою в поточному процесі
+
+    Кеш локальний (LocMemCache), тож інші процеси бачать зміну
+    не пізніше ніж через SENSOR_DEVICE_CACHE_TTL.
+    """
+    cache.delete(device_cache_key(device.key_hash))
+
+
+class DeviceKeyAuthentication(authentication.BaseAuthentication):
+    """
+    Авторизація пристрою: заголовок "Authorization: Device <api_key>"
+    """
+
+    keyword = 'Device'
+
+    def authenticate(self, request):
+        header = authentication.get_authorization_header(request).split()
+
+        if not header or header[0].lower() != self.keyword.lower().encode():
+            return None
+
+        if len(header) != 2:
+            raise exceptions.AuthenticationFailed(_('Invalid device key header.'))
+
+        try:
+            raw_key = header[1].decode('ascii')
+        except UnicodeError:
+            raise exceptions.AuthenticationFailed(_('Invalid device key header.'))
+
+        device_user = get_device_user(raw_key)
+        if device_user is None:
+            raise exceptions.AuthenticationFailed(_('Invalid or inactive device key.'))
+
+        return device_user, raw_key
+
+    def authenticate_header(self, request):
+        return self.keyword
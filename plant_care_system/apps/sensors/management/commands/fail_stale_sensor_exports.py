@@ -0,0 +1,21 @@
+"""
+Django management command для позначення застарілих фонових експортів
+Використання: python manage.py fail_stale_sensor_exports
+
+Експорт формується в потоці процесу веб-сервера, тож перезапуск обриває
+його без сліду. Команда (наприклад, з cron) позначає як failed усі
+експорти, що не завершились за SENSOR_EXPORT_TIMEOUT, - користувач бачить
+помилку і може замовити експорт знову.
+"""
+
+from django.core.management.base import BaseCommand
+
+from apps.sensors.services import SensorExportService
+
+
+class Command(BaseCommand):
+    help = 'Позначити як failed експорти показників, що не завершились за SENSOR_EXPORT_TIMEOUT'
+
+    def handle(self, *args, **options):
+        count = SensorExportService.fail_stale()
+        self.stdout.write(self.style.SUCCESS(f' Позначено застарілих експортів: {count}'))
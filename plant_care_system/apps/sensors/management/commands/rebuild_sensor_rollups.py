@@ -0,0 +1,64 @@
+"""
+Django management command для перебудови погодинних/добових агрегатів показників
+Використання: python manage.py rebuild_sensor_rollups [--plant 1 --plant 2] [--since 2024-12-01]
+
+Потрібна після міграції на існуючій базі чи імпорту показників напряму
+в БД - звичайний запис оновлює агрегати сам. Перебудовуються тільки доби
+в межах SENSOR_RETENTION_RAW_DAYS: старші сирі показники вже видалені
+prune_sensor_data, і їх агрегати лишаються без змін.
+"""
+
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from apps.sensors import partitions
+from apps.sensors.services import SensorRollupService
+
+
+class Command(BaseCommand):
+    help = 'Перебудувати агрегати SensorRollup з сирих показників сенсорів'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--plant',
+            type=int,
+            action='append',
+            dest='plants',
+            help='ID рослини (можна вказати кілька разів; за замовчуванням - усі)',
+        )
+        parser.add_argument(
+            '--since',
+            type=str,
+            help='Перебудувати тільки з цієї дати (YYYY-MM-DD, місцевий час; не раніше межі зберігання сирих показників)',
+        )
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            try:
+                since = timezone.make_aware(datetime.strptime(options['since'], '%Y-%m-%d'))
+            except ValueError:
+                raise CommandError('--since must be a date in YYYY-MM-DD format')
+
+        plant_ids = options['plants']
+        if not plant_ids:
+            plant_ids = sorted({
+                plant_id
+                for queryset in partitions.readings()
+                for plant_id in queryset.order_by().values_list('user_plant_id', flat=True).distinct()
+            })
+
+        total_hours = total_days = 0
+        for plant_id in plant_ids:
+            hours, days = SensorRollupService.rebuild(plant_id, since)
+            total_hours += hours
+            total_days += days
+            self.stdout.write(f'  Рослина {plant_id}: {hours} годинних, {days} добових агрегатів')
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f' Агрегати перебудовано: {total_hours} годинних, {total_days} добових'
+            )
+        )
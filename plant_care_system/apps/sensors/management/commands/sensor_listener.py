@@ -0,0 +1,462 @@
+"""
+Django management command: локальний TCP/UDP приймач показників без HTTP
+Використання: python manage.py sensor_listener [--tcp 127.0.0.1:9300] [--udp 127.0.0.1:9300]
+
+Протокол - рядки, як у Arduino, з авторизацією API ключем пристрою
+(/api/sensor-devices/) або JWT access токеном (/api/auth/login/):
+
+    AUTH <api_key або access_token>
+    DATA,<plant_id>,<temp>,<humidity>,<light>[,<reading_id>[,<recorded_at>]]
+    DATA,...
+
+TCP: AUTH один раз на з'єднання, сервер відповідає "OK" або "ERR <причина>";
+на рядки DATA відповіді немає. Якщо токен закінчився або ключ вимкнено,
+сервер надсилає "ERR <причина>" і чекає новий AUTH.
+UDP: кожна датаграма починається з рядка AUTH, відповідей немає.
+
+Показники накопичуються в пам'яті і зберігаються bulk_create кожні
+--flush-interval мс або коли назбиралось --flush-rows рядків.
+"""
+
+import signal
+import socketserver
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, close_old_connections, connection, transaction
+
+
+def parse_address(value):
+    """'127.0.0.1:9300' -> ('127.0.0.1', 9300)"""
+    host, _, port = value.rpartition(':')
+    try:
+        return host or '127.0.0.1', int(port)
+    except ValueError:
+        raise CommandError(f'Invalid address "{value}", expected HOST:PORT')
+
+
+class SessionCache:
+    """
+    Перевірені токени: токен -> (user_id, id рослин користувача)
+
+    Підпис JWT перевіряється один раз, Premium статус і рослини
+    перечитуються з БД не частіше ніж раз на ttl секунд.
+    """
+
+    MAX_SIZE = 1000
+
+    def __init__(self, ttl=60):
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.sessions = {}
+
+    def authenticate(self, raw_token):
+        """Returns: (user_id, plant_ids); Raises: ValueError з причиною"""
+        from apps.sensors.authentication import get_device_user
+        from apps.sensors.models import SensorDevice
+
+        if raw_token.startswith(SensorDevice.KEY_PREFIX):
+            # Ключ пристрою кешується в get_device_user і не закінчується
+            device_user = get_device_user(raw_token)
+            if device_user is None:
+                raise ValueError('invalid device key')
+            if not device_user.is_premium_active:
+                raise ValueError('premium required')
+            return device_user.id, device_user.plant_ids
+
+        now = time.time()
+
+        with self.lock:
+            session = self.sessions.get(raw_token)
+        if session and session['checked_at'] + self.ttl > now and session['expires_at'] > now:
+            return session['user_id'], session['plant_ids']
+
+        from rest_framework_simplejwt.exceptions import TokenError
+        from rest_framework_simplejwt.settings import api_settings
+        from rest_framework_simplejwt.tokens import AccessToken
+        from apps.plants.models import UserPlant
+        from apps.users.models import User
+
+        try:
+            token = AccessToken(raw_token)
+        except TokenError:
+            raise ValueError('invalid or expired token')
+
+        try:
+            user = User.objects.get(id=token[api_settings.USER_ID_CLAIM], is_active=True)
+        except (KeyError, User.DoesNotExist):
+            raise ValueError('user not found')
+
+        if not user.is_premium_active:
+            raise ValueError('premium required')
+
+        session = {
+            'user_id': user.id,
+            'plant_ids': frozenset(UserPlant.objects.filter(user=user).values_list('id', flat=True)),
+            'expires_at': token['exp'],
+            'checked_at': now,
+        }
+
+        with self.lock:
+            if len(self.sessions) >= self.MAX_SIZE:
+                self.sessions.clear()
+            self.sessions[raw_token] = session
+
+        return session['user_id'], session['plant_ids']
+
+
+class ReadingBuffer:
+    """
+    Буфер показників у пам'яті з потоком, що зберігає їх bulk_create
+
+    Якщо БД недоступна, показники лишаються в буфері до max_rows,
+    надлишок відкидається (рахується в dropped). Повтори з тим самим
+    reading_id відсікає ignore_conflicts без додаткових запитів.
+    Показники рослин, видалених поки сесія була в кеші, порушують FK
+    при COMMIT - їх відкидає drop_orphaned, а не повторний flush.
+    """
+
+    def __init__(self, flush_interval, flush_rows, max_rows, log):
+        self.flush_interval = flush_interval
+        self.flush_rows = flush_rows
+        self.max_rows = max_rows
+        self.log = log
+        self.lock = threading.Lock()
+        self.rows = []
+        self.full = threading.Event()
+        self.stop_event = threading.Event()
+        self.accepted = 0
+        self.rejected = 0
+        self.saved = 0
+        self.dropped = 0
+
+    def add(self, rows, rejected=0):
+        with self.lock:
+            self.rejected += rejected
+            space = self.max_rows - len(self.rows)
+            if len(rows) > space:
+                self.dropped += len(rows) - max(space, 0)
+                rows = rows[:max(space, 0)]
+            self.rows.extend(rows)
+            self.accepted += len(rows)
+            if len(self.rows) >= self.flush_rows:
+                self.full.set()
+
+    def flush(self):
+        from apps.sensors import partitions
+        from apps.sensors.models import SensorData
+        from apps.sensors.services import SensorDataService
+
+        with self.lock:
+            rows, self.rows = self.rows, []
+            self.full.clear()
+
+        if not rows:
+            return
+
+        objects = [
+            SensorData(
+                user_plant_id=plant_id,
+                temperature=temperature,
+                air_humidity=air_humidity,
+                light_level=light_level,
+                client_reading_id=reading_id,
+                recorded_at=recorded_at
+            )
+            for plant_id, temperature, air_humidity, light_level, reading_id, recorded_at in rows
+        ]
+
+        try:
+            with transaction.atomic():
+                partitions.bulk_create(objects, ignore_conflicts=True)
+                SensorDataService.readings_saved(objects)
+        except IntegrityError as e:
+            # Повтор того ж пакета падав би знову й блокував усі наступні
+            self.log(f'Flush of {len(rows)} readings failed: {e}', error=True)
+            self.requeue(self.drop_orphaned(rows))
+            return
+        except Exception as e:
+            self.log(f'Flush of {len(rows)} readings failed: {e}', error=True)
+            close_old_connections()
+            self.requeue(rows)
+            return
+
+        self.saved += len(rows)
+
+    def requeue(self, rows):
+        """Повернути показники на початок буфера, щоб повторити при наступному flush"""
+        with self.lock:
+            self.rows = rows + self.rows
+            overflow = len(self.rows) - self.max_rows
+            if overflow > 0:
+                self.dropped += overflow
+                del self.rows[:overflow]
+
+    def drop_orphaned(self, rows):
+        """
+        Відкинути показники рослин, яких уже немає
+
+        Returns: решта показників для повтору; якщо видалених рослин
+        немає, помилка не в FK і пакет відкидається весь
+        """
+        from apps.plants.models import UserPlant
+
+        existing = set(
+            UserPlant.objects.filter(id__in={row[0] for row in rows}).values_list('id', flat=True)
+        )
+        valid = [row for row in rows if row[0] in existing]
+        if len(valid) == len(rows):
+            valid = []
+
+        with self.lock:
+            self.dropped += len(rows) - len(valid)
+        self.log(f'Dropped {len(rows) - len(valid)} readings that cannot be stored', error=True)
+        return valid
+
+    def run(self):
+        while not self.stop_event.is_set():
+            self.full.wait(self.flush_interval)
+            self.flush()
+        self.flush()
+        connection.close()
+
+    def stop(self):
+        self.stop_event.set()
+        self.full.set()
+
+
+class LineHandler:
+    """Спільна обробка рядків для TCP та UDP"""
+
+    def process_lines(self, lines, plant_ids):
+        """Розібрати рядки DATA і покласти валідні показники в буфер"""
+        from django.utils import timezone
+        from apps.sensors.services import SensorDataService
+
+        rows = []
+        rejected = 0
+        # Показники без часу пристрою отримують час прийому, а не час flush
+        received_at = timezone.now()
+
+        for line in lines:
+            try:
+                values = SensorDataService.parse_data_line(line)
+            except ValueError:
+                rejected += 1
+                continue
+
+            if values is None:
+                continue
+
+            if values[0] not in plant_ids:
+                rejected += 1
+                continue
+
+            rows.append(values if values[5] else (*values[:5], received_at))
+
+        if rows or rejected:
+            self.server.buffer.add(rows, rejected)
+
+
+class TCPHandler(LineHandler, socketserver.BaseRequestHandler):
+    """
+    З'єднання TCP: дані читаються блоками recv, тому всі рядки,
+    що прийшли разом, обробляються і додаються в буфер однією пачкою
+    """
+
+    RECV_SIZE = 65536
+    # Рядок без '\n' довший за це - не протокол, з'єднання закривається
+    MAX_LINE_LENGTH = 4096
+
+    def handle(self):
+        self.raw_token = None
+        partial = b''
+
+        try:
+            while True:
+                chunk = self.request.recv(self.RECV_SIZE)
+                if not chunk:
+                    break
+                lines = (partial + chunk).split(b'\n')
+                partial = lines.pop()
+                self.handle_lines(lines)
+                if len(partial) > self.MAX_LINE_LENGTH:
+                    self.reply(b'ERR line too long')
+                    return
+
+            if partial:
+                self.handle_lines([partial])
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            connection.close()
+
+    def handle_lines(self, lines):
+        pending = []
+        plant_ids = self.current_plant_ids()
+
+        for line in lines:
+            if line.startswith(b'AUTH '):
+                if pending:
+                    self.process_lines(pending, plant_ids)
+                    pending = []
+                self.raw_token = line[5:].strip().decode('ascii', errors='replace')
+                plant_ids = self.current_plant_ids(reply_ok=True)
+            elif plant_ids is None:
+                if line.strip():
+                    self.reply(b'ERR not authenticated')
+            else:
+                pending.append(line)
+
+        if pending:
+            self.process_lines(pending, plant_ids)
+
+    def current_plant_ids(self, reply_ok=False):
+        """
+        Перевірити токен з'єднання для чергової пачки рядків (з кешу SessionCache),
+        щоб закінчення токена чи вимкнення ключа діяли і на відкрите з'єднання
+        Returns: id дозволених рослин або None
+        """
+        if self.raw_token is None:
+            return None
+
+        try:
+            _, plant_ids = self.server.sessions.authenticate(self.raw_token)
+        except ValueError as e:
+            self.raw_token = None
+            self.reply(f'ERR {e}'.encode())
+            return None
+
+        if reply_ok:
+            self.reply(b'OK')
+        return plant_ids
+
+    def reply(self, message):
+        self.request.sendall(message + b'\n')
+
+
+class UDPHandler(LineHandler, socketserver.BaseRequestHandler):
+    """Датаграма UDP: перший рядок AUTH, далі рядки DATA; відповідей немає"""
+
+    def handle(self):
+        lines = self.request[0].splitlines()
+        if not lines:
+            return
+
+        try:
+            if not lines[0].startswith(b'AUTH '):
+                raise ValueError('not authenticated')
+            _, plant_ids = self.server.sessions.authenticate(
+                lines[0][5:].strip().decode('ascii', errors='replace')
+            )
+        except ValueError:
+            self.server.buffer.add([], len(lines))
+            return
+
+        self.process_lines(lines[1:], plant_ids)
+
+
+class ThreadingTCPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class Command(BaseCommand):
+    help = 'Приймати показники сенсорів (рядки DATA) через локальний TCP/UDP сокет без HTTP'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tcp',
+            type=str,
+            default='127.0.0.1:9300',
+            help='Адреса TCP HOST:PORT (порожній рядок - вимкнути)',
+        )
+        parser.add_argument(
+            '--udp',
+            type=str,
+            default='',
+            help='Адреса UDP HOST:PORT (за замовчуванням вимкнено)',
+        )
+        parser.add_argument(
+            '--flush-interval',
+            type=int,
+            default=500,
+            help='Інтервал збереження буфера в БД, мс',
+        )
+        parser.add_argument(
+            '--flush-rows',
+            type=int,
+            default=1000,
+            help='Зберегти буфер одразу, коли назбиралось стільки показників',
+        )
+        parser.add_argument(
+            '--max-buffer',
+            type=int,
+            default=100000,
+            help='Максимум показників у пам\'яті, якщо БД недоступна',
+        )
+        parser.add_argument(
+            '--stats-interval',
+            type=int,
+            default=60,
+            help='Інтервал виводу статистики, секунди (0 - вимкнено)',
+        )
+
+    def log(self, message, error=False):
+        style = self.style.ERROR if error else self.style.SUCCESS
+        self.stdout.write(style(f'[{time.strftime("%Y-%m-%d %H:%M:%S")}] {message}'))
+
+    def handle(self, *args, **options):
+        if not options['tcp'] and not options['udp']:
+            raise CommandError('Enable at least one of --tcp or --udp')
+
+        buffer = ReadingBuffer(
+            options['flush_interval'] / 1000,
+            options['flush_rows'],
+            options['max_buffer'],
+            self.log
+        )
+        sessions = SessionCache()
+
+        servers = []
+        if options['tcp']:
+            servers.append(('TCP', ThreadingTCPServer(parse_address(options['tcp']), TCPHandler)))
+        if options['udp']:
+            servers.append(('UDP', socketserver.UDPServer(parse_address(options['udp']), UDPHandler)))
+
+        for name, server in servers:
+            server.buffer = buffer
+            server.sessions = sessions
+            threading.Thread(target=server.serve_forever, name=f'listener-{name}', daemon=True).start()
+            host, port = server.server_address[:2]
+            self.log(f'Listening for sensor readings on {name} {host}:{port}')
+
+        flusher = threading.Thread(target=buffer.run, name='flusher')
+        flusher.start()
+
+        def interrupt(signum, frame):
+            raise KeyboardInterrupt
+
+        # Зупинка сервісу (SIGTERM) так само зберігає буфер, як і Ctrl+C
+        signal.signal(signal.SIGTERM, interrupt)
+
+        try:
+            while True:
+                time.sleep(options['stats_interval'] or 3600)
+                if options['stats_interval']:
+                    self.log(
+                        f'Readings: {buffer.accepted} accepted, {buffer.saved} saved, '
+                        f'{buffer.rejected} rejected, '
+                        f'{buffer.dropped} dropped'
+                    )
+        except KeyboardInterrupt:
+            self.log('Stopping listener...')
+
+        for _, server in servers:
+            server.shutdown()
+            server.server_close()
+
+        buffer.stop()
+        flusher.join()
+        self.log(f'Stopped: {buffer.saved} readings saved, {buffer.dropped} dropped')
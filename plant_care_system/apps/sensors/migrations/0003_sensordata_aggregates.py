@@ -0,0 +1,82 @@
+# Generated by Django 4.2.8 on 2026-10-16 23:49
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("sensors", "0002_sensordata_air_humidity_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="sensordata",
+            name="air_humidity_max",
+            field=models.DecimalField(
+                blank=True,
+                decimal_places=2,
+                max_digits=5,
+                null=True,
+                verbose_name="air humidity max (%)",
+            ),
+        ),
+        migrations.AddField(
+            model_name="sensordata",
+            name="air_humidity_min",
+            field=models.DecimalField(
+                blank=True,
+                decimal_places=2,
+                max_digits=5,
+                null=True,
+                verbose_name="air humidity min (%)",
+            ),
+        ),
+        migrations.AddField(
+            model_name="sensordata",
+            name="light_level_max",
+            field=models.PositiveIntegerField(
+                blank=True, null=True, verbose_name="light level max (lux)"
+            ),
+        ),
+        migrations.AddField(
+            model_name="sensordata",
+            name="light_level_min",
+            field=models.PositiveIntegerField(
+                blank=True, null=True, verbose_name="light level min (lux)"
+            ),
+        ),
+        migrations.AddField(
+            model_name="sensordata",
+            name="sample_count",
+            field=models.PositiveIntegerField(
+                default=1,
+                help_text="Number of raw readings summarized by this record",
+                validators=[django.core.validators.MinValueValidator(1)],
+                verbose_name="sample count",
+            ),
+        ),
+        migrations.AddField(
+            model_name="sensordata",
+            name="temperature_max",
+            field=models.DecimalField(
+                blank=True,
+                decimal_places=1,
+                max_digits=4,
+                null=True,
+                verbose_name="temperature max (°C)",
+            ),
+        ),
+        migrations.AddField(
+            model_name="sensordata",
+            name="temperature_min",
+            field=models.DecimalField(
+                blank=True,
+                decimal_places=1,
+                max_digits=4,
+                null=True,
+                verbose_name="temperature min (°C)",
+            ),
+        ),
+    ]
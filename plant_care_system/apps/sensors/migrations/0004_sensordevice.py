@@ -0,0 +1,82 @@
+# Generated by Django 4.2.8 on 2026-10-17 00:04
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("plants", "0002_initial"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("sensors", "0003_sensordata_aggregates"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SensorDevice",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=100, verbose_name="name")),
+                (
+                    "key_prefix",
+                    models.CharField(
+                        editable=False, max_length=16, verbose_name="key prefix"
+                    ),
+                ),
+                (
+                    "key_hash",
+                    models.CharField(
+                        editable=False,
+                        max_length=64,
+                        unique=True,
+                        verbose_name="key hash",
+                    ),
+                ),
+                ("is_active", models.BooleanField(default=True, verbose_name="active")),
+                (
+                    "last_seen_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="last seen at"
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="created at"),
+                ),
+                (
+                    "plants",
+                    models.ManyToManyField(
+                        blank=True,
+                        related_name="sensor_devices",
+                        to="plants.userplant",
+                        verbose_name="plants",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="sensor_devices",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="user",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "sensor device",
+                "verbose_name_plural": "sensor devices",
+                "db_table": "sensor_devices",
+                "ordering": ["-created_at"],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.8 on 2026-10-17 00:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("sensors", "0004_sensordevice"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="sensordata",
+            name="client_reading_id",
+            field=models.CharField(
+                blank=True,
+                help_text="Device-generated id, unique per plant; duplicates are ignored",
+                max_length=64,
+                null=True,
+                verbose_name="client reading id",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="sensordata",
+            constraint=models.UniqueConstraint(
+                fields=("user_plant", "client_reading_id"),
+                name="unique_client_reading_per_plant",
+            ),
+        ),
+    ]
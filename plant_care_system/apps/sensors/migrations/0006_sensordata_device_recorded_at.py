@@ -0,0 +1,21 @@
+# Generated by Django 4.2.8 on 2026-10-17 00:09
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("sensors", "0005_sensordata_client_reading_id"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="sensordata",
+            name="recorded_at",
+            field=models.DateTimeField(
+                default=django.utils.timezone.now, verbose_name="recorded at"
+            ),
+        ),
+    ]
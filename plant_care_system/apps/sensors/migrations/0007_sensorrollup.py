@@ -0,0 +1,229 @@
+# Generated by Django 4.2.8 on 2026-10-17 00:14
+
+from django.db import migrations, models
+from django.db.models import Count, F, FloatField, Max, Min, Q, Sum
+from django.db.models.functions import Coalesce, TruncHour
+from django.utils import timezone
+import django.db.models.deletion
+
+
+METRICS = ["temperature", "air_humidity", "soil_humidity", "light_level"]
+# Метрики, для яких агрегований показник пристрою має власні min/max
+WINDOW_METRICS = ["temperature", "air_humidity", "light_level"]
+
+
+def fill_rollups(apps, schema_editor):
+    """
+    Агрегати з наявних показників (як rebuild_sensor_rollups), щоб графіки
+    та статистика за тиждень/місяць не були порожніми після migrate
+    """
+    SensorData = apps.get_model("sensors", "SensorData")
+    SensorRollup = apps.get_model("sensors", "SensorRollup")
+
+    aggregates = {"agg_reading_count": Count("id")}
+    for metric in METRICS:
+        low = high = metric
+        if metric in WINDOW_METRICS:
+            low = Coalesce(f"{metric}_min", metric)
+            high = Coalesce(f"{metric}_max", metric)
+        aggregates[f"agg_{metric}_count"] = Sum("sample_count", filter=Q(**{f"{metric}__isnull": False}))
+        aggregates[f"agg_{metric}_sum"] = Sum(F(metric) * F("sample_count"), output_field=FloatField())
+        aggregates[f"agg_{metric}_min"] = Min(low)
+        aggregates[f"agg_{metric}_max"] = Max(high)
+
+    def rollup(plant_id, resolution, bucket, parts):
+        values = {"reading_count": sum(part["agg_reading_count"] for part in parts)}
+        for metric in METRICS:
+            count = sum(part[f"agg_{metric}_count"] or 0 for part in parts)
+            total = sum(part[f"agg_{metric}_sum"] or 0.0 for part in parts)
+            lows = [float(part[f"agg_{metric}_min"]) for part in parts if part[f"agg_{metric}_min"] is not None]
+            highs = [float(part[f"agg_{metric}_max"]) for part in parts if part[f"agg_{metric}_max"] is not None]
+            values[f"{metric}_count"] = count
+            values[f"{metric}_avg"] = total / count if count else None
+            values[f"{metric}_min"] = min(lows, default=None)
+            values[f"{metric}_max"] = max(highs, default=None)
+        return SensorRollup(user_plant_id=plant_id, resolution=resolution, bucket_start=bucket, **values)
+
+    plant_ids = SensorData.objects.order_by().values_list("user_plant_id", flat=True).distinct()
+    for plant_id in list(plant_ids):
+        hours = list(
+            SensorData.objects.filter(user_plant_id=plant_id)
+            .annotate(bucket=TruncHour("recorded_at"))
+            .order_by()
+            .values("bucket")
+            .annotate(**aggregates)
+        )
+
+        days = {}
+        for hour in hours:
+            local = timezone.localtime(hour["bucket"]).replace(tzinfo=None, hour=0)
+            days.setdefault(timezone.make_aware(local), []).append(hour)
+
+        SensorRollup.objects.bulk_create(
+            [rollup(plant_id, "hour", hour["bucket"], [hour]) for hour in hours]
+            + [rollup(plant_id, "day", day, parts) for day, parts in days.items()],
+            batch_size=500,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("plants", "0002_initial"),
+        ("sensors", "0006_sensordata_device_recorded_at"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SensorRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "resolution",
+                    models.CharField(
+                        choices=[("hour", "Hour"), ("day", "Day")],
+                        max_length=4,
+                        verbose_name="resolution",
+                    ),
+                ),
+                ("bucket_start", models.DateTimeField(verbose_name="bucket start")),
+                (
+                    "reading_count",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="reading count"
+                    ),
+                ),
+                (
+                    "temperature_count",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="temperature count"
+                    ),
+                ),
+                (
+                    "temperature_min",
+                    models.FloatField(
+                        blank=True, null=True, verbose_name="temperature min (°C)"
+                    ),
+                ),
+                (
+                    "temperature_max",
+                    models.FloatField(
+                        blank=True, null=True, verbose_name="temperature max (°C)"
+                    ),
+                ),
+                (
+                    "temperature_avg",
+                    models.FloatField(
+                        blank=True, null=True, verbose_name="temperature avg (°C)"
+                    ),
+                ),
+                (
+                    "air_humidity_count",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="air humidity count"
+                    ),
+                ),
+                (
+                    "air_humidity_min",
+                    models.FloatField(
+                        blank=True, null=True, verbose_name="air humidity min (%)"
+                    ),
+                ),
+                (
+                    "air_humidity_max",
+                    models.FloatField(
+                        blank=True, null=True, verbose_name="air humidity max (%)"
+                    ),
+                ),
+                (
+                    "air_humidity_avg",
+                    models.FloatField(
+                        blank=True, null=True, verbose_name="air humidity avg (%)"
+                    ),
+                ),
+                (
+                    "soil_humidity_count",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="soil humidity count"
+                    ),
+                ),
+                (
+                    "soil_humidity_min",
+                    models.FloatField(
+                        blank=True, null=True, verbose_name="soil humidity min (%)"
+                    ),
+                ),
+                (
+                    "soil_humidity_max",
+                    models.FloatField(
+                        blank=True, null=True, verbose_name="soil humidity max (%)"
+                    ),
+                ),
+                (
+                    "soil_humidity_avg",
+                    models.FloatField(
+                        blank=True, null=True, verbose_name="soil humidity avg (%)"
+                    ),
+                ),
+                (
+                    "light_level_count",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="light level count"
+                    ),
+                ),
+                (
+                    "light_level_min",
+                    models.FloatField(
+                        blank=True, null=True, verbose_name="light level min (lux)"
+                    ),
+                ),
+                (
+                    "light_level_max",
+                    models.FloatField(
+                        blank=True, null=True, verbose_name="light level max (lux)"
+                    ),
+                ),
+                (
+                    "light_level_avg",
+                    models.FloatField(
+                        blank=True, null=True, verbose_name="light level avg (lux)"
+                    ),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(auto_now=True, verbose_name="updated at"),
+                ),
+                (
+                    "user_plant",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="sensor_rollups",
+                        to="plants.userplant",
+                        verbose_name="plant",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "sensor rollup",
+                "verbose_name_plural": "sensor rollups",
+                "db_table": "sensor_rollups",
+                "ordering": ["bucket_start"],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="sensorrollup",
+            constraint=models.UniqueConstraint(
+                fields=("user_plant", "resolution", "bucket_start"),
+                name="unique_rollup_bucket_per_plant",
+            ),
+        ),
+        migrations.RunPython(fill_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,89 @@
+# Generated by Django 4.2.8 on 2026-10-17 00:18
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_latest_readings(apps, schema_editor):
+    SensorData = apps.get_model("sensors", "SensorData")
+    SensorLatestReading = apps.get_model("sensors", "SensorLatestReading")
+
+    plant_ids = SensorData.objects.order_by().values_list("user_plant_id", flat=True).distinct()
+    for plant_id in plant_ids:
+        latest = SensorData.objects.filter(user_plant_id=plant_id).order_by("-recorded_at").first()
+        SensorLatestReading.objects.create(
+            user_plant_id=plant_id,
+            temperature=latest.temperature,
+            soil_humidity=latest.soil_humidity,
+            air_humidity=latest.air_humidity,
+            light_level=latest.light_level,
+            recorded_at=latest.recorded_at,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("plants", "0002_initial"),
+        ("sensors", "0007_sensorrollup"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SensorLatestReading",
+            fields=[
+                (
+                    "user_plant",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="latest_reading",
+                        serialize=False,
+                        to="plants.userplant",
+                        verbose_name="plant",
+                    ),
+                ),
+                (
+                    "temperature",
+                    models.DecimalField(
+                        decimal_places=1, max_digits=4, verbose_name="temperature (°C)"
+                    ),
+                ),
+                (
+                    "soil_humidity",
+                    models.DecimalField(
+                        blank=True,
+                        decimal_places=2,
+                        max_digits=5,
+                        null=True,
+                        verbose_name="soil humidity (%)",
+                    ),
+                ),
+                (
+                    "air_humidity",
+                    models.DecimalField(
+                        blank=True,
+                        decimal_places=2,
+                        max_digits=5,
+                        null=True,
+                        verbose_name="air humidity (%)",
+                    ),
+                ),
+                (
+                    "light_level",
+                    models.PositiveIntegerField(verbose_name="light level (lux)"),
+                ),
+                ("recorded_at", models.DateTimeField(verbose_name="recorded at")),
+                (
+                    "updated_at",
+                    models.DateTimeField(auto_now=True, verbose_name="updated at"),
+                ),
+            ],
+            options={
+                "verbose_name": "latest sensor reading",
+                "verbose_name_plural": "latest sensor readings",
+                "db_table": "sensor_latest_readings",
+            },
+        ),
+        migrations.RunPython(fill_latest_readings, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.8 on 2026-10-17 01:00
+
+import os
+
+import apps.sensors.models
+from django.conf import settings
+from django.db import migrations, models
+
+
+def move_export_files(apps, schema_editor):
+    """Готові файли з MEDIA_ROOT/sensor_exports/ - у SENSOR_EXPORT_DIR"""
+    SensorExportJob = apps.get_model("sensors", "SensorExportJob")
+
+    for job in SensorExportJob.objects.exclude(file=""):
+        name = os.path.basename(job.file.name)
+        source = os.path.join(settings.MEDIA_ROOT, job.file.name)
+        if os.path.exists(source):
+            os.makedirs(settings.SENSOR_EXPORT_DIR, exist_ok=True)
+            os.replace(source, os.path.join(settings.SENSOR_EXPORT_DIR, name))
+        SensorExportJob.objects.filter(pk=job.pk).update(file=name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("sensors", "0009_sensorexportjob"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="sensorexportjob",
+            name="file",
+            field=models.FileField(
+                blank=True,
+                storage=apps.sensors.models.sensor_export_storage,
+                upload_to="",
+                verbose_name="file",
+            ),
+        ),
+        migrations.RunPython(move_export_files, migrations.RunPython.noop),
+    ]
@@ -1,8 +1,30 @@
+import hashlib
+import secrets
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.core.validators import MinValueValidator
 from django.db import models
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 
 class SensorData(models.Model):
+    AGGREGATE_FIELDS = [
+        'sample_count',
+        'temperature_min', 'temperature_max',
+        'air_humidity_min', 'air_humidity_max',
+        'light_level_min', 'light_level_max',
+    ]
+    # Допустимі діапазони показників (включно)
+    VALUE_RANGES = {
+        'temperature': (-50, 60),
+        'soil_humidity': (0, 100),
+        'air_humidity': (0, 100),
+        'light_level': (0, 200000),
+    }
+
     user_plant = models.ForeignKey(
         'plants.UserPlant',
         on_delete=models.CASCADE,
@@ -38,7 +60,41 @@ class SensorData(models.Model):
     
     light_level = models.PositiveIntegerField(_('light level (lux)'))
     
-    recorded_at = models.DateTimeField(_('recorded at'), auto_now_add=True)
+    # ДОДАНО: агреговані записи від bridge (вікно усереднення)
+    # Для агрегованого запису temperature/air_humidity/light_level - середні значення
+    sample_count = models.PositiveIntegerField(
+        _('sample count'),
+        default=1,
+        validators=[MinValueValidator(1)],
+        help_text=_('Number of raw readings summarized by this record')
+    )
+    temperature_min = models.DecimalField(
+        _('temperature min (°C)'), max_digits=4, decimal_places=1, null=True, blank=True
+    )
+    temperature_max = models.DecimalField(
+        _('temperature max (°C)'), max_digits=4, decimal_places=1, null=True, blank=True
+    )
+    air_humidity_min = models.DecimalField(
+        _('air humidity min (%)'), max_digits=5, decimal_places=2, null=True, blank=True
+    )
+    air_humidity_max = models.DecimalField(
+        _('air humidity max (%)'), max_digits=5, decimal_places=2, null=True, blank=True
+    )
+    light_level_min = models.PositiveIntegerField(_('light level min (lux)'), null=True, blank=True)
+    light_level_max = models.PositiveIntegerField(_('light level max (lux)'), null=True, blank=True)
+    
+    # ДОДАНО: id показника від пристрою - повторна відправка не створює дублікатів
+    client_reading_id = models.CharField(
+        _('client reading id'),
+        max_length=64,
+        null=True,
+        blank=True,
+        help_text=_('Device-generated id, unique per plant; duplicates are ignored')
+    )
+    
+    # ЗМІНЕНО: час зчитування може передати пристрій (spool, backfill);
+    # без нього - час збереження
+    recorded_at = models.DateTimeField(_('recorded at'), default=timezone.now)
 
     class Meta:
         verbose_name = _('sensor data')
@@ -48,6 +104,242 @@ class SensorData(models.Model):
         indexes = [
             models.Index(fields=['user_plant', '-recorded_at']),
         ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user_plant', 'client_reading_id'],
+                name='unique_client_reading_per_plant'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user_plant.custom_name} - {self.recorded_at}"
+
+    @staticmethod
+    def recorded_at_bounds():
+        """
+        Допустимий час показника від пристрою: (найраніший, найпізніший)
+        
+        SENSOR_MAX_BACKFILL_DAYS, але не раніше raw_since: агрегат
+        обрізаної prune_sensor_data доби не можна перерахувати.
+        """
+        from apps.sensors.services import SensorRollupService
+        
+        now = timezone.now()
+        earliest = now - timedelta(days=settings.SENSOR_MAX_BACKFILL_DAYS)
+        raw_since = SensorRollupService.raw_since(now)
+        if raw_since is not None and raw_since > earliest:
+            earliest = raw_since
+        return (
+            earliest,
+            now + timedelta(seconds=settings.SENSOR_MAX_CLOCK_SKEW)
+        )
+
+
+class SensorLatestReading(models.Model):
+    """
+    Останній показник рослини - один рядок на рослину
+
+    Оновлюється разом із записом показників (SensorDataService.readings_saved),
+    тільки якщо новий показник пізніший за збережений, тому запізнілі
+    показники (backfill) його не перезаписують. Статус рослини, графік
+    поливу та список рослин читають його замість таблиці sensor_data.
+    """
+    user_plant = models.OneToOneField(
+        'plants.UserPlant',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='latest_reading',
+        verbose_name=_('plant')
+    )
+    temperature = models.DecimalField(_('temperature (°C)'), max_digits=4, decimal_places=1)
+    soil_humidity = models.DecimalField(
+        _('soil humidity (%)'), max_digits=5, decimal_places=2, null=True, blank=True
+    )
+    air_humidity = models.DecimalField(
+        _('air humidity (%)'), max_digits=5, decimal_places=2, null=True, blank=True
+    )
+    light_level = models.PositiveIntegerField(_('light level (lux)'))
+    recorded_at = models.DateTimeField(_('recorded at'))
+    updated_at = models.DateTimeField(_('updated at'), auto_now=True)
+
+    class Meta:
+        verbose_name = _('latest sensor reading')
+        verbose_name_plural = _('latest sensor readings')
+        db_table = 'sensor_latest_readings'
+
+    def __str__(self):
+        return f"{self.user_plant_id} - {self.recorded_at}"
+
+
+class SensorRollup(models.Model):
+    """
+    Агрегати показників рослини за годину або добу
+
+    Межі інтервалів - за місцевим часом (TIME_ZONE), тому доба - це
+    календарний день користувача (23 або 25 годин при переході на літній час).
+    Для кожного показника: count (з урахуванням sample_count агрегованих
+    записів bridge), min, max та avg. Оновлюється разом із записом
+    показників (SensorDataService.readings_saved), перебудова -
+    manage.py rebuild_sensor_rollups.
+    """
+    RESOLUTION_HOUR = 'hour'
+    RESOLUTION_DAY = 'day'
+    RESOLUTION_CHOICES = [
+        (RESOLUTION_HOUR, _('Hour')),
+        (RESOLUTION_DAY, _('Day')),
+    ]
+    METRICS = ['temperature', 'air_humidity', 'soil_humidity', 'light_level']
+
+    user_plant = models.ForeignKey(
+        'plants.UserPlant',
+        on_delete=models.CASCADE,
+        related_name='sensor_rollups',
+        verbose_name=_('plant')
+    )
+    resolution = models.CharField(_('resolution'), max_length=4, choices=RESOLUTION_CHOICES)
+    bucket_start = models.DateTimeField(_('bucket start'))
+    reading_count = models.PositiveIntegerField(_('reading count'), default=0)
+
+    temperature_count = models.PositiveIntegerField(_('temperature count'), default=0)
+    temperature_min = models.FloatField(_('temperature min (°C)'), null=True, blank=True)
+    temperature_max = models.FloatField(_('temperature max (°C)'), null=True, blank=True)
+    temperature_avg = models.FloatField(_('temperature avg (°C)'), null=True, blank=True)
+
+    air_humidity_count = models.PositiveIntegerField(_('air humidity count'), default=0)
+    air_humidity_min = models.FloatField(_('air humidity min (%)'), null=True, blank=True)
+    air_humidity_max = models.FloatField(_('air humidity max (%)'), null=True, blank=True)
+    air_humidity_avg = models.FloatField(_('air humidity avg (%)'), null=True, blank=True)
+
+    soil_humidity_count = models.PositiveIntegerField(_('soil humidity count'), default=0)
+    soil_humidity_min = models.FloatField(_('soil humidity min (%)'), null=True, blank=True)
+    soil_humidity_max = models.FloatField(_('soil humidity max (%)'), null=True, blank=True)
+    soil_humidity_avg = models.FloatField(_('soil humidity avg (%)'), null=True, blank=True)
+
+    light_level_count = models.PositiveIntegerField(_('light level count'), default=0)
+    light_level_min = models.FloatField(_('light level min (lux)'), null=True, blank=True)
+    light_level_max = models.FloatField(_('light level max (lux)'), null=True, blank=True)
+    light_level_avg = models.FloatField(_('light level avg (lux)'), null=True, blank=True)
+
+    updated_at = models.DateTimeField(_('updated at'), auto_now=True)
+
+    class Meta:
+        verbose_name = _('sensor rollup')
+        verbose_name_plural = _('sensor rollups')
+        db_table = 'sensor_rollups'
+        ordering = ['bucket_start']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user_plant', 'resolution', 'bucket_start'],
+                name='unique_rollup_bucket_per_plant'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user_plant_id} {self.resolution} {self.bucket_start}"
+
+
+class SensorDevice(models.Model):
+    """
+    Пристрій (bridge) з власним API ключем
+
+    Ключ показується один раз при створенні; в БД зберігається тільки
+    sha256 від нього, тому запит авторизується одним пошуком по key_hash.
+    """
+    KEY_PREFIX = 'pcsd_'
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='sensor_devices',
+        verbose_name=_('user')
+    )
+    name = models.CharField(_('name'), max_length=100)
+    plants = models.ManyToManyField(
+        'plants.UserPlant',
+        related_name='sensor_devices',
+        blank=True,
+        verbose_name=_('plants')
+    )
+    key_prefix = models.CharField(_('key prefix'), max_length=16, editable=False)
+    key_hash = models.CharField(_('key hash'), max_length=64, unique=True, editable=False)
+    is_active = models.BooleanField(_('active'), default=True)
+    last_seen_at = models.DateTimeField(_('last seen at'), null=True, blank=True)
+    created_at = models.DateTimeField(_('created at'), auto_now_add=True)
+
+    class Meta:
+        verbose_name = _('sensor device')
+        verbose_name_plural = _('sensor devices')
+        db_table = 'sensor_devices'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.name} ({self.key_prefix}...)"
+
+    @staticmethod
+    def hash_key(raw_key):
+        return hashlib.sha256(raw_key.encode('utf-8')).hexdigest()
+
+    def set_new_key(self):
+        """Згенерувати новий ключ; Returns: ключ у відкритому вигляді (тільки для відповіді)"""
+        raw_key = f"{self.KEY_PREFIX}{secrets.token_urlsafe(32)}"
+        self.key_prefix = raw_key[:len(self.KEY_PREFIX) + 6]
+        self.key_hash = self.hash_key(raw_key)
+        return raw_key
+
+
+def sensor_export_storage():
+    """Сховище файлів експорту (SENSOR_EXPORT_DIR), не доступне через MEDIA_URL"""
+    return FileSystemStorage(location=settings.SENSOR_EXPORT_DIR)
+
+
+class SensorExportJob(models.Model):
+    """
+    Фонове формування CSV (gzip) з показниками однієї або кількох рослин
+
+    Файл записується у SENSOR_EXPORT_DIR під випадковою назвою і
+    завантажується тільки через /api/sensor-exports/<id>/download/ з
+    підтримкою Range - перерване завантаження продовжується, а не
+    формується заново.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, _('Pending')),
+        (STATUS_RUNNING, _('Running')),
+        (STATUS_DONE, _('Done')),
+        (STATUS_FAILED, _('Failed')),
+    ]
+    ACTIVE_STATUSES = [STATUS_PENDING, STATUS_RUNNING]
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='sensor_export_jobs',
+        verbose_name=_('user')
+    )
+    plants = models.ManyToManyField(
+        'plants.UserPlant',
+        related_name='sensor_export_jobs',
+        verbose_name=_('plants')
+    )
+    start = models.DateTimeField(_('start'), null=True, blank=True)
+    end = models.DateTimeField(_('end'), null=True, blank=True)
+    status = models.CharField(_('status'), max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    file = models.FileField(_('file'), storage=sensor_export_storage, blank=True)
+    file_size = models.PositiveBigIntegerField(_('file size (bytes)'), null=True, blank=True)
+    row_count = models.PositiveIntegerField(_('row count'), null=True, blank=True)
+    error = models.TextField(_('error'), blank=True)
+    created_at = models.DateTimeField(_('created at'), auto_now_add=True)
+    started_at = models.DateTimeField(_('started at'), null=True, blank=True)
+    finished_at = models.DateTimeField(_('finished at'), null=True, blank=True)
+
+    class Meta:
+        verbose_name = _('sensor export job')
+        verbose_name_plural = _('sensor export jobs')
+        db_table = 'sensor_export_jobs'
+        ordering = ['-created_at']
 
     def __str__(self):
-        return f"{self.user_plant.custom_name} - {self.recorded_at}"
\ No newline at end of file
+        return f"Export {self.id} ({self.status})"
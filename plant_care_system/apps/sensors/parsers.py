@@ -0,0 +1,83 @@
+import io
+import zlib
+
+from django.conf import settings
+from rest_framework import status
+from rest_framework.exceptions import APIException, ParseError, UnsupportedMediaType
+from rest_framework.parsers import BaseParser, JSONParser
+
+
+class RequestBodyTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = 'Request body is too large.'
+    default_code = 'request_body_too_large'
+
+
+class ContentEncodingMixin:
+    """
+    Розпакування тіла запиту за заголовком Content-Encoding (gzip, deflate)
+
+    Розмір тіла до і після розпакування обмежений
+    SENSOR_MAX_DECOMPRESSED_SIZE - захист від zip-бомб.
+    """
+
+    WBITS = {
+        'gzip': zlib.MAX_WBITS | 16,
+        'x-gzip': zlib.MAX_WBITS | 16,
+        'deflate': zlib.MAX_WBITS,
+    }
+
+    def decode_stream(self, stream, parser_context):
+        request = (parser_context or {}).get('request')
+        encoding = request.META.get('HTTP_CONTENT_ENCODING', '') if request else ''
+        encoding = encoding.strip().lower()
+
+        if encoding in ('', 'identity'):
+            return stream
+
+        if encoding not in self.WBITS:
+            raise UnsupportedMediaType(
+                self.media_type,
+                detail=f'Unsupported Content-Encoding "{encoding}"'
+            )
+
+        limit = settings.SENSOR_MAX_DECOMPRESSED_SIZE
+        compressed = stream.read(limit + 1)
+        if len(compressed) > limit:
+            raise RequestBodyTooLarge()
+
+        decompressor = zlib.decompressobj(self.WBITS[encoding])
+        try:
+            body = decompressor.decompress(compressed, limit + 1)
+        except zlib.error as exc:
+            raise ParseError(f'Invalid {encoding} body - {exc}')
+
+        if len(body) > limit or decompressor.unconsumed_tail:
+            raise RequestBodyTooLarge(f'Decompressed body exceeds {limit} bytes.')
+
+        if not decompressor.eof:
+            raise ParseError(f'Truncated {encoding} body')
+
+        return io.BytesIO(body)
+
+
+class CompressedJSONParser(ContentEncodingMixin, JSONParser):
+    """JSON парсер, що приймає стиснуте тіло (Content-Encoding: gzip)"""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        stream = self.decode_stream(stream, parser_context)
+        return super().parse(stream, media_type, parser_context)
+
+
+class PlainTextParser(ContentEncodingMixin, BaseParser):
+    """text/plain тіло як bytes (рядки DATA від Arduino), з підтримкою gzip"""
+
+    media_type = 'text/plain'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        stream = self.decode_stream(stream, parser_context)
+        limit = settings.SENSOR_MAX_DECOMPRESSED_SIZE
+        body = stream.read(limit + 1)
+        if len(body) > limit:
+            raise RequestBodyTooLarge()
+        return body
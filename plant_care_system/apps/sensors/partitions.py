@@ -0,0 +1,241 @@
+"""
+Місячні таблиці показників сенсорів (SENSOR_PARTITIONING)
+
+Усі показники лежать в одній таблиці sensor_data: видалення старих
+(prune_sensor_data) та вибірки за період працюють з тим самим B-tree,
+а звільнення місця - це видалення рядок за рядком. З SENSOR_PARTITIONING
+нові показники записуються в таблицю свого місяця (UTC) -
+sensor_data_2026_10, ... - і прострочений місяць видаляється одним DROP TABLE.
+
+Таблиця місяця створюється при першому записі як копія схеми sensor_data
+з sqlite_master (DDL у SQLite транзакційний, тож це працює всередині
+транзакції запису). Для запитів до неї будується модель з тими самими
+полями (partition_model). Читання (readings) завжди охоплює sensor_data
+та наявні місячні таблиці, що перетинаються з періодом, - показники,
+записані до ввімкнення чи після вимкнення налаштування, не губляться.
+
+id у таблиці місяця починаються з YYYYMM * ID_STEP, тому не повторюються
+між таблицями. Унікальність client_reading_id перевіряється в межах
+таблиці: повтор показника з тим самим recorded_at потрапляє в ту саму.
+Міграції, що змінюють SensorData, треба застосувати і до місячних таблиць.
+"""
+
+import heapq
+import re
+import threading
+from datetime import datetime, timezone as dt_timezone
+from itertools import islice
+from operator import attrgetter
+
+from django.conf import settings
+from django.db import connection, models
+
+
+LEGACY_TABLE = 'sensor_data'
+TABLE_PATTERN = re.compile(r'^sensor_data_(\d{4})_(\d{2})$')
+ID_STEP = 10 ** 10
+
+_models = {}
+_models_lock = threading.Lock()
+
+
+def partition_key(value):
+    """Місяць показника за UTC: (рік, місяць)"""
+    value = value.astimezone(dt_timezone.utc)
+    return value.year, value.month
+
+
+def table_name(key):
+    return f'{LEGACY_TABLE}_{key[0]:04d}_{key[1]:02d}'
+
+
+def month_bounds(key):
+    """[початок, кінець) місяця за UTC"""
+    year, month = key
+    start = datetime(year, month, 1, tzinfo=dt_timezone.utc)
+    end = datetime(year + month // 12, month % 12 + 1, 1, tzinfo=dt_timezone.utc)
+    return start, end
+
+
+def existing_keys():
+    """Місяці, для яких є таблиця, від новіших до старіших"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE %s",
+            [f'{LEGACY_TABLE}%']
+        )
+        names = [row[0] for row in cursor.fetchall()]
+
+    keys = []
+    for name in names:
+        match = TABLE_PATTERN.match(name)
+        if match:
+            keys.append((int(match.group(1)), int(match.group(2))))
+    return sorted(keys, reverse=True)
+
+
+def partition_model(key):
+    """Модель таблиці місяця (одна на процес; таблиця може ще не існувати)"""
+    with _models_lock:
+        if key not in _models:
+            _models[key] = _build_model(key)
+        return _models[key]
+
+
+def _build_model(key):
+    from apps.sensors.models import SensorData
+
+    attrs = {'__module__': SensorData.__module__}
+    for field in SensorData._meta.local_fields:
+        name, _, args, kwargs = field.deconstruct()
+        if field.is_relation:
+            # Без зворотного зв'язку в UserPlant; рядки видаляє delete_plant_readings
+            kwargs.update(on_delete=models.DO_NOTHING, related_name='+')
+        attrs[name] = field.__class__(*args, **kwargs)
+
+    attrs['Meta'] = type('Meta', (), {
+        'app_label': SensorData._meta.app_label,
+        'db_table': table_name(key),
+        'managed': False,
+        'ordering': SensorData._meta.ordering,
+    })
+    return type(f'SensorData{key[0]:04d}{key[1]:02d}', (models.Model,), attrs)
+
+
+def create_partition(key):
+    """Створити таблицю місяця (якщо її ще немає) за поточною схемою sensor_data"""
+    table = table_name(key)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT type, name, sql FROM sqlite_master "
+            "WHERE tbl_name = %s AND sql IS NOT NULL ORDER BY type = 'index'",
+            [LEGACY_TABLE]
+        )
+        for kind, name, sql in cursor.fetchall():
+            statement = f'CREATE {kind.upper()}'
+            sql = sql.replace(statement, f'{statement} IF NOT EXISTS', 1)
+            if kind == 'index':
+                # Імена індексів у SQLite спільні для всієї бази
+                index = name.replace(LEGACY_TABLE, table, 1) if name.startswith(LEGACY_TABLE) else f'{table}_{name}'
+                sql = sql.replace(f'"{name}"', f'"{index}"', 1)
+            cursor.execute(sql.replace(f'"{LEGACY_TABLE}"', f'"{table}"'))
+
+        cursor.execute(
+            'INSERT INTO sqlite_sequence (name, seq) SELECT %s, %s '
+            'WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = %s)',
+            [table, (key[0] * 100 + key[1]) * ID_STEP, table]
+        )
+
+
+def drop_partition(key):
+    with connection.cursor() as cursor:
+        cursor.execute(f'DROP TABLE IF EXISTS "{table_name(key)}"')
+
+
+def bulk_create(objects, ignore_conflicts=False):
+    """
+    Записати показники (SensorData без pk): у sensor_data або, з
+    SENSOR_PARTITIONING, у таблиці їх місяців
+
+    pk, які повернула база, копіюються в objects (без ignore_conflicts).
+    """
+    from apps.sensors.models import SensorData
+
+    if not settings.SENSOR_PARTITIONING:
+        SensorData.objects.bulk_create(objects, batch_size=500, ignore_conflicts=ignore_conflicts)
+        return
+
+    groups = {}
+    for obj in objects:
+        groups.setdefault(partition_key(obj.recorded_at), []).append(obj)
+
+    existing = set(existing_keys())
+    fields = [field.attname for field in SensorData._meta.concrete_fields]
+    for key, group in groups.items():
+        if key not in existing:
+            create_partition(key)
+
+        model = partition_model(key)
+        rows = [model(**{name: getattr(obj, name) for name in fields}) for obj in group]
+        model.objects.bulk_create(rows, batch_size=500, ignore_conflicts=ignore_conflicts)
+        for obj, row in zip(group, rows):
+            obj.pk = row.pk
+
+
+def readings(start=None, end=None):
+    """
+    QuerySet-и показників за [start, end) (None - без межі)
+
+    Місячні таблиці, що перетинаються з періодом, від новіших до
+    старіших, та sensor_data останньою. Без місячних таблиць - один
+    QuerySet SensorData, як і без розбиття.
+    """
+    from apps.sensors.models import SensorData
+
+    querysets = []
+    for key in existing_keys():
+        month_start, month_end = month_bounds(key)
+        if (start is None or month_end > start) and (end is None or month_start < end):
+            querysets.append(partition_model(key).objects.all())
+    querysets.append(SensorData.objects.all())
+
+    lookups = {}
+    if start is not None:
+        lookups['recorded_at__gte'] = start
+    if end is not None:
+        lookups['recorded_at__lt'] = end
+    return [queryset.filter(**lookups) for queryset in querysets]
+
+
+def expired_keys(cutoff):
+    """Місяці, що повністю закінчились до cutoff"""
+    return [key for key in existing_keys() if month_bounds(key)[1] <= cutoff]
+
+
+def delete_plant_readings(sender, instance, **kwargs):
+    """
+    pre_delete UserPlant: каскад Django не знає про місячні таблиці,
+    а FK у них перевіряється при COMMIT
+    """
+    for key in existing_keys():
+        partition_model(key).objects.filter(user_plant_id=instance.pk).delete()
+
+
+class PartitionedReadings:
+    """
+    Показники з кількох таблиць як один список, відсортований за
+    -recorded_at: count() та зрізи для Paginator, get() для retrieve
+
+    Зріз [a:b] читає перші b рядків кожної таблиці та зливає їх.
+    """
+
+    ordered = True
+
+    def __init__(self, querysets, model):
+        self.querysets = [queryset.order_by('-recorded_at') for queryset in querysets]
+        self.model = model
+
+    def count(self):
+        return sum(queryset.count() for queryset in self.querysets)
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+
+        start, stop = index.start or 0, index.stop
+        heads = [queryset[:stop] if stop is not None else queryset for queryset in self.querysets]
+        rows = heapq.merge(*heads, key=attrgetter('recorded_at'), reverse=True)
+        return list(islice(rows, start, stop))
+
+    def __iter__(self):
+        return iter(self[:])
+
+    def get(self, **kwargs):
+        for queryset in self.querysets:
+            obj = queryset.filter(**kwargs).first()
+            if obj is not None:
+                return obj
+        raise self.model.DoesNotExist(f'{self.model._meta.object_name} matching query does not exist.')
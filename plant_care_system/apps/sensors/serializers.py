@@ -1,36 +1,22 @@
 from rest_framework import serializers
+from django.conf import settings
+from django.urls import reverse
 from django.utils.translation import gettext_lazy as _
-from .models import SensorData
+from apps.plants.models import UserPlant
+from .models import SensorData, SensorDevice, SensorExportJob, SensorLatestReading
+from .services import SensorDataService
 
 
-class SensorDataSerializer(serializers.ModelSerializer):
-    """Serializer для даних сенсорів"""
-    plant_name = serializers.CharField(source='user_plant.custom_name', read_only=True)
-    
-    class Meta:
-        model = SensorData
-        fields = [
-            'id', 'user_plant', 'plant_name',
-            'temperature', 'soil_humidity', 'air_humidity', 'light_level',
-            'recorded_at'
-        ]
-        read_only_fields = ['id', 'recorded_at']
-    
-    def validate_user_plant(self, value):
-        """Перевірка що рослина належить користувачу"""
-        user = self.context['request'].user
-        if value.user != user:
-            raise serializers.ValidationError(_("This plant does not belong to you"))
-        
-        if not user.is_premium_active:
-            raise serializers.ValidationError(
-                _("Sensor data is only available for Premium users")
-            )
-        
-        return value
+def in_range(field, value):
+    low, high = SensorData.VALUE_RANGES[field]
+    return low <= value <= high
+
+
+class SensorValuesValidationMixin:
+    """Перевірка діапазонів показників сенсорів"""
     
     def validate_temperature(self, value):
-        if value < -50 or value > 60:
+        if not in_range('temperature', value):
             raise serializers.ValidationError(
                 _("Temperature must be between -50°C and 60°C")
             )
@@ -39,7 +25,7 @@ class SensorDataSerializer(serializers.ModelSerializer):
     def validate_soil_humidity(self, value):
         # ЗМІНЕНО: soil_humidity тепер опціональний
         if value is not None:
-            if value < 0 or value > 100:
+            if not in_range('soil_humidity', value):
                 raise serializers.ValidationError(
                     _("Soil humidity must be between 0% and 100%")
                 )
@@ -48,18 +34,141 @@ class SensorDataSerializer(serializers.ModelSerializer):
     # ДОДАНО: валідація вологості повітря
     def validate_air_humidity(self, value):
         if value is not None:
-            if value < 0 or value > 100:
+            if not in_range('air_humidity', value):
                 raise serializers.ValidationError(
                     _("Air humidity must be between 0% and 100%")
                 )
         return value
 
     def validate_light_level(self, value):
-        if value < 0 or value > 200000:
+        if not in_range('light_level', value):
             raise serializers.ValidationError(
                 _("Light level must be between 0 and 200000 lux")
             )
         return value
+    
+    def validate_recorded_at(self, value):
+        earliest, latest = SensorData.recorded_at_bounds()
+        if value > latest:
+            raise serializers.ValidationError(
+                _("Recorded time is too far in the future, check the device clock")
+            )
+        if value < earliest:
+            raise serializers.ValidationError(
+                _("Recorded time is older than the backfill limit ({earliest})").format(
+                    earliest=earliest.isoformat(timespec='seconds')
+                )
+            )
+        return value
+    
+    def validate(self, attrs):
+        """Перевірка min/max агрегованого запису: ті ж діапазони та min <= середнє <= max"""
+        attrs = super().validate(attrs)
+        
+        for field in ('temperature', 'air_humidity', 'light_level'):
+            value = attrs.get(field)
+            low = attrs.get(f'{field}_min')
+            high = attrs.get(f'{field}_max')
+            
+            for name, bound in ((f'{field}_min', low), (f'{field}_max', high)):
+                if bound is None:
+                    continue
+                try:
+                    getattr(self, f'validate_{field}')(bound)
+                except serializers.ValidationError as e:
+                    raise serializers.ValidationError({name: e.detail})
+            
+            if value is not None and (
+                (low is not None and low > value) or (high is not None and high < value)
+            ):
+                raise serializers.ValidationError({
+                    field: _("Value must be between the reported min and max")
+                })
+        
+        return attrs
+
+
+class SensorDataSerializer(SensorValuesValidationMixin, serializers.ModelSerializer):
+    """Serializer для даних сенсорів"""
+    plant_name = serializers.CharField(source='user_plant.custom_name', read_only=True)
+    
+    default_error_messages = {
+        'duplicate_reading': _("Reading with this id is already stored"),
+    }
+    
+    class Meta:
+        model = SensorData
+        fields = [
+            'id', 'user_plant', 'plant_name',
+            'temperature', 'soil_humidity', 'air_humidity', 'light_level',
+            *SensorData.AGGREGATE_FIELDS,
+            'client_reading_id',
+            'recorded_at'
+        ]
+        read_only_fields = ['id']
+    
+    def validate_user_plant(self, value):
+        """Перевірка що рослина належить користувачу"""
+        user = self.context['request'].user
+        # user_id замість value.user - без запиту до users на кожен показник
+        if value.user_id != user.id:
+            raise serializers.ValidationError(_("This plant does not belong to you"))
+        
+        if not user.is_premium_active:
+            raise serializers.ValidationError(
+                _("Sensor data is only available for Premium users")
+            )
+        
+        return value
+    
+    def validate(self, attrs):
+        attrs = super().validate(attrs)
+        
+        client_reading_id = attrs.get('client_reading_id')
+        if client_reading_id and SensorDataService.reading_exists(attrs['user_plant'].pk, client_reading_id):
+            raise serializers.ValidationError({
+                'client_reading_id': [self.error_messages['duplicate_reading']]
+            })
+        
+        return attrs
+
+
+class SensorReadingSerializer(SensorValuesValidationMixin, serializers.ModelSerializer):
+    """
+    Serializer для одного показника у пакеті
+    
+    Власність рослин перевіряється один раз на пакет: у context['plant_ids']
+    передається множина id рослин користувача, тому тут немає запитів до БД.
+    """
+    user_plant = serializers.IntegerField()
+    
+    class Meta:
+        model = SensorData
+        fields = [
+            'user_plant',
+            'temperature', 'soil_humidity', 'air_humidity', 'light_level',
+            *SensorData.AGGREGATE_FIELDS,
+            'client_reading_id',
+            'recorded_at'
+        ]
+        # Дублікати client_reading_id перевіряються одним запитом на пакет
+        # (SensorDataService.drop_duplicates), а не запитом на кожен показник
+        validators = []
+    
+    def validate_user_plant(self, value):
+        if value not in self.context['plant_ids']:
+            raise serializers.ValidationError(_("Plant not found or does not belong to you"))
+        return value
+
+
+class SensorDataBatchSerializer(serializers.Serializer):
+    """Serializer для пакетного завантаження показників"""
+    readings = serializers.ListField(
+        child=serializers.DictField(),
+        allow_empty=False,
+        max_length=settings.SENSOR_BATCH_MAX_SIZE,
+        help_text=_("List of readings: user_plant, temperature, air_humidity, soil_humidity, light_level")
+    )
 
 
 class SensorDataChartSerializer(serializers.Serializer):
@@ -68,7 +177,133 @@ class SensorDataChartSerializer(serializers.Serializer):
     soil_humidity = serializers.DecimalField(max_digits=5, decimal_places=2, required=False, allow_null=True)
     air_humidity = serializers.DecimalField(max_digits=5, decimal_places=2, required=False, allow_null=True)
     light_level = serializers.IntegerField()
+    sample_count = serializers.IntegerField()
+    temperature_min = serializers.DecimalField(max_digits=4, decimal_places=1, allow_null=True)
+    temperature_max = serializers.DecimalField(max_digits=4, decimal_places=1, allow_null=True)
+    air_humidity_min = serializers.DecimalField(max_digits=5, decimal_places=2, allow_null=True)
+    air_humidity_max = serializers.DecimalField(max_digits=5, decimal_places=2, allow_null=True)
+    light_level_min = serializers.IntegerField(allow_null=True)
+    light_level_max = serializers.IntegerField(allow_null=True)
     recorded_at = serializers.DateTimeField()
+    filled = serializers.BooleanField(
+        default=False,
+        help_text=_("Point added for an unchanged value (no reading was sent)")
+    )
+
+
+class SensorLatestReadingSerializer(serializers.ModelSerializer):
+    """Serializer для останнього показника рослини"""
+    
+    class Meta:
+        model = SensorLatestReading
+        fields = ['temperature', 'soil_humidity', 'air_humidity', 'light_level', 'recorded_at']
+
+
+class SensorMetricStatisticsSerializer(serializers.Serializer):
+    """Статистика одного показника за період"""
+    count = serializers.IntegerField(help_text=_("Number of raw readings with this value"))
+    min = serializers.FloatField(allow_null=True)
+    max = serializers.FloatField(allow_null=True)
+    avg = serializers.FloatField(allow_null=True)
+
+
+class SensorStatisticsSerializer(serializers.Serializer):
+    """Serializer для статистики показників рослини за період"""
+    start = serializers.DateTimeField()
+    end = serializers.DateTimeField()
+    reading_count = serializers.IntegerField()
+    temperature = SensorMetricStatisticsSerializer()
+    air_humidity = SensorMetricStatisticsSerializer()
+    soil_humidity = SensorMetricStatisticsSerializer()
+    light_level = SensorMetricStatisticsSerializer()
+
+
+class SensorDeviceSerializer(serializers.ModelSerializer):
+    """Serializer для пристроїв (bridge) з API ключем"""
+    plants = serializers.PrimaryKeyRelatedField(
+        many=True,
+        required=False,
+        queryset=UserPlant.objects.none(),
+        help_text=_("IDs of plants this device may send readings for")
+    )
+    
+    class Meta:
+        model = SensorDevice
+        fields = ['id', 'name', 'plants', 'key_prefix', 'is_active', 'last_seen_at', 'created_at']
+        read_only_fields = ['id', 'key_prefix', 'last_seen_at', 'created_at']
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request:
+            # Дозволені тільки рослини поточного користувача
+            self.fields['plants'].child_relation.queryset = UserPlant.objects.filter(user=request.user)
+    
+    def create(self, validated_data):
+        plants = validated_data.pop('plants', [])
+        device = SensorDevice(**validated_data)
+        # Ключ у відкритому вигляді доступний тільки у відповіді на створення
+        device.api_key = device.set_new_key()
+        device.save()
+        device.plants.set(plants)
+        return device
+
+
+class SensorDeviceKeySerializer(SensorDeviceSerializer):
+    """Відповідь зі згенерованим ключем - показується тільки один раз"""
+    api_key = serializers.CharField(read_only=True)
+    
+    class Meta(SensorDeviceSerializer.Meta):
+        fields = SensorDeviceSerializer.Meta.fields + ['api_key']
+
+
+class SensorExportJobSerializer(serializers.ModelSerializer):
+    """Serializer для фонового експорту показників"""
+    plants = serializers.PrimaryKeyRelatedField(
+        many=True,
+        required=False,
+        queryset=UserPlant.objects.none(),
+        help_text=_("IDs of plants to export (default: all your plants)")
+    )
+    download_url = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = SensorExportJob
+        fields = [
+            'id', 'plants', 'start', 'end', 'status',
+            'file_size', 'row_count', 'error', 'download_url',
+            'created_at', 'started_at', 'finished_at'
+        ]
+        read_only_fields = [
+            'id', 'status', 'file_size', 'row_count', 'error',
+            'created_at', 'started_at', 'finished_at'
+        ]
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request:
+            # Дозволені тільки рослини поточного користувача
+            self.fields['plants'].child_relation.queryset = UserPlant.objects.filter(user=request.user)
+    
+    def get_download_url(self, obj):
+        if obj.status != SensorExportJob.STATUS_DONE:
+            return None
+        request = self.context.get('request')
+        url = reverse('sensor-export-download', args=[obj.pk])
+        return request.build_absolute_uri(url) if request else url
+    
+    def validate(self, attrs):
+        start, end = attrs.get('start'), attrs.get('end')
+        if start and end and start >= end:
+            raise serializers.ValidationError({'end': _("End must be later than start")})
+        return attrs
+    
+    def create(self, validated_data):
+        plants = validated_data.pop('plants', None) or UserPlant.objects.filter(user=validated_data['user'])
+        job = SensorExportJob.objects.create(**validated_data)
+        job.plants.set(plants)
+        return job
 
 
 # ДОДАНО: Serializer для призначення Arduino рослині
@@ -1,7 +1,27 @@
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone as dt_timezone
 import csv
-from io import StringIO
+import gzip
+import heapq
+import logging
+import os
 import random
+import threading
+import uuid
+from operator import itemgetter
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+
+logger = logging.getLogger(__name__)
+
+
+class EchoBuffer:
+    """Псевдо-файл для csv.writer: writerow повертає рядок замість запису"""
+    
+    def write(self, value):
+        return value
 
 
 class SensorDataService:
@@ -12,6 +32,7 @@ class SensorDataService:
         """
         Генерація тестових даних сенсорів (для емуляції без Arduino)
         """
+        from apps.sensors import partitions
         from apps.sensors.models import SensorData
         
         plant_type = user_plant.plant_type
@@ -41,80 +62,1223 @@ class SensorDataService:
             int(light_range[1] * 1.2)
         )
         
-        sensor_data = SensorData.objects.create(
-            user_plant=user_plant,
-            temperature=round(temp, 1),
-            soil_humidity=round(soil_humidity, 2) if soil_humidity else None,
-            air_humidity=round(air_humidity, 2),
-            light_level=light
-        )
+        with transaction.atomic():
+            sensor_data = SensorData(
+                user_plant=user_plant,
+                temperature=round(temp, 1),
+                soil_humidity=round(soil_humidity, 2) if soil_humidity else None,
+                air_humidity=round(air_humidity, 2),
+                light_level=light
+            )
+            partitions.bulk_create([sensor_data])
+            SensorDataService.readings_saved([sensor_data])
         
         user_plant.update_status()
         
         return sensor_data
     
     @staticmethod
-    def get_chart_data(user_plant, period='week'):
+    def owned_plant_ids(user, requested_ids, plant_ids=None):
         """
-        Отримати дані для графіку
-        period: 'day', 'week', 'month'
+        Які з requested_ids дозволені: plant_ids пристрою (з кешу авторизації)
+        або рослини користувача - одним запитом
+        """
+        from apps.plants.models import UserPlant
+        
+        if plant_ids is not None:
+            return plant_ids & set(requested_ids)
+        
+        return set(
+            UserPlant.objects.filter(
+                user=user,
+                id__in=requested_ids
+            ).values_list('id', flat=True)
+        )
+    
+    @staticmethod
+    def reading_exists(user_plant_id, client_reading_id):
+        """Чи вже збережено показник рослини з цим client_reading_id (у будь-якій таблиці)"""
+        from apps.sensors import partitions
+        
+        return any(
+            queryset.filter(user_plant_id=user_plant_id, client_reading_id=client_reading_id).exists()
+            for queryset in partitions.readings()
+        )
+    
+    @staticmethod
+    def drop_duplicates(objects):
+        """
+        Відокремити показники з client_reading_id, які вже збережені
+        або повторюються в самому пакеті
+        
+        Один запит по унікальному індексу (user_plant, client_reading_id)
+        на кожну таблицю показників (partitions.readings).
+        Одночасні повтори того ж пакета відсікає ignore_conflicts у bulk_create.
+        Returns: (нові показники, множина індексів дублікатів у objects)
+        """
+        from apps.sensors import partitions
+        
+        keys = {
+            (obj.user_plant_id, obj.client_reading_id)
+            for obj in objects if obj.client_reading_id is not None
+        }
+        if not keys:
+            return objects, set()
+        
+        seen = set()
+        client_ids = list({client_id for _, client_id in keys})
+        for queryset in partitions.readings():
+            for start in range(0, len(client_ids), 500):
+                seen.update(
+                    queryset.filter(
+                        user_plant_id__in={plant_id for plant_id, _ in keys},
+                        client_reading_id__in=client_ids[start:start + 500]
+                    ).values_list('user_plant_id', 'client_reading_id')
+                )
+        
+        unique = []
+        duplicates = set()
+        for index, obj in enumerate(objects):
+            if obj.client_reading_id is not None:
+                key = (obj.user_plant_id, obj.client_reading_id)
+                if key in seen:
+                    duplicates.add(index)
+                    continue
+                seen.add(key)
+            unique.append(obj)
+        
+        return unique, duplicates
+    
+    @staticmethod
+    def save_readings(objects):
+        """
+        Записати показники, їх агрегати та останній показник рослин в одній транзакції
+        
+        З SENSOR_GROUP_COMMIT запис іде через спільний writer процесу
+        (write_buffer), який об'єднує одночасні запити в одну транзакцію.
+        В обох випадках функція повертається після COMMIT.
+        """
+        from apps.sensors import partitions
+        
+        if settings.SENSOR_GROUP_COMMIT:
+            from apps.sensors.write_buffer import save_readings
+            save_readings(objects)
+            return
+        
+        with transaction.atomic():
+            partitions.bulk_create(objects, ignore_conflicts=True)
+            SensorDataService.readings_saved(objects)
+    
+    @staticmethod
+    def readings_saved(objects):
+        """
+        Оновити похідні дані після запису показників: погодинні/добові
+        агрегати та останній показник рослин
+        
+        Викликається всередині транзакції запису (bulk_create, create) -
+        похідні дані комітяться разом із показниками.
+        """
+        SensorRollupService.refresh(objects)
+        SensorDataService.update_latest_readings(objects)
+    
+    @staticmethod
+    def update_latest_readings(objects):
+        """
+        Оновити SensorLatestReading рослин з objects
+        
+        Знімок замінюється тільки пізнішим показником: запізнілий показник
+        (backfill, spool bridge) не стає "останнім". Один запит на читання
+        знімків та один upsert на весь пакет.
+        """
+        from apps.sensors.models import SensorLatestReading
+        
+        newest = {}
+        for obj in objects:
+            current = newest.get(obj.user_plant_id)
+            if current is None or obj.recorded_at >= current.recorded_at:
+                newest[obj.user_plant_id] = obj
+        if not newest:
+            return
+        
+        stored = dict(
+            SensorLatestReading.objects.filter(
+                user_plant_id__in=newest
+            ).values_list('user_plant_id', 'recorded_at')
+        )
+        
+        snapshots = [
+            SensorLatestReading(
+                user_plant_id=plant_id,
+                temperature=obj.temperature,
+                soil_humidity=obj.soil_humidity,
+                air_humidity=obj.air_humidity,
+                light_level=obj.light_level,
+                recorded_at=obj.recorded_at
+            )
+            for plant_id, obj in newest.items()
+            if plant_id not in stored or obj.recorded_at >= stored[plant_id]
+        ]
+        SensorLatestReading.objects.bulk_create(
+            snapshots,
+            update_conflicts=True,
+            unique_fields=['user_plant'],
+            update_fields=['temperature', 'soil_humidity', 'air_humidity', 'light_level', 'recorded_at', 'updated_at']
+        )
+    
+    @staticmethod
+    def ingest_batch(user, readings, plant_ids=None):
+        """
+        Пакетне збереження показників сенсорів
+        
+        Власність рослин визначається одним запитом на весь пакет
+        (або з plant_ids пристрою без запиту), валідні показники
+        записуються одним bulk_create в одній транзакції.
+        Показники з уже збереженим client_reading_id пропускаються
+        (status duplicate), тому повторна відправка пакета безпечна.
+        Returns: dict зі звітом accepted/duplicate/rejected для кожного елемента
+        """
+        from rest_framework.exceptions import ValidationError
+        from rest_framework.serializers import as_serializer_error
+        from apps.sensors.models import SensorData
+        from apps.sensors.serializers import SensorReadingSerializer
+        
+        requested_ids = set()
+        for item in readings:
+            try:
+                requested_ids.add(int(item.get('user_plant')))
+            except (TypeError, ValueError):
+                continue
+        
+        # Один serializer на пакет: поля будуються один раз, а не для кожного показника
+        serializer = SensorReadingSerializer(context={
+            'plant_ids': SensorDataService.owned_plant_ids(user, requested_ids, plant_ids)
+        })
+        
+        objects = []
+        results = []
+        
+        for index, item in enumerate(readings):
+            try:
+                values = dict(serializer.run_validation(item))
+            except ValidationError as exc:
+                results.append({
+                    'index': index,
+                    'status': 'rejected',
+                    'errors': as_serializer_error(exc)
+                })
+                continue
+            
+            objects.append(SensorData(
+                user_plant_id=values.pop('user_plant'),
+                **values
+            ))
+            results.append({'index': index, 'status': 'accepted'})
+        
+        objects, duplicates = SensorDataService.drop_duplicates(objects)
+        if duplicates:
+            accepted_results = [result for result in results if result['status'] == 'accepted']
+            for position in duplicates:
+                accepted_results[position]['status'] = 'duplicate'
+        
+        SensorDataService.save_readings(objects)
+        
+        return {
+            'accepted': len(objects),
+            'duplicates': len(duplicates),
+            'rejected': len(results) - len(objects) - len(duplicates),
+            'results': results
+        }
+    
+    @staticmethod
+    def parse_data_line(line):
+        """
+        Розбір рядка Arduino (bytes):
+        DATA,<plant_id>,<temp>,<humidity>,<light>[,<reading_id>[,<recorded_at>]]
+        recorded_at - unix time пристрою; reading_id може бути порожнім
+        
+        Returns: (plant_id, temperature, air_humidity, light_level,
+        reading_id або None, recorded_at або None) або None
+        для порожніх рядків та рядків без префікса DATA (DEBUG вивід Arduino)
+        Raises: ValueError з повідомленням для API, якщо рядок некоректний
+        """
+        from apps.sensors.models import SensorData
+        
+        line = line.strip()
+        if not line.startswith(b'DATA,'):
+            return None
+        
+        parts = line.split(b',')
+        if not 5 <= len(parts) <= 7:
+            raise ValueError(
+                'Expected DATA,<plant_id>,<temperature>,<air_humidity>,<light_level>[,<reading_id>[,<recorded_at>]]'
+            )
+        
+        try:
+            plant_id = int(parts[1])
+            temperature = float(parts[2])
+            air_humidity = float(parts[3])
+            light_level = int(parts[4])
+        except ValueError:
+            raise ValueError('Invalid number')
+        
+        ranges = SensorData.VALUE_RANGES
+        if not ranges['temperature'][0] <= temperature <= ranges['temperature'][1]:
+            raise ValueError('Temperature must be between -50°C and 60°C')
+        if not ranges['air_humidity'][0] <= air_humidity <= ranges['air_humidity'][1]:
+            raise ValueError('Air humidity must be between 0% and 100%')
+        if not ranges['light_level'][0] <= light_level <= ranges['light_level'][1]:
+            raise ValueError('Light level must be between 0 and 200000 lux')
+        
+        reading_id = None
+        if len(parts) >= 6 and (len(parts) == 6 or parts[5]):
+            reading_id = parts[5].decode('ascii', errors='replace')
+            if not 0 < len(reading_id) <= 64:
+                raise ValueError('Reading id must be 1-64 characters')
+        
+        recorded_at = None
+        if len(parts) == 7:
+            try:
+                recorded_at = datetime.fromtimestamp(float(parts[6]), tz=dt_timezone.utc)
+            except (ValueError, OverflowError, OSError):
+                raise ValueError('Invalid recorded_at, expected unix time')
+            earliest, latest = SensorData.recorded_at_bounds()
+            if recorded_at > latest:
+                raise ValueError('Recorded time is too far in the future, check the device clock')
+            if recorded_at < earliest:
+                raise ValueError(
+                    f'Recorded time is older than the backfill limit ({earliest.isoformat(timespec="seconds")})'
+                )
+        
+        return plant_id, temperature, air_humidity, light_level, reading_id, recorded_at
+    
+    @staticmethod
+    def ingest_lines(user, lines, plant_ids=None):
+        """
+        Збереження показників у форматі Arduino: DATA,<plant_id>,<temp>,<humidity>,<light>
+        
+        Один прохід по рядках без серіалізаторів (parse_data_line), потім
+        один запит на власність рослин та bulk_create. Порожні рядки та
+        рядки без префікса DATA пропускаються, рядки з уже збереженим
+        reading_id рахуються як duplicates.
+        Returns: dict з кількістю accepted/duplicates/rejected/ignored та помилками по номерах рядків
         """
         from apps.sensors.models import SensorData
         
-        now = datetime.now()
+        rows = []
+        errors = []
+        ignored = 0
         
+        for number, line in enumerate(lines, start=1):
+            try:
+                values = SensorDataService.parse_data_line(line)
+            except ValueError as e:
+                errors.append({'line': number, 'error': str(e)})
+                continue
+            
+            if values is None:
+                if line.strip():
+                    ignored += 1
+                continue
+            
+            rows.append((number, *values))
+        
+        plant_ids = SensorDataService.owned_plant_ids(user, {row[1] for row in rows}, plant_ids)
+        
+        objects = []
+        now = timezone.now()
+        for number, plant_id, temperature, air_humidity, light_level, reading_id, recorded_at in rows:
+            if plant_id not in plant_ids:
+                errors.append({'line': number, 'error': 'Plant not found or does not belong to you'})
+                continue
+            objects.append(SensorData(
+                user_plant_id=plant_id,
+                temperature=temperature,
+                air_humidity=air_humidity,
+                light_level=light_level,
+                client_reading_id=reading_id,
+                recorded_at=recorded_at or now
+            ))
+        
+        objects, duplicates = SensorDataService.drop_duplicates(objects)
+        
+        SensorDataService.save_readings(objects)
+        
+        errors.sort(key=lambda error: error['line'])
+        return {
+            'accepted': len(objects),
+            'duplicates': len(duplicates),
+            'rejected': len(errors),
+            'ignored': ignored,
+            'errors': errors
+        }
+    
+    @staticmethod
+    def period_start(period, now):
+        """Початок періоду графіку/статистики: 'day', 'week' (за замовчуванням), 'month'"""
         if period == 'day':
-            start_time = now - timedelta(days=1)
-        elif period == 'week':
-            start_time = now - timedelta(days=7)
+            return now - timedelta(days=1)
         elif period == 'month':
-            start_time = now - timedelta(days=30)
-        else:
-            start_time = now - timedelta(days=7)
+            return now - timedelta(days=30)
+        return now - timedelta(days=7)
+    
+    @staticmethod
+    def get_chart_data(user_plant, period='week', max_points=None):
+        """
+        Отримати дані для графіку
+        period: 'day', 'week', 'month'
+        max_points: не більше стількох точок (LTTB), None - усі
+        """
+        from apps.sensors import partitions
+        from apps.sensors.models import SensorData
         
-        data = SensorData.objects.filter(
-            user_plant=user_plant,
-            recorded_at__gte=start_time
-        ).order_by('recorded_at').values(
+        now = timezone.now()
+        start_time = SensorDataService.period_start(period, now)
+        
+        # Довгі періоди - з погодинних/добових агрегатів замість усіх показників
+        resolution = SensorRollupService.chart_resolution(now - start_time)
+        if resolution:
+            points = SensorRollupService.chart_points(user_plant, resolution, start_time)
+            return SensorDataService.downsample(points, max_points)
+        
+        fields = [
             'temperature',
             'soil_humidity',
             'air_humidity',  # ДОДАНО
             'light_level',
+            *SensorData.AGGREGATE_FIELDS,
             'recorded_at'
+        ]
+        
+        data = heapq.merge(
+            *(
+                queryset.filter(user_plant=user_plant).order_by('recorded_at').values(*fields)
+                for queryset in partitions.readings(start=start_time)
+            ),
+            key=itemgetter('recorded_at')
         )
         
-        return list(data)
+        # Останній показник до періоду - найпізніший з таблиць до start_time
+        candidates = [
+            queryset.filter(user_plant=user_plant).order_by('-recorded_at').values(*fields).first()
+            for queryset in partitions.readings(end=start_time)
+        ]
+        previous = max(
+            (row for row in candidates if row is not None),
+            key=itemgetter('recorded_at'),
+            default=None
+        )
+        
+        points = SensorDataService._fill_unchanged(list(data), previous, start_time, now)
+        return SensorDataService.downsample(points, max_points)
     
     @staticmethod
-    def export_to_csv(user_plant):
+    def downsample(points, max_points):
         """
-        Експорт даних сенсорів у CSV формат
+        Залишити max_points точок графіку, зберігаючи форму кривих
+        (Largest-Triangle-Three-Buckets)
+        
+        Точки ділимо на max_points - 2 кошики, перша й остання лишаються.
+        З кожного кошика береться точка, що утворює найбільший трикутник з
+        попередньою вибраною точкою та середнім наступного кошика - так
+        зберігаються піки та різкі зміни. Точка графіку містить усі
+        показники, тому площа - сума площ по показниках, нормованих на
+        їх діапазон: температура не переважає освітленість через масштаб.
         """
-        from apps.sensors.models import SensorData
+        count = len(points)
+        if not max_points or count <= max_points:
+            return points
+        
+        times = [point['recorded_at'].timestamp() for point in points]
+        series = []
+        for field in ('temperature', 'air_humidity', 'soil_humidity', 'light_level'):
+            values = [None if point[field] is None else float(point[field]) for point in points]
+            present = [value for value in values if value is not None]
+            if not present:
+                continue
+            low, scale = min(present), (max(present) - min(present)) or 1.0
+            series.append([None if value is None else (value - low) / scale for value in values])
+        
+        def bucket_average(start, end):
+            average_time = sum(times[start:end]) / (end - start)
+            averages = []
+            for values in series:
+                present = [value for value in values[start:end] if value is not None]
+                averages.append(sum(present) / len(present) if present else None)
+            return average_time, averages
+        
+        every = (count - 2) / (max_points - 2)
+        selected = [0]
+        previous = 0
+        
+        for bucket in range(max_points - 2):
+            start = int(bucket * every) + 1
+            end = int((bucket + 1) * every) + 1
+            next_time, next_values = bucket_average(end, min(int((bucket + 2) * every) + 1, count))
+            
+            best, best_area = start, -1.0
+            for index in range(start, end):
+                area = 0.0
+                for values, next_value in zip(series, next_values):
+                    a, b = values[previous], values[index]
+                    if a is None or b is None or next_value is None:
+                        continue
+                    area += abs(
+                        (times[previous] - next_time) * (b - a)
+                        - (times[previous] - times[index]) * (next_value - a)
+                    )
+                if area > best_area:
+                    best, best_area = index, area
+            
+            selected.append(best)
+            previous = best
+        
+        selected.append(count - 1)
+        return [points[index] for index in selected]
+    
+    @staticmethod
+    def _fill_unchanged(points, previous, start_time, end_time):
+        """
+        Пропуски в даних трактуються як "без змін", а не "немає даних"
+        
+        Bridge з deadband надсилає показник лише коли значення змінилось
+        або минуло SENSOR_MAX_SILENCE секунд (heartbeat). Тому пропуск,
+        довший за звичайний інтервал (SENSOR_REPORT_INTERVAL), але не
+        довший за SENSOR_MAX_SILENCE, означає незмінне значення: додаємо
+        точку з попереднім значенням (filled=True), щоб графік був
+        ступінчастим. Довші пропуски лишаються пропусками.
+        
+        Heartbeat надходить з першим показником після SENSOR_MAX_SILENCE,
+        тобто до одного інтервалу пізніше, тому допуск на цей інтервал більший.
+        """
+        max_silence = timedelta(seconds=settings.SENSOR_MAX_SILENCE + settings.SENSOR_REPORT_INTERVAL)
+        step_gap = timedelta(seconds=2 * settings.SENSOR_REPORT_INTERVAL)
+        
+        def hold(point, at):
+            return {**point, 'recorded_at': at, 'filled': True}
+        
+        filled = []
+        last = None
+        
+        if previous and start_time - previous['recorded_at'] <= max_silence:
+            last = hold(previous, start_time)
+            filled.append(last)
+        
+        for point in points:
+            if last and step_gap < point['recorded_at'] - last['recorded_at'] <= max_silence:
+                filled.append(hold(last, point['recorded_at']))
+            filled.append(point)
+            last = point
+        
+        if last and step_gap < end_time - last['recorded_at'] <= max_silence:
+            filled.append(hold(last, end_time))
+        
+        return filled
+    
+    @staticmethod
+    def export_to_csv(user_plant, start=None, end=None):
+        """
+        Експорт даних сенсорів у CSV формат (весь файл одним рядком)
+        """
+        return ''.join(SensorDataService.iter_csv(user_plant, start, end))
+    
+    @staticmethod
+    def iter_csv(user_plant, start=None, end=None, chunk_rows=500):
+        """
+        CSV з показниками рослини частинами по chunk_rows рядків (генератор str)
+        
+        Показники читаються короткими запитами values_list (keyset_rows)
+        без створення моделей, тому пам'ять не залежить від довжини
+        історії, а перша частина готова одразу. start/end (aware datetime)
+        обмежують recorded_at: [start, end).
+        """
+        for text, _ in SensorDataService.csv_chunks(user_plant, start, end, chunk_rows):
+            yield text
+    
+    @staticmethod
+    def keyset_rows(queryset, *fields, page_rows=2000):
+        """
+        Генератор (recorded_at, *fields) у порядку -recorded_at запитами по page_rows рядків
+        
+        Кожна сторінка читається повністю до першого yield: курсор не
+        лишається відкритим, поки клієнт повільно завантажує файл. У SQLite
+        відкритий курсор тримає SHARED блокування, і запис показників
+        чекав би на нього до "database is locked". Наступна сторінка
+        продовжує після (recorded_at, id) останнього рядка - по індексу
+        (user_plant, -recorded_at), без OFFSET.
+        """
+        from django.db.models import Q
+        
+        queryset = queryset.order_by('-recorded_at', '-id')
+        last = None
+        while True:
+            page = queryset
+            if last:
+                page = page.filter(Q(recorded_at__lt=last[0]) | Q(recorded_at=last[0], id__lt=last[1]))
+            rows = list(page.values_list('recorded_at', 'id', *fields)[:page_rows])
+            
+            for row in rows:
+                yield (row[0], *row[2:])
+            
+            if len(rows) < page_rows:
+                return
+            last = rows[-1][:2]
+    
+    @staticmethod
+    def csv_chunks(user_plant, start=None, end=None, chunk_rows=500, include_plant=False, header=True):
+        """
+        Генератор (текст CSV, кількість показників у ньому) для iter_csv
+        та фонового експорту кількох рослин (include_plant - колонки
+        з id та назвою рослини, header=False - без заголовка)
+        """
+        from apps.sensors import partitions
+        
+        writer = csv.writer(EchoBuffer())
+        plant_columns = [user_plant.id, user_plant.custom_name] if include_plant else []
+        
+        if header:
+            # ОНОВЛЕНО: додано air_humidity
+            yield writer.writerow([
+                *(['Plant ID', 'Plant'] if include_plant else []),
+                'Date/Time',
+                'Temperature (°C)',
+                'Air Humidity (%)',
+                'Soil Humidity (%)',
+                'Light Level (lux)'
+            ]), 0
+        
+        # Кожна таблиця читається сторінками у порядку -recorded_at, heapq.merge
+        # зливає їх, тримаючи в пам'яті по одній сторінці з таблиці
+        rows = heapq.merge(
+            *(
+                SensorDataService.keyset_rows(
+                    queryset.filter(user_plant=user_plant),
+                    'temperature', 'air_humidity', 'soil_humidity', 'light_level'
+                )
+                for queryset in partitions.readings(start, end)
+            ),
+            key=itemgetter(0),
+            reverse=True
+        )
+        
+        chunk = []
+        for recorded_at, temperature, air_humidity, soil_humidity, light_level in rows:
+            chunk.append(writer.writerow([
+                *plant_columns,
+                recorded_at.strftime('%Y-%m-%d %H:%M:%S'),
+                temperature,
+                air_humidity if air_humidity else 'N/A',
+                soil_humidity if soil_humidity else 'N/A',
+                light_level
+            ]))
+            if len(chunk) >= chunk_rows:
+                yield ''.join(chunk), len(chunk)
+                chunk = []
+        
+        if chunk:
+            yield ''.join(chunk), len(chunk)
+
+
+class SensorExportService:
+    """Фонові експорти показників у gzip CSV (SensorExportJob)"""
+    
+    @staticmethod
+    def fail_stale(user_id=None):
+        """
+        Позначити як failed експорти (користувача або всі), що не
+        завершились за SENSOR_EXPORT_TIMEOUT: потік живе в процесі
+        веб-сервера, і після перезапуску job лишився б pending/running назавжди
+        
+        Returns: кількість позначених
+        """
+        from django.db.models import Q
+        from apps.sensors.models import SensorExportJob
+        
+        deadline = timezone.now() - timedelta(seconds=settings.SENSOR_EXPORT_TIMEOUT)
+        stale = SensorExportJob.objects.filter(
+            Q(status=SensorExportJob.STATUS_PENDING, created_at__lt=deadline)
+            | Q(status=SensorExportJob.STATUS_RUNNING, started_at__lt=deadline)
+        )
+        if user_id is not None:
+            stale = stale.filter(user_id=user_id)
+        
+        # Спершу читання: без застарілих job запит не бере блокування запису
+        stale_ids = list(stale.values_list('id', flat=True))
+        if not stale_ids:
+            return 0
+        
+        logger.warning('Sensor exports %s did not finish in time, marking them failed', stale_ids)
+        return stale.filter(id__in=stale_ids).update(
+            status=SensorExportJob.STATUS_FAILED,
+            error='Export was interrupted, request it again',
+            finished_at=timezone.now()
+        )
+    
+    @staticmethod
+    def active_count(user_id):
+        """
+        Кількість експортів у роботі (для SENSOR_EXPORT_MAX_ACTIVE)
+        
+        Викликається перед створенням job, тож застарілі тут же
+        позначаються failed і не займають місце.
+        """
+        from apps.sensors.models import SensorExportJob
+        
+        SensorExportService.fail_stale(user_id)
+        return SensorExportJob.objects.filter(
+            user_id=user_id,
+            status__in=SensorExportJob.ACTIVE_STATUSES
+        ).count()
+    
+    @staticmethod
+    def start(job):
+        """Запустити формування файлу у фоновому потоці після COMMIT створення job"""
+        def launch():
+            threading.Thread(
+                target=SensorExportService.run,
+                args=(job.pk,),
+                name=f'sensor-export-{job.pk}',
+                daemon=True
+            ).start()
+        
+        transaction.on_commit(launch)
+    
+    @staticmethod
+    def run(job_id):
+        """Точка входу потоку: власне з'єднання з БД закривається після роботи"""
+        try:
+            SensorExportService.build(job_id)
+        finally:
+            connection.close()
+    
+    @staticmethod
+    def build(job_id):
+        """
+        Сформувати файл job: рослини по черзі, рядки CSV потоком у gzip
+        
+        Файл пишеться у тимчасовий .part і перейменовується тільки після
+        успіху, тому завантажити можна лише повний файл.
+        """
+        from apps.sensors.models import SensorExportJob
+        
+        claimed = SensorExportJob.objects.filter(
+            pk=job_id,
+            status=SensorExportJob.STATUS_PENDING
+        ).update(status=SensorExportJob.STATUS_RUNNING, started_at=timezone.now())
+        if not claimed:
+            return
+        
+        job = SensorExportJob.objects.get(pk=job_id)
+        name = f'{uuid.uuid4().hex}.csv.gz'
+        path = job.file.storage.path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        partial_path = f'{path}.part'
+        
+        rows = 0
+        try:
+            with gzip.open(partial_path, 'wt', compresslevel=6, encoding='utf-8', newline='') as output:
+                for index, plant in enumerate(job.plants.order_by('id')):
+                    chunks = SensorDataService.csv_chunks(
+                        plant, job.start, job.end, include_plant=True, header=index == 0
+                    )
+                    for text, count in chunks:
+                        output.write(text)
+                        rows += count
+            os.replace(partial_path, path)
+        except Exception as e:
+            logger.exception('Sensor export %s failed', job_id)
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+            SensorExportJob.objects.filter(pk=job_id, status=SensorExportJob.STATUS_RUNNING).update(
+                status=SensorExportJob.STATUS_FAILED,
+                error=str(e),
+                finished_at=timezone.now()
+            )
+            return
+        
+        # Тільки job у running: видалений або вже позначений fail_stale не оживає
+        updated = SensorExportJob.objects.filter(pk=job_id, status=SensorExportJob.STATUS_RUNNING).update(
+            status=SensorExportJob.STATUS_DONE,
+            file=name,
+            file_size=os.path.getsize(path),
+            row_count=rows,
+            finished_at=timezone.now()
+        )
+        if not updated:
+            # job видалили або визнали застарілим, поки формувався файл
+            os.remove(path)
+
+
+class SensorRollupService:
+    """Погодинні та добові агрегати показників (SensorRollup)"""
+    
+    RESOLUTION_SECONDS = {'hour': 3600, 'day': 86400}
+    
+    @staticmethod
+    def bucket_start(value, resolution):
+        """
+        Початок години або доби за місцевим часом (TIME_ZONE) -
+        так само, як TruncHour/TruncDay у запитах
+        """
+        local = timezone.localtime(value).replace(tzinfo=None, minute=0, second=0, microsecond=0)
+        if resolution == 'day':
+            local = local.replace(hour=0)
+        return timezone.make_aware(local)
+    
+    @staticmethod
+    def bucket_end(start, resolution):
+        """
+        Початок наступного інтервалу
+        
+        Доба при переході на літній/зимовий час триває 23 або 25 годин,
+        а година, що повторюється восени, потрапляє в один інтервал.
+        """
+        step = timedelta(hours=1)
+        candidate = start.astimezone(dt_timezone.utc) + step
+        while SensorRollupService.bucket_start(candidate, resolution) <= start:
+            candidate += step
+        return SensorRollupService.bucket_start(candidate, resolution)
+    
+    @staticmethod
+    def raw_since(now=None):
+        """
+        Початок першої доби, сирі показники якої зберігаються повністю
+        (SENSOR_RETENTION_RAW_DAYS); None - сирі показники не видаляються
+        
+        Агрегати раніших годин і діб не перераховуються з сирих показників:
+        prune_sensor_data вже видалив частину з них, і перерахунок
+        перезаписав би справжній агрегат неповним.
+        """
+        days = settings.SENSOR_RETENTION_RAW_DAYS
+        if days <= 0:
+            return None
+        start = SensorRollupService.bucket_start((now or timezone.now()) - timedelta(days=days), 'day')
+        return SensorRollupService.bucket_end(start, 'day')
+    
+    @staticmethod
+    def _aggregates():
+        """Агрегати SQL для групи сирих показників (з урахуванням sample_count)"""
+        from django.db.models import Count, F, FloatField, Max, Min, Q, Sum
+        from django.db.models.functions import Coalesce
+        from apps.sensors.models import SensorData, SensorRollup
+        
+        aggregates = {'agg_reading_count': Count('id')}
+        for metric in SensorRollup.METRICS:
+            low = high = metric
+            if f'{metric}_min' in SensorData.AGGREGATE_FIELDS:
+                low = Coalesce(f'{metric}_min', metric)
+                high = Coalesce(f'{metric}_max', metric)
+            aggregates[f'agg_{metric}_count'] = Sum('sample_count', filter=Q(**{f'{metric}__isnull': False}))
+            aggregates[f'agg_{metric}_sum'] = Sum(F(metric) * F('sample_count'), output_field=FloatField())
+            aggregates[f'agg_{metric}_min'] = Min(low)
+            aggregates[f'agg_{metric}_max'] = Max(high)
+        return aggregates
+    
+    @staticmethod
+    def _summary_from_row(row):
+        from apps.sensors.models import SensorRollup
+        
+        summary = {'reading_count': row['agg_reading_count'] or 0}
+        for metric in SensorRollup.METRICS:
+            low, high = row[f'agg_{metric}_min'], row[f'agg_{metric}_max']
+            summary[metric] = {
+                'count': row[f'agg_{metric}_count'] or 0,
+                'sum': row[f'agg_{metric}_sum'] or 0.0,
+                'min': float(low) if low is not None else None,
+                'max': float(high) if high is not None else None,
+            }
+        return summary
+    
+    @staticmethod
+    def _summary_from_rollup(rollup):
+        from apps.sensors.models import SensorRollup
+        
+        summary = {'reading_count': rollup.reading_count}
+        for metric in SensorRollup.METRICS:
+            count = getattr(rollup, f'{metric}_count')
+            average = getattr(rollup, f'{metric}_avg')
+            summary[metric] = {
+                'count': count,
+                'sum': average * count if average is not None else 0.0,
+                'min': getattr(rollup, f'{metric}_min'),
+                'max': getattr(rollup, f'{metric}_max'),
+            }
+        return summary
+    
+    @staticmethod
+    def _merge(summaries):
+        from apps.sensors.models import SensorRollup
+        
+        merged = {'reading_count': 0}
+        for metric in SensorRollup.METRICS:
+            merged[metric] = {'count': 0, 'sum': 0.0, 'min': None, 'max': None}
+        
+        for summary in summaries:
+            merged['reading_count'] += summary['reading_count']
+            for metric in SensorRollup.METRICS:
+                total, part = merged[metric], summary[metric]
+                total['count'] += part['count']
+                total['sum'] += part['sum']
+                if part['min'] is not None and (total['min'] is None or part['min'] < total['min']):
+                    total['min'] = part['min']
+                if part['max'] is not None and (total['max'] is None or part['max'] > total['max']):
+                    total['max'] = part['max']
+        return merged
+    
+    @staticmethod
+    def _rollup_values(summary):
+        """Підсумок -> значення полів SensorRollup"""
+        from apps.sensors.models import SensorRollup
+        
+        values = {'reading_count': summary['reading_count']}
+        for metric in SensorRollup.METRICS:
+            part = summary[metric]
+            values[f'{metric}_count'] = part['count']
+            values[f'{metric}_min'] = part['min']
+            values[f'{metric}_max'] = part['max']
+            values[f'{metric}_avg'] = part['sum'] / part['count'] if part['count'] else None
+        return values
+    
+    @staticmethod
+    def _hourly_summaries(querysets):
+        """
+        Сирі показники (QuerySet-и таблиць з partitions.readings) ->
+        {(plant_id, початок години): підсумок} одним GROUP BY на таблицю
+        """
+        from django.db.models.functions import TruncHour
+        
+        summaries = {}
+        for queryset in querysets:
+            rows = queryset.annotate(
+                bucket=TruncHour('recorded_at')
+            ).order_by().values('user_plant_id', 'bucket').annotate(**SensorRollupService._aggregates())
+            
+            for row in rows:
+                key = (row['user_plant_id'], row['bucket'])
+                summary = SensorRollupService._summary_from_row(row)
+                # Година може бути і в sensor_data, і в таблиці місяця
+                summaries[key] = SensorRollupService._merge([summaries[key], summary]) if key in summaries else summary
+        return summaries
+    
+    @staticmethod
+    def _daily_summaries(hourly_rollups):
+        """Годинні агрегати -> {(plant_id, початок доби): підсумок}"""
+        groups = {}
+        for rollup in hourly_rollups:
+            key = (rollup.user_plant_id, SensorRollupService.bucket_start(rollup.bucket_start, 'day'))
+            groups.setdefault(key, []).append(SensorRollupService._summary_from_rollup(rollup))
+        
+        return {key: SensorRollupService._merge(summaries) for key, summaries in groups.items()}
+    
+    @staticmethod
+    def _save(resolution, summaries):
+        """Upsert агрегатів по унікальному ключу (рослина, resolution, початок)"""
+        from apps.sensors.models import SensorRollup
+        
+        rollups = [
+            SensorRollup(
+                user_plant_id=plant_id,
+                resolution=resolution,
+                bucket_start=bucket,
+                **SensorRollupService._rollup_values(summary)
+            )
+            for (plant_id, bucket), summary in summaries.items()
+        ]
+        update_fields = [
+            field.name for field in SensorRollup._meta.concrete_fields
+            if field.name not in ('id', 'user_plant', 'resolution', 'bucket_start')
+        ]
+        SensorRollup.objects.bulk_create(
+            rollups,
+            batch_size=500,
+            update_conflicts=True,
+            unique_fields=['user_plant', 'resolution', 'bucket_start'],
+            update_fields=update_fields
+        )
+    
+    @staticmethod
+    def _refresh(resolution, touched, summaries):
+        """Зберегти перераховані агрегати; інтервали без показників видалити"""
+        from django.db.models import Q
+        from apps.sensors.models import SensorRollup
+        
+        SensorRollupService._save(resolution, {key: summaries[key] for key in touched if key in summaries})
+        
+        empty = Q()
+        for plant_id, bucket in touched:
+            if (plant_id, bucket) not in summaries:
+                empty |= Q(user_plant_id=plant_id, bucket_start=bucket)
+        if empty:
+            SensorRollup.objects.filter(empty, resolution=resolution).delete()
+    
+    @staticmethod
+    def _bucket_ranges(buckets, resolution, field, chunk_size=100):
+        """
+        {(plant_id, початок інтервалу)} -> список Q по chunk_size діапазонів
+        
+        Суміжні інтервали рослини зливаються в один діапазон [початок, кінець)
+        поля field. Умова розбивається на частини, бо SQLite обмежує глибину
+        виразу, а backfill може торкнутися сотень розрізнених годин.
+        """
+        from django.db.models import Q
+        
+        ranges = []
+        for plant_id, bucket in sorted(buckets):
+            end = SensorRollupService.bucket_end(bucket, resolution)
+            if ranges and ranges[-1][0] == plant_id and ranges[-1][2] == bucket:
+                ranges[-1][2] = end
+            else:
+                ranges.append([plant_id, bucket, end])
+        
+        conditions = []
+        for index in range(0, len(ranges), chunk_size):
+            condition = Q()
+            for plant_id, start, end in ranges[index:index + chunk_size]:
+                condition |= Q(user_plant_id=plant_id, **{f'{field}__gte': start, f'{field}__lt': end})
+            conditions.append(condition)
+        return conditions
+    
+    @staticmethod
+    def refresh(objects):
+        """
+        Перерахувати годинні та добові агрегати, яких торкаються objects
+        
+        Викликається в тій самій транзакції, що й запис показників: SQLite
+        тримає блокування запису до COMMIT, тож паралельний запит не
+        перезапише агрегат застарілими даними. Година перераховується
+        повністю з сирих показників, тому запізнілі (backfill) та повторні
+        (ignore_conflicts) показники не рахуються двічі. Години до raw_since
+        не чіпаються - їх сирі показники могли бути видалені.
+        """
+        from apps.sensors import partitions
+        from apps.sensors.models import SensorRollup
+        
+        raw_since = SensorRollupService.raw_since()
+        hours = {
+            (obj.user_plant_id, SensorRollupService.bucket_start(obj.recorded_at, 'hour'))
+            for obj in objects
+            if raw_since is None or obj.recorded_at >= raw_since
+        }
+        if not hours:
+            return
+        
+        # Читаються лише години, яких торкнулись objects, а не весь період
+        # від найранішої до найпізнішої по всіх рослинах
+        starts = sorted({bucket for _, bucket in hours})
+        tables = partitions.readings(starts[0], SensorRollupService.bucket_end(starts[-1], 'hour'))
+        
+        summaries = SensorRollupService._hourly_summaries(
+            queryset.filter(condition)
+            for condition in SensorRollupService._bucket_ranges(hours, 'hour', 'recorded_at')
+            for queryset in tables
+        )
+        SensorRollupService._refresh('hour', hours, summaries)
+        
+        days = {
+            (plant_id, SensorRollupService.bucket_start(bucket, 'day'))
+            for plant_id, bucket in hours
+        }
+        
+        summaries = SensorRollupService._daily_summaries(
+            rollup
+            for condition in SensorRollupService._bucket_ranges(days, 'day', 'bucket_start')
+            for rollup in SensorRollup.objects.filter(condition, resolution='hour')
+        )
+        SensorRollupService._refresh('day', days, summaries)
+    
+    @staticmethod
+    def rebuild(user_plant_id, since=None):
+        """
+        Перебудувати агрегати рослини з сирих показників (з доби since)
+        
+        Повністю перераховуються тільки доби з raw_since. Старші агрегати -
+        єдина історія після prune_sensor_data, тому для них лише
+        створюються відсутні (перший запуск на базі з давніми показниками),
+        а наявні лишаються як є.
+        Returns: (кількість годинних, кількість добових агрегатів)
+        """
+        from apps.sensors import partitions
+        from apps.sensors.models import SensorRollup
+        
+        if since is not None:
+            since = SensorRollupService.bucket_start(since, 'day')
+        raw_since = SensorRollupService.raw_since()
+        
+        # [since, raw_since) - тільки відсутні агрегати; з full_since - повний перерахунок
+        gaps_until = None
+        full_since = since
+        if raw_since is not None and (since is None or since < raw_since):
+            gaps_until = full_since = raw_since
+        
+        rollups = SensorRollup.objects.filter(user_plant_id=user_plant_id)
+        
+        def raw(start, end=None):
+            return [
+                queryset.filter(user_plant_id=user_plant_id)
+                for queryset in partitions.readings(start, end)
+            ]
+        
+        with transaction.atomic():
+            stale = rollups.filter(bucket_start__gte=full_since) if full_since is not None else rollups
+            stale.delete()
+            
+            hourly = SensorRollupService._hourly_summaries(raw(full_since))
+            SensorRollupService._save('hour', hourly)
+            
+            daily = SensorRollupService._daily_summaries(
+                SensorRollup(
+                    user_plant_id=plant_id,
+                    bucket_start=bucket,
+                    **SensorRollupService._rollup_values(summary)
+                )
+                for (plant_id, bucket), summary in hourly.items()
+            )
+            SensorRollupService._save('day', daily)
+            
+            if gaps_until is None:
+                return len(hourly), len(daily)
+            
+            old = rollups.filter(bucket_start__lt=gaps_until)
+            if since is not None:
+                old = old.filter(bucket_start__gte=since)
+            
+            existing = set(old.filter(resolution='hour').values_list('user_plant_id', 'bucket_start'))
+            missing_hours = {
+                key: summary
+                for key, summary in SensorRollupService._hourly_summaries(raw(since, gaps_until)).items()
+                if key not in existing
+            }
+            SensorRollupService._save('hour', missing_hours)
+            
+            existing = set(old.filter(resolution='day').values_list('user_plant_id', 'bucket_start'))
+            missing_days = {
+                key: summary
+                for key, summary in SensorRollupService._daily_summaries(old.filter(resolution='hour')).items()
+                if key not in existing
+            }
+            SensorRollupService._save('day', missing_days)
+        
+        return len(hourly) + len(missing_hours), len(daily) + len(missing_days)
+    
+    @staticmethod
+    def chart_resolution(span):
+        """
+        Найгрубший агрегат, що дає щонайменше SENSOR_CHART_MIN_POINTS точок
+        за період; None - період короткий, графік будується з сирих показників
+        """
+        for resolution in ('day', 'hour'):
+            if span.total_seconds() / SensorRollupService.RESOLUTION_SECONDS[resolution] >= settings.SENSOR_CHART_MIN_POINTS:
+                return resolution
+        return None
+    
+    @staticmethod
+    def chart_points(user_plant, resolution, start_time):
+        """Точки графіку з агрегатів у форматі агрегованих записів SensorData"""
+        from apps.sensors.models import SensorRollup
+        
+        rollups = SensorRollup.objects.filter(
+            user_plant=user_plant,
+            resolution=resolution,
+            bucket_start__gte=SensorRollupService.bucket_start(start_time, resolution)
+        ).order_by('bucket_start')
+        
+        def as_int(value):
+            return round(value) if value is not None else None
+        
+        return [
+            {
+                'temperature': rollup.temperature_avg,
+                'soil_humidity': rollup.soil_humidity_avg,
+                'air_humidity': rollup.air_humidity_avg,
+                'light_level': as_int(rollup.light_level_avg),
+                'sample_count': rollup.temperature_count,
+                'temperature_min': rollup.temperature_min,
+                'temperature_max': rollup.temperature_max,
+                'air_humidity_min': rollup.air_humidity_min,
+                'air_humidity_max': rollup.air_humidity_max,
+                'light_level_min': as_int(rollup.light_level_min),
+                'light_level_max': as_int(rollup.light_level_max),
+                'recorded_at': rollup.bucket_start,
+            }
+            for rollup in rollups
+        ]
+    
+    @staticmethod
+    def get_statistics(user_plant, start, end):
+        """
+        count/min/max/avg кожного показника за [start, end)
+        
+        Повні доби беруться з добових агрегатів, решта повних годин - з
+        годинних, і тільки неповні години на краях періоду - із сирих
+        показників. Місяць - це ~30 добових рядків замість усіх показників.
+        """
+        from django.db.models import Q
+        from apps.sensors import partitions
+        from apps.sensors.models import SensorRollup
+        
+        bucket_start = SensorRollupService.bucket_start
+        bucket_end = SensorRollupService.bucket_end
+        
+        first_hour = bucket_start(start, 'hour')
+        if first_hour < start:
+            first_hour = bucket_end(first_hour, 'hour')
+        last_hour = bucket_start(end, 'hour')
+        
+        day_range = hour_ranges = None
+        raw_ranges = [(start, end)]
+        
+        if first_hour < last_hour:
+            raw_ranges = [(start, first_hour), (last_hour, end)]
+            hour_ranges = [(first_hour, last_hour)]
+            
+            first_day = bucket_start(first_hour, 'day')
+            if first_day < first_hour:
+                first_day = bucket_end(first_day, 'day')
+            last_day = bucket_start(last_hour, 'day')
+            
+            if first_day < last_day:
+                day_range = (first_day, last_day)
+                hour_ranges = [(first_hour, first_day), (last_day, last_hour)]
+        
+        def between(field, ranges):
+            condition = Q()
+            for low, high in ranges:
+                if low < high:
+                    condition |= Q(**{f'{field}__gte': low, f'{field}__lt': high})
+            return condition
+        
+        summaries = []
+        rollups = SensorRollup.objects.filter(user_plant=user_plant)
+        
+        if day_range:
+            summaries.extend(
+                SensorRollupService._summary_from_rollup(rollup)
+                for rollup in rollups.filter(between('bucket_start', [day_range]), resolution='day')
+            )
+        
+        hours = between('bucket_start', hour_ranges or [])
+        if hours:
+            summaries.extend(
+                SensorRollupService._summary_from_rollup(rollup)
+                for rollup in rollups.filter(hours, resolution='hour')
+            )
+        
+        raw = between('recorded_at', raw_ranges)
+        if raw:
+            summaries.extend(
+                SensorRollupService._summary_from_row(
+                    queryset.filter(raw, user_plant=user_plant).aggregate(**SensorRollupService._aggregates())
+                )
+                for queryset in partitions.readings(start, end)
+            )
         
-        output = StringIO()
-        writer = csv.writer(output)
-        
-        # ОНОВЛЕНО: додано air_humidity
-        writer.writerow([
-            'Date/Time',
-            'Temperature (°C)',
-            'Air Humidity (%)',
-            'Soil Humidity (%)',
-            'Light Level (lux)'
-        ])
-        
-        sensor_data = SensorData.objects.filter(
-            user_plant=user_plant
-        ).order_by('-recorded_at')
-        
-        for data in sensor_data:
-            writer.writerow([
-                data.recorded_at.strftime('%Y-%m-%d %H:%M:%S'),
-                data.temperature,
-                data.air_humidity if data.air_humidity else 'N/A',
-                data.soil_humidity if data.soil_humidity else 'N/A',
-                data.light_level
-            ])
-        
-        return output.getvalue()
\ No newline at end of file
+        merged = SensorRollupService._merge(summaries)
+        statistics = {'start': start, 'end': end, 'reading_count': merged['reading_count']}
+        for metric in SensorRollup.METRICS:
+            part = merged[metric]
+            statistics[metric] = {
+                'count': part['count'],
+                'min': part['min'],
+                'max': part['max'],
+                'avg': part['sum'] / part['count'] if part['count'] else None,
+            }
+        return statistics
@@ -1,18 +1,119 @@
-from rest_framework import viewsets, mixins, status
+from datetime import datetime, timedelta
+import os
+import re
+
+from rest_framework import viewsets, mixins, serializers, status
 from rest_framework.decorators import action
+from rest_framework.parsers import FormParser, MultiPartParser
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from django.http import HttpResponse
-from drf_yasg.utils import swagger_auto_schema
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.decorators import method_decorator
+from django.utils import timezone
+from django.views.decorators.gzip import gzip_page
+from drf_yasg.utils import no_body, swagger_auto_schema
 from drf_yasg import openapi
+from rest_framework_simplejwt.authentication import JWTAuthentication
 
-from .models import SensorData
+from . import partitions
+from .authentication import DeviceKeyAuthentication, DeviceUser, invalidate_device
+from .models import SensorData, SensorDevice, SensorExportJob
 from .serializers import (
     SensorDataSerializer, 
     SensorDataChartSerializer, 
-    AssignSensorSerializer
+    SensorStatisticsSerializer,
+    AssignSensorSerializer,
+    SensorDataBatchSerializer,
+    SensorDeviceSerializer,
+    SensorDeviceKeySerializer,
+    SensorExportJobSerializer
 )
-from .services import SensorDataService
+from .parsers import CompressedJSONParser, PlainTextParser
+from .services import SensorDataService, SensorExportService, SensorRollupService
+
+
+def parse_period_bound(value, end=False):
+    """
+    Межа періоду з query параметра: дата (місцевий час) або ISO 8601
+    
+    Для кінця періоду дата означає весь день включно (до наступної півночі).
+    Returns: aware datetime або None; Raises: ValueError
+    """
+    if not value:
+        return None
+    
+    try:
+        day = parse_date(value)
+        moment = None if day else parse_datetime(value)
+    except ValueError:
+        moment = day = None
+    
+    if day:
+        moment = datetime.combine(day + timedelta(days=1) if end else day, datetime.min.time())
+    if moment is None:
+        raise ValueError(f'Invalid date "{value}", expected YYYY-MM-DD or ISO 8601')
+    
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def ranged_file_response(request, path, content_type, filename, etag):
+    """
+    Віддати файл з підтримкою Range (один діапазон байтів)
+    
+    "Range: bytes=N-" продовжує перерване завантаження (206 Partial Content).
+    If-Range з іншим ETag (файл змінився) - віддається весь файл.
+    Кілька діапазонів або некоректний заголовок ігноруються (200, весь файл).
+    """
+    size = os.path.getsize(path)
+    start, end = 0, size - 1
+    partial = False
+    
+    range_header = request.META.get('HTTP_RANGE', '').strip()
+    if_range = request.META.get('HTTP_IF_RANGE')
+    match = re.fullmatch(r'bytes=(\d*)-(\d*)', range_header)
+    
+    if match and any(match.groups()) and (not if_range or if_range == etag):
+        first, last = match.groups()
+        if first:
+            start = int(first)
+            end = min(int(last), size - 1) if last else size - 1
+        else:
+            start = max(size - int(last), 0)
+        
+        if start >= size or start > end:
+            response = HttpResponse(status=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+        partial = True
+    
+    def read_range():
+        with open(path, 'rb') as stream:
+            stream.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                block = stream.read(min(64 * 1024, remaining))
+                if not block:
+                    break
+                remaining -= len(block)
+                yield block
+    
+    response = StreamingHttpResponse(
+        read_range(),
+        status=status.HTTP_206_PARTIAL_CONTENT if partial else status.HTTP_200_OK,
+        content_type=content_type
+    )
+    response['Content-Length'] = str(end - start + 1)
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    if partial:
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
 
 
 class SensorDataViewSet(mixins.CreateModelMixin,
@@ -22,11 +123,29 @@ class SensorDataViewSet(mixins.CreateModelMixin,
     """ViewSet для даних сенсорів (тільки Premium)"""
     permission_classes = [IsAuthenticated]
     serializer_class = SensorDataSerializer
+    # Bridge може надсилати показники з Content-Encoding: gzip
+    parser_classes = [CompressedJSONParser, FormParser, MultiPartParser]
+    # Endpoint-и ingest приймають також API ключ пристрою (SensorDevice)
+    ingest_authentication_classes = [DeviceKeyAuthentication, JWTAuthentication]
+    
+    @staticmethod
+    def device_plant_ids(request):
+        """Рослини пристрою з кешу авторизації; None - запит з JWT користувача"""
+        if isinstance(request.user, DeviceUser):
+            return request.user.plant_ids
+        return None
     
     def get_queryset(self):
-        return SensorData.objects.filter(
-            user_plant__user=self.request.user
-        ).select_related('user_plant', 'user_plant__plant_type')
+        querysets = [
+            queryset.filter(
+                user_plant__user=self.request.user
+            ).select_related('user_plant', 'user_plant__plant_type')
+            for queryset in partitions.readings()
+        ]
+        if len(querysets) == 1:
+            return querysets[0]
+        # ДОДАНО: показники в кількох таблицях (SENSOR_PARTITIONING)
+        return partitions.PartitionedReadings(querysets, SensorData)
     
     def create(self, request, *args, **kwargs):
         """
@@ -43,6 +162,164 @@ class SensorDataViewSet(mixins.CreateModelMixin,
             )
         return super().create(request, *args, **kwargs)
     
+    def perform_create(self, serializer):
+        instance = SensorData(**serializer.validated_data)
+        
+        if settings.SENSOR_GROUP_COMMIT:
+            # Одиночний показник теж іде через group commit writer;
+            # конфлікт client_reading_id writer пропускає, і pk лишається None
+            SensorDataService.save_readings([instance])
+            duplicate = instance.pk is None and instance.client_reading_id is not None
+        else:
+            try:
+                with transaction.atomic():
+                    partitions.bulk_create([instance])
+                    SensorDataService.readings_saved([instance])
+                duplicate = False
+            except IntegrityError:
+                # Одночасний повтор того ж показника записався між validate та INSERT
+                if not instance.client_reading_id or not SensorDataService.reading_exists(
+                    instance.user_plant_id, instance.client_reading_id
+                ):
+                    raise
+                duplicate = True
+        
+        if duplicate:
+            raise serializers.ValidationError({
+                'client_reading_id': [serializer.error_messages['duplicate_reading']]
+            })
+        serializer.instance = instance
+    
+    @swagger_auto_schema(
+        method='post',
+        request_body=SensorDataBatchSerializer,
+        responses={
+            201: openapi.Response(
+                description='Batch processed, at least one reading accepted or already stored',
+                examples={
+                    'application/json': {
+                        'accepted': 1,
+                        'duplicates': 1,
+                        'rejected': 1,
+                        'results': [
+                            {'index': 0, 'status': 'accepted'},
+                            {'index': 1, 'status': 'duplicate'},
+                            {
+                                'index': 2,
+                                'status': 'rejected',
+                                'errors': {'temperature': ['Temperature must be between -50°C and 60°C']}
+                            }
+                        ]
+                    }
+                }
+            ),
+            400: 'Invalid batch or all readings rejected',
+            401: 'Invalid JWT or device key',
+            403: 'Premium subscription required',
+            413: 'Decompressed body exceeds SENSOR_MAX_DECOMPRESSED_SIZE'
+        }
+    )
+    @action(detail=False, methods=['post'], authentication_classes=ingest_authentication_classes)
+    def batch(self, request):
+        """
+        Пакетне завантаження показників (використовується Arduino bridge)
+        
+        Приймає до SENSOR_BATCH_MAX_SIZE показників для однієї або кількох рослин.
+        Premium статус і власність рослин перевіряються один раз на пакет,
+        валідні показники зберігаються в одній транзакції.
+        Відповідь містить звіт accepted/duplicate/rejected для кожного показника.
+        Показник може мати client_reading_id (унікальний для рослини) -
+        повторна відправка пакета після таймауту не створює дублікатів.
+        recorded_at - час зчитування на пристрої (backfill до
+        SENSOR_MAX_BACKFILL_DAYS днів, не більше SENSOR_MAX_CLOCK_SKEW у майбутньому).
+        Тіло можна стиснути gzip (заголовок Content-Encoding: gzip).
+        Авторизація: JWT або "Authorization: Device <api_key>" пристрою.
+        """
+        if not request.user.is_premium_active:
+            return Response(
+                {"detail": "Sensor features are only available for Premium users"},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        serializer = SensorDataBatchSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        report = SensorDataService.ingest_batch(
+            request.user,
+            serializer.validated_data['readings'],
+            self.device_plant_ids(request)
+        )
+        
+        processed = report['accepted'] or report['duplicates']
+        response_status = status.HTTP_201_CREATED if processed else status.HTTP_400_BAD_REQUEST
+        return Response(report, status=response_status)
+    
+    @swagger_auto_schema(
+        method='post',
+        request_body=openapi.Schema(
+            type=openapi.TYPE_STRING,
+            description='Рядки DATA,<plant_id>,<temp>,<humidity>,<light>[,<reading_id>[,<recorded_at>]], розділені \\n',
+            example='DATA,1,22.5,45.00,850\nDATA,2,23.1,47.50,910'
+        ),
+        responses={
+            201: openapi.Response(
+                description='Lines processed, at least one reading accepted or already stored',
+                examples={
+                    'application/json': {
+                        'accepted': 1,
+                        'duplicates': 0,
+                        'rejected': 1,
+                        'ignored': 0,
+                        'errors': [
+                            {'line': 2, 'error': 'Plant not found or does not belong to you'}
+                        ]
+                    }
+                }
+            ),
+            400: 'Too many lines or all readings rejected',
+            401: 'Invalid JWT or device key',
+            403: 'Premium subscription required',
+            413: 'Decompressed body exceeds SENSOR_MAX_DECOMPRESSED_SIZE'
+        }
+    )
+    @action(
+        detail=False,
+        methods=['post'],
+        parser_classes=[PlainTextParser],
+        authentication_classes=ingest_authentication_classes
+    )
+    def ingest(self, request):
+        """
+        Завантаження показників у форматі Arduino (text/plain)
+        
+        Тіло - рядки DATA,<plant_id>,<temp>,<humidity>,<light> через \\n,
+        як їх виводить Arduino; до SENSOR_BATCH_MAX_SIZE рядків.
+        Необов'язкові поля: шосте - reading_id (захист від дублікатів при повторах),
+        сьоме - recorded_at пристрою в unix time.
+        Рядки розбираються без JSON та серіалізаторів і зберігаються одним
+        bulk_create - найшвидший шлях запису показників.
+        Авторизація: JWT або "Authorization: Device <api_key>" пристрою.
+        """
+        if not request.user.is_premium_active:
+            return Response(
+                {"detail": "Sensor features are only available for Premium users"},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        lines = request.data.splitlines() if isinstance(request.data, bytes) else []
+        if len(lines) > settings.SENSOR_BATCH_MAX_SIZE:
+            return Response(
+                {"detail": f"Ensure this body has no more than {settings.SENSOR_BATCH_MAX_SIZE} lines."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        report = SensorDataService.ingest_lines(request.user, lines, self.device_plant_ids(request))
+        
+        processed = report['accepted'] or report['duplicates']
+        response_status = status.HTTP_201_CREATED if processed else status.HTTP_400_BAD_REQUEST
+        return Response(report, status=response_status)
+    
     @swagger_auto_schema(
         method='post',
         request_body=AssignSensorSerializer,
@@ -201,10 +478,17 @@ class SensorDataViewSet(mixins.CreateModelMixin,
                 required=False,
                 default='week'
             ),
+            openapi.Parameter(
+                'max_points',
+                openapi.IN_QUERY,
+                description="Максимум точок (не менше 3); без параметра - усі точки періоду",
+                type=openapi.TYPE_INTEGER,
+                required=False
+            ),
         ],
         responses={
             200: SensorDataChartSerializer(many=True),
-            400: 'plant_id is required'
+            400: 'plant_id is required or invalid max_points'
         }
     )
     @action(detail=False, methods=['get'])
@@ -213,9 +497,14 @@ class SensorDataViewSet(mixins.CreateModelMixin,
         Отримати дані для графіку
         
         Повертає історичні дані з сенсорів для побудови графіків.
+        З max_points точки проріджуються (LTTB) зі збереженням піків -
+        розмір відповіді не залежить від частоти показників.
+        Тиждень і місяць будуються з погодинних агрегатів (SensorRollup):
+        одна точка на годину з min/max, як агреговані записи bridge.
         """
         plant_id = request.query_params.get('plant_id')
         period = request.query_params.get('period', 'week')
+        max_points = request.query_params.get('max_points')
         
         if not plant_id:
             return Response(
@@ -223,10 +512,21 @@ class SensorDataViewSet(mixins.CreateModelMixin,
                 status=status.HTTP_400_BAD_REQUEST
             )
         
+        if max_points is not None:
+            try:
+                max_points = int(max_points)
+            except ValueError:
+                max_points = 0
+            if max_points < 3:
+                return Response(
+                    {"detail": "max_points must be an integer of at least 3"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        
         from apps.plants.models import UserPlant
         try:
             plant = UserPlant.objects.get(id=plant_id, user=request.user)
-            data = SensorDataService.get_chart_data(plant, period)
+            data = SensorDataService.get_chart_data(plant, period, max_points)
             serializer = SensorDataChartSerializer(data, many=True)
             return Response(serializer.data)
         except UserPlant.DoesNotExist:
@@ -235,6 +535,66 @@ class SensorDataViewSet(mixins.CreateModelMixin,
                 status=status.HTTP_404_NOT_FOUND
             )
     
+    @swagger_auto_schema(
+        method='get',
+        manual_parameters=[
+            openapi.Parameter(
+                'plant_id',
+                openapi.IN_QUERY,
+                description="ID рослини",
+                type=openapi.TYPE_INTEGER,
+                required=True
+            ),
+            openapi.Parameter(
+                'period',
+                openapi.IN_QUERY,
+                description="Період: day, week, month",
+                type=openapi.TYPE_STRING,
+                required=False,
+                default='week'
+            ),
+        ],
+        responses={
+            200: SensorStatisticsSerializer,
+            400: 'plant_id is required',
+            404: 'Plant not found'
+        }
+    )
+    @action(detail=False, methods=['get'])
+    def statistics(self, request):
+        """
+        Статистика показників за період
+        
+        Кількість, мінімум, максимум та середнє для кожного показника.
+        Рахується з погодинних та добових агрегатів (SensorRollup),
+        тому не залежить від кількості показників за період.
+        """
+        plant_id = request.query_params.get('plant_id')
+        period = request.query_params.get('period', 'week')
+        
+        if not plant_id:
+            return Response(
+                {"detail": "plant_id is required"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        from apps.plants.models import UserPlant
+        try:
+            plant = UserPlant.objects.get(id=plant_id, user=request.user)
+        except UserPlant.DoesNotExist:
+            return Response(
+                {"detail": "Plant not found or does not belong to you"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        now = timezone.now()
+        statistics = SensorRollupService.get_statistics(
+            plant,
+            SensorDataService.period_start(period, now),
+            now
+        )
+        return Response(SensorStatisticsSerializer(statistics).data)
+    
     @swagger_auto_schema(
         method='get',
         manual_parameters=[
@@ -245,21 +605,38 @@ class SensorDataViewSet(mixins.CreateModelMixin,
                 type=openapi.TYPE_INTEGER,
                 required=True
             ),
+            openapi.Parameter(
+                'start',
+                openapi.IN_QUERY,
+                description="Початок періоду (YYYY-MM-DD або ISO 8601), включно",
+                type=openapi.TYPE_STRING,
+                required=False
+            ),
+            openapi.Parameter(
+                'end',
+                openapi.IN_QUERY,
+                description="Кінець періоду (YYYY-MM-DD - включно весь день, або ISO 8601)",
+                type=openapi.TYPE_STRING,
+                required=False
+            ),
         ],
         responses={
             200: openapi.Response(
-                description='CSV file with sensor data',
+                description='CSV file with sensor data (gzip if Accept-Encoding allows)',
                 schema=openapi.Schema(type=openapi.TYPE_FILE)
             ),
-            400: 'plant_id is required'
+            400: 'plant_id is required or invalid start/end'
         }
     )
     @action(detail=False, methods=['get'])
+    @method_decorator(gzip_page)
     def export_csv(self, request):
         """
         Експорт даних сенсорів у CSV формат
         
-        Завантажує CSV файл з усією історією даних для рослини.
+        Завантажує CSV файл з історією даних для рослини (вся історія
+        або період start/end). Файл передається потоком у міру читання
+        з БД; з Accept-Encoding: gzip - стиснутим.
         """
         plant_id = request.query_params.get('plant_id')
         
@@ -269,16 +646,203 @@ class SensorDataViewSet(mixins.CreateModelMixin,
                 status=status.HTTP_400_BAD_REQUEST
             )
         
+        try:
+            start = parse_period_bound(request.query_params.get('start'))
+            end = parse_period_bound(request.query_params.get('end'), end=True)
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
         from apps.plants.models import UserPlant
         try:
             plant = UserPlant.objects.get(id=plant_id, user=request.user)
-            csv_data = SensorDataService.export_to_csv(plant)
             
-            response = HttpResponse(csv_data, content_type='text/csv')
+            response = StreamingHttpResponse(
+                SensorDataService.iter_csv(plant, start, end),
+                content_type='text/csv'
+            )
             response['Content-Disposition'] = f'attachment; filename="sensor_data_{plant.custom_name}.csv"'
             return response
         except UserPlant.DoesNotExist:
             return Response(
                 {"detail": "Plant not found or does not belong to you"},
                 status=status.HTTP_404_NOT_FOUND
-            )
\ No newline at end of file
+            )
+
+
+class SensorDeviceViewSet(viewsets.ModelViewSet):
+    """
+    ViewSet для пристроїв (bridge) з API ключами (тільки Premium)
+    
+    Bridge з ключем пристрою надсилає показники на /api/sensors/batch/
+    та /api/sensors/ingest/ із заголовком "Authorization: Device <api_key>"
+    замість логіна з паролем акаунта.
+    """
+    permission_classes = [IsAuthenticated]
+    serializer_class = SensorDeviceSerializer
+    
+    def get_queryset(self):
+        return SensorDevice.objects.filter(
+            user=self.request.user
+        ).prefetch_related('plants')
+    
+    def get_serializer_class(self):
+        if self.action in ('create', 'rotate_key'):
+            return SensorDeviceKeySerializer
+        return SensorDeviceSerializer
+    
+    @swagger_auto_schema(
+        responses={
+            201: SensorDeviceKeySerializer,
+            403: 'Premium subscription required'
+        }
+    )
+    def create(self, request, *args, **kwargs):
+        """
+        Зареєструвати пристрій
+        
+        Відповідь містить api_key - він показується тільки один раз,
+        на сервері зберігається лише його хеш.
+        """
+        if not request.user.is_premium_active:
+            return Response(
+                {"detail": "Sensor features are only available for Premium users"},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        return super().create(request, *args, **kwargs)
+    
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+    
+    def perform_update(self, serializer):
+        device = serializer.save()
+        # Рослини або is_active змінились - кеш авторизації застарів
+        invalidate_device(device)
+    
+    def perform_destroy(self, instance):
+        invalidate_device(instance)
+        instance.delete()
+    
+    @swagger_auto_schema(
+        method='post',
+        request_body=no_body,
+        responses={200: SensorDeviceKeySerializer}
+    )
+    @action(detail=True, methods=['post'], url_path='rotate-key')
+    def rotate_key(self, request, pk=None):
+        """
+        Згенерувати новий API ключ пристрою
+        
+        Старий ключ перестає працювати не пізніше ніж через
+        SENSOR_DEVICE_CACHE_TTL секунд: кеш авторизації очищається лише
+        в процесі, що обробив цей запит, інші воркери тримають його до TTL.
+        """
+        device = self.get_object()
+        invalidate_device(device)
+        
+        device.api_key = device.set_new_key()
+        device.save(update_fields=['key_prefix', 'key_hash'])
+        
+        return Response(self.get_serializer(device).data)
+
+
+class SensorExportJobViewSet(mixins.CreateModelMixin,
+                             mixins.ListModelMixin,
+                             mixins.RetrieveModelMixin,
+                             mixins.DestroyModelMixin,
+                             viewsets.GenericViewSet):
+    """
+    ViewSet для фонових експортів показників (тільки Premium)
+    
+    POST створює job (відповідь 202), GET /<id>/ - статус,
+    GET /<id>/download/ - готовий gzip CSV з підтримкою Range.
+    """
+    permission_classes = [IsAuthenticated]
+    serializer_class = SensorExportJobSerializer
+    
+    def get_queryset(self):
+        return SensorExportJob.objects.filter(
+            user=self.request.user
+        ).prefetch_related('plants')
+    
+    @swagger_auto_schema(
+        responses={
+            202: SensorExportJobSerializer,
+            403: 'Premium subscription required',
+            429: 'Too many exports in progress'
+        }
+    )
+    def create(self, request, *args, **kwargs):
+        """
+        Замовити експорт показників
+        
+        Рослини (за замовчуванням - усі) та необов'язковий період start/end.
+        Файл формується у фоні; статус - GET /api/sensor-exports/<id>/,
+        після status=done - завантаження за download_url.
+        """
+        if not request.user.is_premium_active:
+            return Response(
+                {"detail": "Sensor features are only available for Premium users"},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        if SensorExportService.active_count(request.user.id) >= settings.SENSOR_EXPORT_MAX_ACTIVE:
+            return Response(
+                {"detail": "Too many exports in progress, wait until they finish"},
+                status=status.HTTP_429_TOO_MANY_REQUESTS
+            )
+        
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        job = serializer.save(user=request.user)
+        SensorExportService.start(job)
+        
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+    
+    def perform_destroy(self, instance):
+        if instance.file:
+            instance.file.delete(save=False)
+        instance.delete()
+    
+    @swagger_auto_schema(
+        method='get',
+        responses={
+            200: openapi.Response(
+                description='gzip CSV file',
+                schema=openapi.Schema(type=openapi.TYPE_FILE)
+            ),
+            206: 'Requested byte range (Range header)',
+            409: 'Export is not finished',
+            410: 'Export file was removed',
+            416: 'Range not satisfiable'
+        }
+    )
+    @action(detail=True, methods=['get'], url_name='download')
+    def download(self, request, pk=None):
+        """
+        Завантажити готовий експорт
+        
+        Підтримує "Range: bytes=<offset>-" - перерване завантаження
+        продовжується з місця зупинки (curl -C -, менеджери завантажень).
+        """
+        job = self.get_object()
+        
+        if job.status != SensorExportJob.STATUS_DONE:
+            return Response(
+                {"detail": f"Export is not ready (status: {job.status})"},
+                status=status.HTTP_409_CONFLICT
+            )
+        
+        if not job.file or not job.file.storage.exists(job.file.name):
+            return Response(
+                {"detail": "Export file is no longer available"},
+                status=status.HTTP_410_GONE
+            )
+        
+        etag = f'"{job.pk}-{job.file_size}-{int(job.finished_at.timestamp())}"'
+        return ranged_file_response(
+            request,
+            job.file.path,
+            'application/gzip',
+            f'sensor_export_{job.pk}.csv.gz',
+            etag
+        )
@@ -0,0 +1,172 @@
+"""
+Group commit для показників сенсорів (SENSOR_GROUP_COMMIT)
+
+SQLite дозволяє одного writer-а, і кожна транзакція - це окремий fsync.
+Коли кілька запитів ingest пишуть одночасно, вони по черзі чекають
+блокування бази (і отримують "database is locked" після timeout).
+
+GroupCommitWriter - один потік-writer на процес: запити ставлять свої
+показники в чергу та чекають, а writer кожні SENSOR_GROUP_COMMIT_WAIT_MS
+мілісекунд (або щойно набралось SENSOR_GROUP_COMMIT_MAX_ROWS рядків)
+записує все накопичене в одній транзакції. Запит отримує відповідь
+тільки після COMMIT - показники вже на диску.
+"""
+
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, connection, transaction
+
+
+logger = logging.getLogger(__name__)
+
+
+class GroupCommitWriter:
+    """Потік, що записує показники з черги групами в одній транзакції"""
+
+    def __init__(self, max_rows, wait_ms):
+        self.max_rows = max_rows
+        self.wait = wait_ms / 1000
+        self.queue = queue.Queue()
+        self.thread = None
+        self.pid = None
+        self.lock = threading.Lock()
+
+    def ensure_started(self):
+        # Після fork (gunicorn --preload) потік батьківського процесу не існує
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive() or self.pid != os.getpid():
+                self.queue = queue.Queue()
+                self.pid = os.getpid()
+                self.thread = threading.Thread(target=self.run, name='sensor-group-commit', daemon=True)
+                self.thread.start()
+
+    def submit(self, objects):
+        """
+        Поставити показники (SensorData без pk) в чергу на запис
+
+        Returns: Future, що завершується після COMMIT групи
+        (або з винятком бази даних)
+        """
+        self.ensure_started()
+        future = Future()
+        self.queue.put((objects, future))
+        return future
+
+    def collect(self):
+        """Зібрати групу: перший запит чекаємо без ліміту, далі - не довше wait"""
+        pending = [self.queue.get()]
+        rows = len(pending[0][0])
+        deadline = time.monotonic() + self.wait
+
+        while rows < self.max_rows:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            pending.append(item)
+            rows += len(item[0])
+
+        return pending
+
+    def run(self):
+        while True:
+            pending = self.collect()
+            close_old_connections()
+
+            error = self.commit(pending)
+            if error is None:
+                continue
+
+            if isinstance(error, IntegrityError) and len(pending) > 1:
+                # SQLite перевіряє FK тільки при COMMIT (рослину видалили після
+                # валідації), і помилка відкочує всю групу - повтор по одному
+                # запиту, щоб її отримав лише запит з цими показниками
+                logger.warning('Retrying %d grouped requests one by one', len(pending))
+                for objects, future in pending:
+                    for obj in objects:
+                        obj.pk = None
+                    error = self.commit([(objects, future)])
+                    if error is not None:
+                        future.set_exception(error)
+                continue
+
+            for _, future in pending:
+                if not future.done():
+                    future.set_exception(error)
+
+    def commit(self, pending):
+        """
+        Записати групу та повідомити запити про успіх
+
+        Returns: None або виняток бази даних (транзакцію вже відкочено)
+        """
+        try:
+            self.write(pending)
+        except Exception as e:
+            logger.error('Group commit of %d requests failed', len(pending), exc_info=e)
+            # З'єднання могло лишитись у зламаному стані
+            connection.close()
+            return e
+
+        for _, future in pending:
+            future.set_result(None)
+        return None
+
+    @staticmethod
+    def write(pending):
+        """
+        Одна транзакція на групу (разом з агрегатами та останнім показником);
+        кожен запит - у своєму savepoint,
+        щоб конфлікт client_reading_id одного запиту не відкотив інші.
+        Без конфліктів bulk_create повертає pk (потрібні для відповіді create).
+        """
+        from apps.sensors import partitions
+        from apps.sensors.services import SensorDataService
+
+        with transaction.atomic():
+            for objects, _ in pending:
+                try:
+                    with transaction.atomic():
+                        partitions.bulk_create(objects)
+                except IntegrityError:
+                    for obj in objects:
+                        obj.pk = None
+                    partitions.bulk_create(objects, ignore_conflicts=True)
+
+            SensorDataService.readings_saved([obj for objects, _ in pending for obj in objects])
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_writer():
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = GroupCommitWriter(
+                settings.SENSOR_GROUP_COMMIT_MAX_ROWS,
+                settings.SENSOR_GROUP_COMMIT_WAIT_MS
+            )
+        return _writer
+
+
+def save_readings(objects):
+    """
+    Записати показники через спільний writer і дочекатись COMMIT
+
+    Raises: помилку бази даних з writer-а або TimeoutError, якщо група
+    не записана за SENSOR_GROUP_COMMIT_TIMEOUT секунд
+    """
+    if not objects:
+        return
+    get_writer().submit(objects).result(timeout=settings.SENSOR_GROUP_COMMIT_TIMEOUT)
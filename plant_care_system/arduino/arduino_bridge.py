@@ -5,59 +5,333 @@ Plant Care System - Arduino Data Bridge
 
 import serial
 import requests
+import base64
+import gzip
+import json
+import queue
+import random
+import sqlite3
+import threading
 import time
 import sys
-from datetime import datetime
+import uuid
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from decouple import config, UndefinedValueError
+from requests.adapters import HTTPAdapter
 
 # ==================== КОНФІГУРАЦІЯ ====================
 
 SERIAL_PORT = '/dev/cu.usbserial-11120'
 BAUD_RATE = 9600
 SERIAL_TIMEOUT = 2
+# Рядок без '\n', довший за це, - сміття на лінії (не DATA), відкидається
+SERIAL_MAX_LINE = 512
+
+# Порти через кому; якщо не задано - автопошук усіх Arduino
+SERIAL_PORTS = [p.strip() for p in config('SERIAL_PORTS', default='').split(',') if p.strip()]
+PORT_SCAN_INTERVAL = config('PORT_SCAN_INTERVAL', default=5, cast=float)
+
+# Інтервал (секунди) логування швидкості читання Serial
+READ_STATS_INTERVAL = config('READ_STATS_INTERVAL', default=300, cast=float)
+
+# API ключ пристрою (/api/sensor-devices/); якщо задано - логін з паролем не потрібен
+DEVICE_API_KEY = config('DEVICE_API_KEY', default='')
 
 try:
     API_BASE_URL = config('API_BASE_URL', default='http://127.0.0.1:8000')
-    API_USERNAME = config('API_USERNAME')
-    API_PASSWORD = config('API_PASSWORD')
+    if DEVICE_API_KEY:
+        API_USERNAME = API_PASSWORD = None
+    else:
+        API_USERNAME = config('API_USERNAME')
+        API_PASSWORD = config('API_PASSWORD')
 except UndefinedValueError:
-    print("ERROR: Create .env file with API_USERNAME and API_PASSWORD")
+    print("ERROR: Create .env file with DEVICE_API_KEY or API_USERNAME and API_PASSWORD")
     sys.exit(1)
 
 API_LOGIN_URL = f'{API_BASE_URL}/api/auth/login/'
-API_SENSOR_DATA_URL = f'{API_BASE_URL}/api/sensors/'
+API_TOKEN_REFRESH_URL = f'{API_BASE_URL}/api/auth/token/refresh/'
+API_SENSOR_BATCH_URL = f'{API_BASE_URL}/api/sensors/batch/'
 
-MAX_RETRIES = 3
+# Повторні спроби: експоненційна затримка з jitter
 RETRY_DELAY = 5
+RETRY_MAX_DELAY = config('RETRY_MAX_DELAY', default=300, cast=float)
+
+# Circuit breaker: після N помилок поспіль відправка призупиняється
+BREAKER_FAILURE_THRESHOLD = config('BREAKER_FAILURE_THRESHOLD', default=5, cast=int)
+BREAKER_RESET_TIMEOUT = config('BREAKER_RESET_TIMEOUT', default=60, cast=float)
+
+# Агрегація на краю: 0 - вимкнено, інакше довжина вікна (секунди),
+# за яке показники рослини зводяться в один запис count/min/max/mean
+AGGREGATION_WINDOW = config('AGGREGATION_WINDOW', default=0, cast=float)
+
+# Deadband (report-by-exception): показник відправляється лише коли
+# метрика змінилась більше ніж на поріг, або як heartbeat раз на
+# DEADBAND_MAX_SILENCE секунд. Поріг 0 - метрика не фільтрується
+DEADBAND_TEMPERATURE = config('DEADBAND_TEMPERATURE', default=0, cast=float)
+DEADBAND_AIR_HUMIDITY = config('DEADBAND_AIR_HUMIDITY', default=0, cast=float)
+DEADBAND_LIGHT_LEVEL = config('DEADBAND_LIGHT_LEVEL', default=0, cast=float)
+DEADBAND_MAX_SILENCE = config('DEADBAND_MAX_SILENCE', default=900, cast=float)
+
+# Черга між потоком читання Serial та потоком відправки
+READING_QUEUE_SIZE = config('READING_QUEUE_SIZE', default=10000, cast=int)
+
+# Локальна черга (spool): показники спершу пишуться на диск,
+# а потім відправляються пакетами
+SPOOL_PATH = config('SPOOL_PATH', default='bridge_spool.sqlite3')
+UPLOAD_BATCH_SIZE = config('UPLOAD_BATCH_SIZE', default=100, cast=int)
+UPLOAD_INTERVAL = config('UPLOAD_INTERVAL', default=30, cast=float)
+
+# Стиснення пакетів gzip (Content-Encoding: gzip) для повільних каналів;
+# маленькі тіла не стискаються - заголовок gzip їх тільки збільшує
+UPLOAD_GZIP = config('UPLOAD_GZIP', default=True, cast=bool)
+UPLOAD_GZIP_MIN_BYTES = config('UPLOAD_GZIP_MIN_BYTES', default=512, cast=int)
+
+# HTTP endpoint /metrics у форматі Prometheus; 0 - вимкнено
+METRICS_PORT = config('METRICS_PORT', default=0, cast=int)
+METRICS_HOST = config('METRICS_HOST', default='127.0.0.1')
 
 access_token = None
+refresh_token = None
 token_expires_at = None
+# Токени можуть оновлюватись з кількох потоків відправки
+token_lock = threading.RLock()
+
+# ==================== МЕТРИКИ ====================
+
+class Metric:
+    """
+    Метрика у текстовому форматі Prometheus
+    
+    Значення зберігаються окремо для кожного набору міток (labels);
+    оновлюються з потоків читання та відправки, тому під lock.
+    """
+    
+    TYPE = None
+    
+    def __init__(self, name, description, labels=()):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self.lock = threading.Lock()
+        self.values = {}
+        # Метрики без міток експортуються одразу, з нулем
+        if not labels:
+            self.values[()] = self.empty()
+        metrics_registry.append(self)
+    
+    def empty(self):
+        return 0
+    
+    def label_key(self, labels):
+        return tuple(str(labels.get(label, '')) for label in self.labels)
+    
+    def format_labels(self, key, extra=None):
+        pairs = list(zip(self.labels, key))
+        if extra:
+            pairs.append(extra)
+        if not pairs:
+            return ''
+        escaped = (
+            (name, value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+            for name, value in pairs
+        )
+        return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+    
+    def samples(self):
+        with self.lock:
+            return [
+                (f'{self.name}{self.format_labels(key)}', value)
+                for key, value in sorted(self.values.items())
+            ]
+    
+    def render(self):
+        lines = [f'# HELP {self.name} {self.description}', f'# TYPE {self.name} {self.TYPE}']
+        lines.extend(f'{sample} {value}' for sample, value in self.samples())
+        return '\n'.join(lines)
+
+
+class Counter(Metric):
+    TYPE = 'counter'
+    
+    def inc(self, amount=1, **labels):
+        key = self.label_key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    TYPE = 'gauge'
+    
+    def set(self, value, **labels):
+        with self.lock:
+            self.values[self.label_key(labels)] = value
+
+
+class Histogram(Metric):
+    TYPE = 'histogram'
+    
+    def __init__(self, name, description, buckets, labels=()):
+        self.buckets = sorted(buckets)
+        super().__init__(name, description, labels)
+    
+    def empty(self):
+        return {'buckets': [0] * len(self.buckets), 'sum': 0, 'count': 0}
+    
+    def observe(self, value, **labels):
+        key = self.label_key(labels)
+        with self.lock:
+            series = self.values.setdefault(key, self.empty())
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series['buckets'][index] += 1
+            series['sum'] += value
+            series['count'] += 1
+    
+    def samples(self):
+        samples = []
+        with self.lock:
+            for key, series in sorted(self.values.items()):
+                for bound, count in zip(self.buckets, series['buckets']):
+                    samples.append((f"{self.name}_bucket{self.format_labels(key, ('le', str(bound)))}", count))
+                samples.append((f"{self.name}_bucket{self.format_labels(key, ('le', '+Inf'))}", series['count']))
+                samples.append((f'{self.name}_sum{self.format_labels(key)}', series['sum']))
+                samples.append((f'{self.name}_count{self.format_labels(key)}', series['count']))
+        return samples
+
+
+metrics_registry = []
+
+SERIAL_LINES = Counter('bridge_serial_lines_total', 'Lines read from Serial', ('port',))
+SERIAL_BYTES = Counter('bridge_serial_bytes_total', 'Bytes read from Serial', ('port',))
+SERIAL_RECONNECTS = Counter('bridge_serial_reconnects_total', 'Serial reconnects after repeated errors', ('port',))
+PARSE_FAILURES = Counter('bridge_parse_failures_total', 'DATA lines that could not be parsed')
+READINGS_DROPPED = Counter('bridge_readings_dropped_total', 'Readings dropped because the queue was full')
+READINGS_SENT = Counter('bridge_readings_sent_total', 'Readings accepted by the API')
+READINGS_DUPLICATE = Counter('bridge_readings_duplicate_total', 'Readings the API already had (retried uploads)')
+READINGS_REJECTED = Counter('bridge_readings_rejected_total', 'Readings rejected by API validation')
+UPLOAD_BYTES = Counter('bridge_upload_bytes_total', 'Request body bytes sent to the API', ('encoding',))
+UPLOAD_RETRIES = Counter('bridge_upload_retries_total', 'Failed batch uploads scheduled for retry')
+UPLOAD_BATCH_SIZE_HISTOGRAM = Histogram(
+    'bridge_upload_batch_size', 'Readings per uploaded batch',
+    (1, 5, 10, 25, 50, 100, 250, 500, 1000)
+)
+HTTP_REQUEST_DURATION = Histogram(
+    'bridge_http_request_duration_seconds', 'API request latency',
+    (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10), ('endpoint',)
+)
+READING_QUEUE_DEPTH = Gauge('bridge_reading_queue_depth', 'Readings waiting in the in-memory queue')
+SPOOL_BACKLOG = Gauge('bridge_spool_backlog', 'Readings waiting in the spool for upload')
+CIRCUIT_BREAKER_OPEN = Gauge('bridge_circuit_breaker_open', '1 while uploads are paused by the circuit breaker')
+
+
+def render_metrics():
+    return '\n'.join(metric.render() for metric in metrics_registry) + '\n'
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """GET /metrics для Prometheus scrape"""
+    
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        
+        body = render_metrics().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format, *args):
+        # Кожен scrape не повинен потрапляти в лог bridge
+        pass
+
+
+def start_metrics_server(host=METRICS_HOST, port=METRICS_PORT):
+    """Запустити HTTP сервер метрик у фоновому потоці"""
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='metrics', daemon=True).start()
+    return server
+
 
 # ==================== ФУНКЦІЇ ====================
 
+# print() пише текст і '\n' окремо, тому з кількох потоків рядки змішуються
+output_lock = threading.Lock()
+
+
+def echo(line):
+    """Вивести рядок цілком (потокобезпечно)"""
+    with output_lock:
+        print(line, flush=True)
+
+
 def log(message, level='INFO'):
     """Логування з часовою міткою"""
     timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    print(f"[{timestamp}] [{level}] {message}")
+    echo(f"[{timestamp}] [{level}] {message}")
 
 
-def login_to_api():
-    """Логін в API та отримання JWT токена"""
-    global access_token, token_expires_at
+def create_http_session(pool_maxsize=4):
+    """HTTP сесія з keep-alive та пулом з'єднань (pool_maxsize - одночасних запитів)"""
+    http = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize)
+    http.mount('http://', adapter)
+    http.mount('https://', adapter)
+    return http
+
+
+http_session = create_http_session()
+
+
+def http_post(endpoint, url, **kwargs):
+    """POST через спільну сесію з метрикою затримки (endpoint - мітка)"""
+    started = time.perf_counter()
+    try:
+        return http_session.post(url, **kwargs)
+    finally:
+        HTTP_REQUEST_DURATION.observe(time.perf_counter() - started, endpoint=endpoint)
+
+
+def get_token_expiry(token):
+    """Час закінчення дії JWT з claim exp (без перевірки підпису)"""
+    try:
+        payload = token.split('.')[1]
+        payload += '=' * (-len(payload) % 4)
+        return float(json.loads(base64.urlsafe_b64decode(payload))['exp'])
+    except Exception:
+        # Невідомий формат - вважаємо що токен живе годину (ACCESS_TOKEN_LIFETIME)
+        return time.time() + 3600
+
+
+def store_tokens(data):
+    """Зберегти access/refresh токени з відповіді API"""
+    global access_token, refresh_token, token_expires_at
     
+    access_token = data.get('access')
+    # При ROTATE_REFRESH_TOKENS сервер повертає новий refresh токен
+    refresh_token = data.get('refresh', refresh_token)
+    token_expires_at = get_token_expiry(access_token)
+
+
+def login_to_api():
+    """Логін в API та отримання JWT токенів"""
     try:
         log("Logging in to API...")
-        response = requests.post(
+        response = http_post(
+            'login',
             API_LOGIN_URL,
             json={'email': API_USERNAME, 'password': API_PASSWORD},
             timeout=10
         )
         
         if response.status_code == 200:
-            data = response.json()
-            access_token = data.get('access')
-            token_expires_at = time.time() + 3600
-            log("Login successful! Token expires in 1 hour")
+            store_tokens(response.json())
+            expires_in = (token_expires_at - time.time()) / 60
+            log(f"Login successful! Token expires in {expires_in:.0f} min")
             return access_token
         else:
             log(f"Login failed: {response.status_code}", 'ERROR')
@@ -67,53 +341,177 @@ def login_to_api():
         return None
 
 
+def refresh_access_token():
+    """
+    Оновити access токен через /api/auth/token/refresh/
+    Якщо refresh токен відсутній або недійсний - повний логін
+    """
+    with token_lock:
+        if not refresh_token:
+            return login_to_api()
+        
+        try:
+            response = http_post(
+                'token_refresh',
+                API_TOKEN_REFRESH_URL,
+                json={'refresh': refresh_token},
+                timeout=10
+            )
+            
+            if response.status_code == 200:
+                store_tokens(response.json())
+                log("Access token refreshed")
+                return access_token
+            
+            log(f"Token refresh failed: {response.status_code}, logging in again", 'WARNING')
+        except Exception as e:
+            log(f"Token refresh error: {e}", 'ERROR')
+            return None
+        
+        return login_to_api()
+
+
+def authenticate():
+    """Підготувати авторизацію: з ключем пристрою логін не потрібен"""
+    if DEVICE_API_KEY:
+        log(f"Using device API key {DEVICE_API_KEY[:11]}...")
+        return True
+    return login_to_api()
+
+
 def refresh_token_if_needed():
     """Перевірка та оновлення токена"""
-    global access_token, token_expires_at
-    
-    if not access_token or not token_expires_at:
-        return login_to_api()
+    with token_lock:
+        if not access_token or not token_expires_at:
+            return login_to_api()
+        
+        if time.time() > (token_expires_at - 300):
+            log("Token expiring soon, refreshing...")
+            return refresh_access_token()
+        
+        return access_token
+
+
+def encode_body(payload, compress):
+    """JSON тіло запиту: (bytes, Content-Encoding або None)"""
+    body = json.dumps(payload, separators=(',', ':')).encode('utf-8')
     
-    if time.time() > (token_expires_at - 300):
-        log("Token expiring soon, refreshing...")
-        return login_to_api()
+    if compress and len(body) >= UPLOAD_GZIP_MIN_BYTES:
+        return gzip.compress(body), 'gzip'
     
-    return access_token
+    return body, None
+
 
-def send_sensor_data(plant_id, temperature, air_humidity, light_level):
-    """Відправити дані на API"""
-    token = refresh_token_if_needed()
+def post_with_auth(url, payload, endpoint='api', compress=False):
+    """
+    POST на API з ключем пристрою або JWT авторизацією
+    При 401 JWT токен оновлюється і запит повторюється один раз
+    """
+    token = None
     
-    if not token:
-        log("Cannot send: not authenticated", 'ERROR')
-        return False
+    if not DEVICE_API_KEY:
+        token = refresh_token_if_needed()
+        
+        if not token:
+            log("Cannot send: not authenticated", 'ERROR')
+            return None
     
-    headers = {
-        'Authorization': f'Bearer {token}',
-        'Content-Type': 'application/json'
-    }
+    body, content_encoding = encode_body(payload, compress)
+    
+    def post(token):
+        headers = {
+            'Authorization': f'Device {DEVICE_API_KEY}' if DEVICE_API_KEY else f'Bearer {token}',
+            'Content-Type': 'application/json'
+        }
+        if content_encoding:
+            headers['Content-Encoding'] = content_encoding
+        UPLOAD_BYTES.inc(len(body), encoding=content_encoding or 'identity')
+        return http_post(endpoint, url, headers=headers, data=body, timeout=10)
     
-    payload = {
-        'user_plant': plant_id,
-        'temperature': temperature,
-        'air_humidity': air_humidity,
+    response = post(token)
+    
+    if response.status_code == 401 and not DEVICE_API_KEY:
+        log("Access token rejected, refreshing...", 'WARNING')
+        token = refresh_access_token()
+        if token:
+            response = post(token)
+    
+    return response
+
+
+def reading_payload(record):
+    """Запис зі spool -> показник для /api/sensors/batch/"""
+    item = {
+        'user_plant': record['plant_id'],
+        'temperature': record['temperature'],
+        'air_humidity': record['air_humidity'],
         'soil_humidity': None,
-        'light_level': light_level
+        'light_level': record['light_level'],
+        # Час зчитування, а не відправки - показники зі spool не зсуваються в часі
+        'recorded_at': datetime.fromtimestamp(record['captured_at'], timezone.utc).isoformat()
     }
     
+    if record.get('client_reading_id'):
+        item['client_reading_id'] = record['client_reading_id']
+    
+    if record['sample_count'] > 1:
+        for field in AGGREGATE_COLUMNS:
+            item[field] = record[field]
+    
+    return item
+
+
+# send_sensor_batch: сервер не прийняв пакет як цілий (413 або 400 без звіту
+# по показниках - завеликий пакет, помилка розбору) - треба менший пакет
+BATCH_REFUSED = 'refused'
+
+
+def send_sensor_batch(readings):
+    """
+    Відправити пакет показників на API
+    Returns: звіт сервера (dict) якщо пакет оброблено - показники можна
+    видалити зі spool; BATCH_REFUSED якщо сервер не розібрав пакет
+    (показники лишаються, пакет треба зменшити); False якщо пакет
+    треба відправити повторно
+    """
+    payload = {'readings': [reading_payload(record) for record in readings]}
+    
     try:
-        log(f"Sending: Plant {plant_id}, T={temperature}°C, H={air_humidity}%, L={light_level} lux")
+        log(f"Sending batch of {len(readings)} readings")
         
-        response = requests.post(
-            API_SENSOR_DATA_URL,
-            headers=headers,
-            json=payload,
-            timeout=10
-        )
+        response = post_with_auth(API_SENSOR_BATCH_URL, payload, 'sensor_batch', compress=UPLOAD_GZIP)
         
-        if response.status_code == 201:
-            log("Data sent successfully! ", 'SUCCESS')
-            return True
+        if response is None:
+            return False
+        elif response.status_code == 413:
+            log(f"Batch of {len(readings)} readings is too large for the server (413)", 'ERROR')
+            return BATCH_REFUSED
+        elif response.status_code in (201, 400):
+            try:
+                report = response.json()
+            except ValueError:
+                report = None
+            if not isinstance(report, dict) or 'results' not in report:
+                # 400 без звіту по показниках: пакет не оброблено (ліміт
+                # SENSOR_BATCH_MAX_SIZE, помилка розбору gzip/JSON) - не видаляти
+                log(f"Batch of {len(readings)} readings refused: {response.status_code} {response.text[:200]}", 'ERROR')
+                return BATCH_REFUSED
+            # 400 зі звітом означає що всі показники відхилені валідацією -
+            # повторна відправка не допоможе
+            UPLOAD_BATCH_SIZE_HISTOGRAM.observe(len(readings))
+            READINGS_SENT.inc(report.get('accepted', 0))
+            READINGS_DUPLICATE.inc(report.get('duplicates', 0))
+            READINGS_REJECTED.inc(report.get('rejected', 0))
+            log(
+                f"Batch sent: {report.get('accepted', 0)} accepted, "
+                f"{report.get('rejected', 0)} rejected, "
+                f"{report.get('duplicates', 0)} duplicates",
+                'SUCCESS' if response.status_code == 201 else 'WARNING'
+            )
+            return report
+        elif response.status_code == 401:
+            log("Authentication failed: check DEVICE_API_KEY or API credentials", 'ERROR')
+            return False
         elif response.status_code == 403:
             log("Permission denied: Premium required", 'ERROR')
             return False
@@ -123,15 +521,20 @@ def send_sensor_data(plant_id, temperature, air_humidity, light_level):
     except Exception as e:
         log(f"Network error: {e}", 'ERROR')
         return False
-    
+
+
 def parse_sensor_data(line):
     """
     Парсинг: DATA,<plant_id>,<temp>,<humidity>,<light>
+    Приймає сирі bytes з Serial (без декодування) або str
     """
     try:
-        parts = line.strip().split(',')
+        if isinstance(line, str):
+            line = line.encode('utf-8')
+        
+        parts = line.strip().split(b',')
         
-        if len(parts) != 5 or parts[0] != 'DATA':
+        if len(parts) != 5 or parts[0] != b'DATA':
             return None
         
         plant_id = int(parts[1])
@@ -141,19 +544,20 @@ def parse_sensor_data(line):
         
         return (plant_id, temperature, humidity, light_level)
     except Exception as e:
+        PARSE_FAILURES.inc()
         log(f"Parse error: {e}", 'WARNING')
         return None
 
 
-def find_arduino_port():
-    """Автопошук Arduino порту"""
+def find_arduino_ports():
+    """Автопошук усіх Arduino портів"""
     import serial.tools.list_ports
     
     ports = serial.tools.list_ports.comports()
-    for port in ports:
-        if any(k in port.description.lower() for k in ['arduino', 'usb', 'serial']):
-            return port.device
-    return None
+    return [
+        port.device for port in ports
+        if any(k in port.description.lower() for k in ['arduino', 'usb', 'serial'])
+    ]
 
 def connect_to_arduino(port):
     """Підключення до Arduino"""
@@ -182,111 +586,631 @@ def connect_to_arduino(port):
         log(f"Failed to connect: {e}", 'ERROR')
         return None
     
-def safe_readline(arduino, timeout=2):
-    """Безпечне читання з обробкою помилок"""
+def safe_readline(arduino, pending):
+    """
+    Блокуюче читання рядка з Serial
+    
+    read_until чекає на '\\n' не довше SERIAL_TIMEOUT, тому потік спить
+    у ядрі замість опитування in_waiting. Після таймауту він повертає те,
+    що встигло надійти, - частину рядка. Вона накопичується в pending
+    (bytearray порту) до наступного читання: назовні віддається тільки
+    повний рядок, що закінчується '\\n', інакше обрізаний
+    "DATA,1,22.5,45.00,8" розпарсився б як light=8.
+    
+    Повертає сирі bytes (без декодування) або None якщо повного рядка ще немає.
+    serial.SerialException прокидається далі для перепідключення.
+    """
     try:
-        line_bytes = arduino.readline()
+        chunk = arduino.read_until(b'\n', SERIAL_MAX_LINE)
+    except serial.SerialException:
+        raise
+    except Exception as e:
+        log(f"Read error: {e}", 'ERROR')
+        return None
+    
+    if not chunk:
+        return None
+    
+    pending.extend(chunk)
+    if not pending.endswith(b'\n'):
+        if len(pending) >= SERIAL_MAX_LINE:
+            log(f"Discarding {len(pending)} bytes without line end", 'WARNING')
+            pending.clear()
+        return None
+    
+    line_bytes = bytes(pending)
+    pending.clear()
+    return line_bytes
+
+
+class ReadStats:
+    """Лічильники прочитаних байтів/рядків Serial"""
+    
+    def __init__(self):
+        self.total_bytes = 0
+        self.total_lines = 0
+        self.window_start = time.time()
+        self.window_bytes = 0
+        self.window_lines = 0
+    
+    def record(self, nbytes):
+        self.total_bytes += nbytes
+        self.total_lines += 1
+        self.window_bytes += nbytes
+        self.window_lines += 1
+    
+    def maybe_report(self, port):
+        """Раз на READ_STATS_INTERVAL логувати байти/рядки за секунду"""
+        elapsed = time.time() - self.window_start
+        if elapsed < READ_STATS_INTERVAL:
+            return
         
-        if not line_bytes:
+        log(
+            f"{port}: {self.window_bytes / elapsed:.1f} bytes/s, "
+            f"{self.window_lines / elapsed:.2f} lines/s "
+            f"(total {self.total_bytes} bytes, {self.total_lines} lines)"
+        )
+        self.window_start = time.time()
+        self.window_bytes = 0
+        self.window_lines = 0
+
+
+# ==================== SPOOL ====================
+
+AGGREGATE_COLUMNS = [
+    'sample_count',
+    'temperature_min', 'temperature_max',
+    'air_humidity_min', 'air_humidity_max',
+    'light_level_min', 'light_level_max',
+]
+
+SPOOL_EXTRA_COLUMNS = [
+    ('sample_count', 'INTEGER NOT NULL DEFAULT 1'),
+    ('temperature_min', 'REAL'),
+    ('temperature_max', 'REAL'),
+    ('air_humidity_min', 'REAL'),
+    ('air_humidity_max', 'REAL'),
+    ('light_level_min', 'INTEGER'),
+    ('light_level_max', 'INTEGER'),
+]
+
+SPOOL_COLUMNS = [
+    'plant_id', 'temperature', 'air_humidity', 'light_level', 'captured_at',
+    *(column for column, _ in SPOOL_EXTRA_COLUMNS)
+]
+
+
+class ReadingSpool:
+    """
+    Локальна черга показників у SQLite (WAL)
+    
+    Показник зберігається з часом зчитування і видаляється лише
+    після успішної відправки, тому недоступність API не призводить
+    до втрати даних. Кожен запис має client_reading_id
+    (<source_id>-<id>): якщо відповідь на відправку загубилась,
+    повторна відправка не створює дублікатів на сервері.
+    """
+    
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS readings (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                plant_id INTEGER NOT NULL,
+                temperature REAL NOT NULL,
+                air_humidity REAL NOT NULL,
+                light_level INTEGER NOT NULL,
+                captured_at REAL NOT NULL
+            )
+            """
+        )
+        self._add_missing_columns()
+        self.source_id = self._get_source_id()
+        self.conn.commit()
+    
+    def _add_missing_columns(self):
+        """Оновити схему spool, створеного попередньою версією bridge"""
+        existing = {row[1] for row in self.conn.execute('PRAGMA table_info(readings)')}
+        for column, definition in SPOOL_EXTRA_COLUMNS:
+            if column not in existing:
+                self.conn.execute(f'ALTER TABLE readings ADD COLUMN {column} {definition}')
+    
+    def _get_source_id(self):
+        """Випадковий id цього spool - префікс client_reading_id, щоб id різних bridge не збігались"""
+        self.conn.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)')
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'source_id'").fetchone()
+        if row:
+            return row[0]
+        
+        source_id = uuid.uuid4().hex[:12]
+        self.conn.execute("INSERT INTO meta (key, value) VALUES ('source_id', ?)", (source_id,))
+        return source_id
+    
+    def append(self, plant_id, temperature, air_humidity, light_level, captured_at=None, **aggregates):
+        """Додати показник (або агрегований запис) у чергу"""
+        record = {
+            'plant_id': plant_id,
+            'temperature': temperature,
+            'air_humidity': air_humidity,
+            'light_level': light_level,
+            'captured_at': captured_at or time.time(),
+            'sample_count': 1,
+            **aggregates
+        }
+        columns = [column for column in SPOOL_COLUMNS if column in record]
+        self.conn.execute(
+            f'INSERT INTO readings ({", ".join(columns)}) '
+            f'VALUES ({", ".join("?" for _ in columns)})',
+            [record[column] for column in columns]
+        )
+        self.conn.commit()
+    
+    def peek(self, limit):
+        """Найстаріші записи: список (id, dict)"""
+        rows = self.conn.execute(
+            f'SELECT id, {", ".join(SPOOL_COLUMNS)} FROM readings ORDER BY id LIMIT ?',
+            (limit,)
+        ).fetchall()
+        return [
+            (row[0], dict(zip(SPOOL_COLUMNS, row[1:]), client_reading_id=f'{self.source_id}-{row[0]}'))
+            for row in rows
+        ]
+    
+    def remove(self, ids):
+        """Видалити відправлені показники"""
+        self.conn.executemany('DELETE FROM readings WHERE id = ?', [(i,) for i in ids])
+        self.conn.commit()
+    
+    def count(self):
+        return self.conn.execute('SELECT COUNT(*) FROM readings').fetchone()[0]
+    
+    def close(self):
+        self.conn.close()
+
+
+class DeadbandFilter:
+    """
+    Report-by-exception фільтр показників по рослині
+    
+    Показник проходить, якщо хоча б одна метрика відхилилась від останнього
+    відправленого значення більше ніж на свій поріг, або якщо з останньої
+    відправки минуло max_silence секунд (heartbeat - сервер трактує
+    пропуск до цього інтервалу як "без змін").
+    """
+    
+    def __init__(self, thresholds, max_silence=DEADBAND_MAX_SILENCE):
+        self.thresholds = thresholds
+        self.max_silence = max_silence
+        self.last_sent = {}
+    
+    @classmethod
+    def from_config(cls):
+        """Фільтр з налаштувань .env або None якщо deadband вимкнено"""
+        thresholds = {
+            'temperature': DEADBAND_TEMPERATURE,
+            'air_humidity': DEADBAND_AIR_HUMIDITY,
+            'light_level': DEADBAND_LIGHT_LEVEL,
+        }
+        if not any(thresholds.values()):
             return None
+        return cls(thresholds)
+    
+    def should_send(self, plant_id, temperature, air_humidity, light_level, captured_at):
+        values = {
+            'temperature': temperature,
+            'air_humidity': air_humidity,
+            'light_level': light_level,
+        }
+        last = self.last_sent.get(plant_id)
         
-        # UTF-8
-        try:
-            return line_bytes.decode('utf-8').strip()
-        except UnicodeDecodeError:
-            # ASCII з ігноруванням помилок
+        send = (
+            last is None
+            or captured_at - last['captured_at'] >= self.max_silence
+            or any(
+                abs(value - last['values'][metric]) > self.thresholds[metric]
+                for metric, value in values.items()
+            )
+        )
+        
+        if send:
+            self.last_sent[plant_id] = {'values': values, 'captured_at': captured_at}
+        
+        return send
+
+
+class WindowAggregator:
+    """
+    Агрегація показників по рослині у вікні AGGREGATION_WINDOW секунд
+    
+    Замість кожного сирого показника у spool потрапляє один запис на
+    вікно: середні значення + count/min/max, тож екстремуми зберігаються.
+    """
+    
+    METRICS = ('temperature', 'air_humidity', 'light_level')
+    
+    def __init__(self, window):
+        self.window = window
+        self.windows = {}
+    
+    def add(self, plant_id, temperature, air_humidity, light_level, captured_at):
+        values = dict(zip(self.METRICS, (temperature, air_humidity, light_level)))
+        current = self.windows.get(plant_id)
+        
+        if current is None:
+            self.windows[plant_id] = {
+                'started_at': captured_at,
+                'captured_at': captured_at,
+                'count': 1,
+                'sum': dict(values),
+                'min': dict(values),
+                'max': dict(values)
+            }
+            return
+        
+        current['captured_at'] = captured_at
+        current['count'] += 1
+        for metric, value in values.items():
+            current['sum'][metric] += value
+            current['min'][metric] = min(current['min'][metric], value)
+            current['max'][metric] = max(current['max'][metric], value)
+    
+    def flush(self, force=False):
+        """Записи для завершених вікон (або для всіх при force)"""
+        now = time.time()
+        records = []
+        
+        for plant_id, current in list(self.windows.items()):
+            if not force and now - current['started_at'] < self.window:
+                continue
+            
+            del self.windows[plant_id]
+            records.append(self._summarize(plant_id, current))
+        
+        return records
+    
+    @staticmethod
+    def _summarize(plant_id, current):
+        count = current['count']
+        mean = {metric: total / count for metric, total in current['sum'].items()}
+        record = {
+            'plant_id': plant_id,
+            # Точність як у моделі SensorData: 1 знак для температури, 2 для вологості
+            'temperature': round(mean['temperature'], 1),
+            'air_humidity': round(mean['air_humidity'], 2),
+            'light_level': round(mean['light_level']),
+            'captured_at': current['captured_at']
+        }
+        
+        if count > 1:
+            record['sample_count'] = count
+            for metric in WindowAggregator.METRICS:
+                record[f'{metric}_min'] = current['min'][metric]
+                record[f'{metric}_max'] = current['max'][metric]
+        
+        return record
+
+
+def backoff_delay(attempt):
+    """Експоненційна затримка з jitter для спроби attempt (починаючи з 1)"""
+    delay = min(RETRY_MAX_DELAY, RETRY_DELAY * (2 ** (attempt - 1)))
+    return random.uniform(RETRY_DELAY / 2, delay)
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker для відправки на API
+    
+    closed - відправка дозволена;
+    open - після BREAKER_FAILURE_THRESHOLD помилок поспіль відправка
+    призупиняється на BREAKER_RESET_TIMEOUT секунд;
+    half-open - після паузи дозволяється одна пробна відправка.
+    """
+    
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+    
+    def __init__(self, failure_threshold=BREAKER_FAILURE_THRESHOLD, reset_timeout=BREAKER_RESET_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0
+    
+    def allow_request(self):
+        if self.state == self.OPEN:
+            if time.time() - self.opened_at < self.reset_timeout:
+                return False
+            self.state = self.HALF_OPEN
+            log("Circuit breaker half-open, trying API again")
+        return True
+    
+    def record_success(self):
+        if self.state != self.CLOSED:
+            log("Circuit breaker closed, API is back", 'SUCCESS')
+            CIRCUIT_BREAKER_OPEN.set(0)
+        self.state = self.CLOSED
+        self.failures = 0
+    
+    def record_failure(self):
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                log(f"Circuit breaker open for {self.reset_timeout:.0f}s", 'WARNING')
+                CIRCUIT_BREAKER_OPEN.set(1)
+            self.state = self.OPEN
+            self.opened_at = time.time()
+
+
+class SpoolUploader:
+    """
+    Відправка показників зі spool пакетами
+    
+    Пакет відправляється коли назбиралось UPLOAD_BATCH_SIZE показників
+    або минуло UPLOAD_INTERVAL секунд. Якщо сервер відмовляє пакету як
+    цілому (413, 400 без звіту), розмір пакета зменшується вдвічі.
+    Після помилки наступна спроба відкладається з експоненційною
+    затримкою, а circuit breaker призупиняє відправку під час тривалої
+    недоступності API.
+    """
+    
+    def __init__(self, spool):
+        self.spool = spool
+        self.batch_size = UPLOAD_BATCH_SIZE
+        self.breaker = CircuitBreaker()
+        self.last_upload_at = time.time()
+        self.next_attempt_at = 0
+    
+    def maybe_upload(self):
+        """
+        Відправити один пакет, якщо настав час
+        
+        Лише один пакет за виклик, щоб потік між пакетами перевіряв зупинку.
+        Returns: True якщо пакет відправлено і варто одразу пробувати наступний
+        """
+        now = time.time()
+        
+        if now < self.next_attempt_at:
+            return False
+        
+        pending = self.spool.count()
+        if not pending:
+            self.last_upload_at = now
+            return False
+        
+        if pending < self.batch_size and now - self.last_upload_at < UPLOAD_INTERVAL:
+            return False
+        
+        return self.upload_batch()
+    
+    def upload_batch(self):
+        """
+        Відправити найстаріший пакет зі spool
+        Returns: True якщо можна продовжувати (пакет прийнято, зменшено
+        розмір пакета або spool порожній), False після помилки
+        """
+        if not self.breaker.allow_request():
+            return False
+        
+        batch = self.spool.peek(self.batch_size)
+        if not batch:
+            self.last_upload_at = time.time()
+            return True
+        
+        result = send_sensor_batch([reading for _, reading in batch])
+        
+        if result == BATCH_REFUSED and len(batch) > 1:
+            # Показники лишаються в spool, повтор меншими пакетами
+            self.batch_size = max(1, len(batch) // 2)
+            log(
+                f"Upload batch size reduced to {self.batch_size}, check UPLOAD_BATCH_SIZE "
+                f"against the server SENSOR_BATCH_MAX_SIZE",
+                'WARNING'
+            )
+            return True
+        
+        if not isinstance(result, dict):
+            self.breaker.record_failure()
+            UPLOAD_RETRIES.inc()
+            delay = backoff_delay(self.breaker.failures)
+            log(
+                f"Upload failed, {self.spool.count()} readings kept in spool, "
+                f"retry in {delay:.1f}s",
+                'WARNING'
+            )
+            self.next_attempt_at = time.time() + delay
+            return False
+        
+        self.breaker.record_success()
+        self.spool.remove([reading_id for reading_id, _ in batch])
+        
+        # Неповний пакет - spool спорожнів
+        if len(batch) < self.batch_size:
+            self.last_upload_at = time.time()
+        return True
+    
+    def drain(self):
+        """Відправити всі показники зі spool (при зупинці bridge)"""
+        while self.spool.count():
+            if not self.upload_batch():
+                return False
+        return True
+
+
+# ==================== ПОТОКИ ====================
+
+class SenderWorker(threading.Thread):
+    """
+    Потік spool: забирає показники з черги та записує їх у spool.
+    Відправкою займається UploaderWorker, тому запис у spool не чекає
+    ні повільного API, ні backoff після відмови.
+    """
+    
+    def __init__(self, readings_queue, spool_path=SPOOL_PATH, aggregation_window=AGGREGATION_WINDOW):
+        super().__init__(name='sender', daemon=True)
+        self.readings_queue = readings_queue
+        self.spool_path = spool_path
+        self.aggregator = WindowAggregator(aggregation_window) if aggregation_window else None
+        self.deadband = DeadbandFilter.from_config()
+        self.stop_event = threading.Event()
+        self.spool = None
+    
+    def handle(self, reading):
+        """Показник з черги -> deadband -> агрегатор або одразу spool"""
+        if self.deadband and not self.deadband.should_send(*reading):
+            return
+        
+        if self.aggregator:
+            self.aggregator.add(*reading)
+        else:
+            self.spool.append(*reading)
+    
+    def flush_aggregates(self, force=False):
+        if self.aggregator:
+            for record in self.aggregator.flush(force):
+                self.spool.append(**record)
+    
+    def run(self):
+        # SQLite з'єднання створюється в потоці, який його використовує
+        self.spool = ReadingSpool(self.spool_path)
+        
+        while not self.stop_event.is_set():
             try:
-                line = line_bytes.decode('ascii', errors='ignore').strip()
-                if line:
-                    return line
-            except:
+                self.handle(self.readings_queue.get(timeout=0.5))
+                # Забираємо все, що накопичилось, без очікування
+                while True:
+                    self.handle(self.readings_queue.get_nowait())
+            except queue.Empty:
                 pass
             
-            log(f"Failed to decode, skipping", 'WARNING')
-            return None
-    except Exception as e:
-        log(f"Read error: {e}", 'ERROR')
-        return None
+            self.flush_aggregates()
+            
+            READING_QUEUE_DEPTH.set(self.readings_queue.qsize())
+            SPOOL_BACKLOG.set(self.spool.count())
+        
+        while True:
+            try:
+                self.handle(self.readings_queue.get_nowait())
+            except queue.Empty:
+                break
+        
+        self.flush_aggregates(force=True)
+        self.spool.close()
     
-def main():
-    """Головна функція"""
-    global SERIAL_PORT
+    def stop(self):
+        self.stop_event.set()
+
+
+class UploaderWorker(threading.Thread):
+    """
+    Потік відправки: вивантажує spool на API пакетами (SpoolUploader)
     
-    log("====================================")
-    log("Plant Care System - Arduino Bridge")
-    log("====================================")
+    Має власне з'єднання зі spool (WAL дозволяє читати та видаляти,
+    поки SenderWorker дописує), тому відмова чи недоступність API
+    не затримує запис нових показників.
+    """
     
-    # Логін
-    if not login_to_api():
-        log("Cannot start: login failed", 'ERROR')
-        sys.exit(1)
+    IDLE_WAIT = 0.5
     
-    # Автопошук порту
-    if sys.platform != 'win32':
-        auto_port = find_arduino_port()
-        if auto_port:
-            log(f"Auto-detected Arduino on {auto_port}")
-            SERIAL_PORT = auto_port
+    def __init__(self, spool_path=SPOOL_PATH):
+        super().__init__(name='uploader', daemon=True)
+        self.spool_path = spool_path
+        self.stop_event = threading.Event()
     
-    # Підключення
-    arduino = connect_to_arduino(SERIAL_PORT)
+    def run(self):
+        spool = ReadingSpool(self.spool_path)
+        uploader = SpoolUploader(spool)
+        
+        pending = spool.count()
+        if pending:
+            log(f"Spool contains {pending} unsent readings")
+        
+        while not self.stop_event.is_set():
+            if not uploader.maybe_upload():
+                self.stop_event.wait(self.IDLE_WAIT)
+        
+        uploader.drain()
+        spool.close()
     
-    if not arduino:
-        log("Cannot start: Arduino connection failed", 'ERROR')
-        sys.exit(1)
+    def stop(self):
+        self.stop_event.set()
+
+
+class SerialReader(threading.Thread):
+    """
+    Потік читання Serial: тільки читає, парсить та кладе показники
+    в чергу, тому затримка зчитування не залежить від стану API.
+    """
     
-    log("Starting data collection...")
-    log("Press Ctrl+C to stop")
-    log("====================================")
-    retry_count = 0
-    consecutive_errors = 0
     MAX_CONSECUTIVE_ERRORS = 5
     
-    try:
-        while True:
+    def __init__(self, port, readings_queue):
+        super().__init__(name=f'reader-{port}', daemon=True)
+        self.port = port
+        self.readings_queue = readings_queue
+        self.stop_event = threading.Event()
+        self.arduino = None
+        self.stats = ReadStats()
+        # Неповний рядок між таймаутами читання (safe_readline)
+        self.pending = bytearray()
+    
+    def enqueue(self, data):
+        """Покласти показник у чергу (з часом зчитування)"""
+        try:
+            self.readings_queue.put_nowait((*data, time.time()))
+        except queue.Full:
+            READINGS_DROPPED.inc()
+            log("Reading queue is full, dropping reading", 'WARNING')
+    
+    def run(self):
+        self.arduino = connect_to_arduino(self.port)
+        
+        if not self.arduino:
+            log(f"Cannot start reader: connection to {self.port} failed", 'ERROR')
+            return
+        
+        consecutive_errors = 0
+        
+        while not self.stop_event.is_set():
             try:
-                if arduino.in_waiting > 0:
-                    line = safe_readline(arduino)
+                line_bytes = safe_readline(self.arduino, self.pending)
+                
+                if line_bytes:
+                    self.stats.record(len(line_bytes))
+                    SERIAL_LINES.inc(port=self.port)
+                    SERIAL_BYTES.inc(len(line_bytes), port=self.port)
+                    
+                    # Показуємо ВСІ повідомлення Arduino
+                    echo(f"[ARDUINO {self.port}] {line_bytes.decode('utf-8', errors='replace').strip()}")
                     
-                    if line:
-                        # Показуємо ВСІ повідомлення Arduino
-                        print(f"[ARDUINO] {line}")
-                        
-                        consecutive_errors = 0
-                        
-                        # Парсимо DATA
-                        data = parse_sensor_data(line)
-                        
-                        if data:
-                            plant_id, temp, hum, light = data
-                            
-                            success = send_sensor_data(plant_id, temp, hum, light)
-                            
-                            if success:
-                                retry_count = 0
-                            else:
-                                retry_count += 1
-                                if retry_count >= MAX_RETRIES:
-                                    log(f"Too many failures, waiting...", 'WARNING')
-                                    time.sleep(RETRY_DELAY)
-                                    retry_count = 0
+                    consecutive_errors = 0
+                    
+                    # Парсимо DATA
+                    data = parse_sensor_data(line_bytes)
+                    
+                    if data:
+                        self.enqueue(data)
                 
-                time.sleep(0.1)
-            except KeyboardInterrupt:
-                raise
+                self.stats.maybe_report(self.port)
             
             except serial.SerialException as e:
                 log(f"Serial error: {e}", 'ERROR')
                 consecutive_errors += 1
                 
-                if consecutive_errors >= MAX_CONSECUTIVE_ERRORS:
+                if consecutive_errors >= self.MAX_CONSECUTIVE_ERRORS:
                     log("Too many errors, reconnecting...", 'ERROR')
-                    arduino.close()
+                    SERIAL_RECONNECTS.inc(port=self.port)
+                    self.arduino.close()
+                    # Початок рядка зі старого з'єднання не склеюємо з новим
+                    self.pending.clear()
                     time.sleep(2)
-                    arduino = connect_to_arduino(SERIAL_PORT)
-                    if not arduino:
-                        log("Failed to reconnect", 'ERROR')
-                        sys.exit(1)
+                    self.arduino = connect_to_arduino(self.port)
+                    if not self.arduino:
+                        log(f"Failed to reconnect to {self.port}", 'ERROR')
+                        return
                     consecutive_errors = 0
                 
                 time.sleep(1)
@@ -295,12 +1219,108 @@ def main():
                 log(f"Error: {e}", 'ERROR')
                 consecutive_errors += 1
                 time.sleep(1)
+        
+        self.arduino.close()
+    
+    def stop(self):
+        self.stop_event.set()
+
+
+class ReaderPool:
+    """
+    Потоки читання для кількох Arduino з одним спільним конвеєром відправки
+    
+    Кожен порт має власний SerialReader; всі вони пишуть у спільну чергу,
+    тому N плат використовують один процес, один токен і один spool.
+    Порти періодично пересканюються: нові плати підхоплюються, а
+    від'єднані - перезапускаються після повторного підключення.
+    """
     
+    def __init__(self, readings_queue, ports=None):
+        self.readings_queue = readings_queue
+        self.fixed_ports = ports or []
+        self.readers = {}
+    
+    def discover(self):
+        """
+        Порти, які повинні мати reader: SERIAL_PORTS, знайдені автопошуком
+        або, якщо автопошук нічого не розпізнав, SERIAL_PORT
+        """
+        if self.fixed_ports:
+            return self.fixed_ports
+        if sys.platform == 'win32':
+            return [SERIAL_PORT]
+        return find_arduino_ports() or [SERIAL_PORT]
+    
+    def rescan(self):
+        """Прибрати зупинені reader-и та запустити нові для знайдених портів"""
+        for port, reader in list(self.readers.items()):
+            if not reader.is_alive():
+                log(f"Reader for {port} stopped", 'WARNING')
+                del self.readers[port]
+        
+        for port in self.discover():
+            if port not in self.readers:
+                log(f"Starting reader for {port}")
+                reader = SerialReader(port, self.readings_queue)
+                reader.start()
+                self.readers[port] = reader
+    
+    def stop(self):
+        for reader in self.readers.values():
+            reader.stop()
+        for reader in self.readers.values():
+            reader.join()
+        self.readers = {}
+
+
+def main():
+    """Головна функція"""
+    log("====================================")
+    log("Plant Care System - Arduino Bridge")
+    log("====================================")
+    
+    # Логін (не потрібен з ключем пристрою)
+    if not authenticate():
+        log("Cannot start: login failed", 'ERROR')
+        sys.exit(1)
+    
+    if METRICS_PORT:
+        start_metrics_server()
+        log(f"Metrics available at http://{METRICS_HOST}:{METRICS_PORT}/metrics")
+    
+    # Схема spool створюється (оновлюється) до запуску потоків, що його відкривають
+    ReadingSpool(SPOOL_PATH).close()
+    
+    readings_queue = queue.Queue(maxsize=READING_QUEUE_SIZE)
+    sender = SenderWorker(readings_queue)
+    uploader = UploaderWorker()
+    pool = ReaderPool(readings_queue, SERIAL_PORTS)
+    
+    sender.start()
+    uploader.start()
+    
+    log("Starting data collection...")
+    log("Press Ctrl+C to stop")
+    log("====================================")
+    
+    try:
+        while True:
+            pool.rescan()
+            time.sleep(PORT_SCAN_INTERVAL)
     except KeyboardInterrupt:
         log("\nStopping Arduino Bridge...")
-        arduino.close()
-        log("Connection closed. Goodbye!")
-        sys.exit(0)
+        pool.stop()
+    
+    sender.stop()
+    sender.join()
+    # Після sender - щоб відправити і показники, записані при його зупинці
+    uploader.stop()
+    uploader.join()
+    log("Connection closed. Goodbye!")
+    sys.exit(0)
+
+
 # ==================== ЗАПУСК ====================
 
 if __name__ == '__main__':
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Plant Care System - Serial Log Replay
+
+Навантажувальне тестування ingest без фізичних Arduino: читає записаний
+лог Serial (рядки DATA,<plant_id>,<temp>,<humidity>,<light>), пропускає
+його через parse_sensor_data та шлях відправки bridge і показує
+пропускну здатність, перцентилі затримки та кількість помилок.
+
+Використання:
+    python replay_log.py serial.log --speed 0 --plant-ids 1-50
+    python replay_log.py serial.log --speed 10 --batch-size 200 --workers 4
+
+Рядок логу може починатися з часової мітки - unix time
+("1733918400.5 DATA,...") або як у log() bridge ("[2024-12-11 12:00:00] DATA,...").
+Без міток рядки вважаються розділеними інтервалом --interval секунд.
+"""
+
+import argparse
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import arduino_bridge as bridge
+
+
+TIMESTAMP_PATTERNS = [
+    (re.compile(rb'^\[(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})\]\s*'),
+     lambda value: datetime.strptime(value.decode(), '%Y-%m-%d %H:%M:%S').timestamp()),
+    (re.compile(rb'^(\d+(?:\.\d+)?)\s+'),
+     lambda value: float(value)),
+]
+
+
+def parse_plant_ids(value):
+    """'1-50,70' -> [1, 2, ..., 50, 70]"""
+    plant_ids = []
+    for part in value.split(','):
+        if '-' in part:
+            start, end = part.split('-')
+            plant_ids.extend(range(int(start), int(end) + 1))
+        elif part:
+            plant_ids.append(int(part))
+    return plant_ids
+
+
+def split_timestamp(line):
+    """Відокремити часову мітку від рядка Serial: (timestamp або None, рядок)"""
+    for pattern, convert in TIMESTAMP_PATTERNS:
+        match = pattern.match(line)
+        if match:
+            return convert(match.group(1)), line[match.end():]
+    return None, line
+
+
+def load_readings(path, interval):
+    """Показники з логу: список (offset_seconds, reading)"""
+    readings = []
+    first_timestamp = None
+
+    with open(path, 'rb') as log_file:
+        for index, line in enumerate(log_file):
+            timestamp, line = split_timestamp(line)
+            data = bridge.parse_sensor_data(line)
+
+            if not data:
+                continue
+
+            if timestamp is None:
+                timestamp = index * interval
+            if first_timestamp is None:
+                first_timestamp = timestamp
+
+            readings.append((timestamp - first_timestamp, data))
+
+    return readings
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class ReplayStats:
+    """Лічильники результатів відправки (потокобезпечні)"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = []
+        self.batches = 0
+        self.failed_batches = 0
+        self.accepted = 0
+        self.duplicates = 0
+        self.rejected = 0
+
+    def record(self, latency, report):
+        with self.lock:
+            self.latencies.append(latency)
+            self.batches += 1
+            if not isinstance(report, dict):
+                self.failed_batches += 1
+                return
+            self.accepted += report.get('accepted', 0)
+            self.duplicates += report.get('duplicates', 0)
+            self.rejected += report.get('rejected', 0)
+
+    def summary(self, elapsed, readings_sent):
+        latencies_ms = [latency * 1000 for latency in self.latencies]
+        return (
+            f"Readings: {readings_sent} sent, {self.accepted} accepted, "
+            f"{self.duplicates} duplicates, {self.rejected} rejected in {elapsed:.1f}s "
+            f"({self.accepted / elapsed if elapsed else 0:.1f} readings/s)\n"
+            f"Batches: {self.batches} total, {self.failed_batches} failed\n"
+            f"Latency ms: p50={percentile(latencies_ms, 0.5):.1f} "
+            f"p90={percentile(latencies_ms, 0.9):.1f} "
+            f"p99={percentile(latencies_ms, 0.99):.1f} "
+            f"max={max(latencies_ms, default=0):.1f}"
+        )
+
+
+def send_batch(batch, stats):
+    started = time.perf_counter()
+    report = bridge.send_sensor_batch(batch)
+    stats.record(time.perf_counter() - started, report)
+
+
+def replay(readings, plant_ids, speed, batch_size, workers, repeat):
+    """
+    Відтворити показники: speed=1 - реальний час, N - у N разів швидше,
+    0 - максимально швидко. Кожен показник розмножується на plant_ids.
+    """
+    stats = ReplayStats()
+    readings_sent = 0
+    batch = []
+
+    started = time.time()
+    duration = readings[-1][0] if readings else 0
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for cycle in range(repeat):
+            cycle_offset = cycle * duration
+
+            for offset, (plant_id, temperature, humidity, light_level) in readings:
+                if speed:
+                    delay = started + (cycle_offset + offset) / speed - time.time()
+                    if delay > 0:
+                        # Перед паузою відправляємо накопичене, щоб не спотворити затримку
+                        if batch:
+                            executor.submit(send_batch, batch, stats)
+                            batch = []
+                        time.sleep(delay)
+
+                captured_at = time.time()
+                for virtual_id in plant_ids or [plant_id]:
+                    batch.append({
+                        'plant_id': virtual_id,
+                        'temperature': temperature,
+                        'air_humidity': humidity,
+                        'light_level': light_level,
+                        'captured_at': captured_at,
+                        'sample_count': 1
+                    })
+                    readings_sent += 1
+
+                    if len(batch) >= batch_size:
+                        executor.submit(send_batch, batch, stats)
+                        batch = []
+
+        if batch:
+            executor.submit(send_batch, batch, stats)
+
+    return stats.summary(time.time() - started, readings_sent)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay a captured serial log through the bridge upload path')
+    parser.add_argument('log_file', help='Captured serial log with DATA lines')
+    parser.add_argument('--speed', type=float, default=1,
+                        help='1 = real time, N = N times faster, 0 = as fast as possible')
+    parser.add_argument('--interval', type=float, default=60,
+                        help='Seconds between lines without timestamps (Arduino SEND_INTERVAL)')
+    parser.add_argument('--plant-ids', type=parse_plant_ids, default=[],
+                        help='Virtual plant ids, e.g. 1-50,70 (default: ids from the log)')
+    parser.add_argument('--batch-size', type=int, default=bridge.UPLOAD_BATCH_SIZE)
+    parser.add_argument('--workers', type=int, default=1, help='Concurrent upload requests')
+    parser.add_argument('--repeat', type=int, default=1, help='Replay the log N times')
+    args = parser.parse_args()
+
+    readings = load_readings(args.log_file, args.interval)
+    if not readings:
+        bridge.log("No DATA lines found in log", 'ERROR')
+        sys.exit(1)
+
+    bridge.log(f"Loaded {len(readings)} readings from {args.log_file}")
+
+    # Пул з'єднань на кожен worker: інакше зайві з'єднання закриваються
+    # після запиту, і затримка включає встановлення нового
+    bridge.http_session = bridge.create_http_session(max(4, args.workers))
+
+    if not bridge.authenticate():
+        bridge.log("Cannot start: login failed", 'ERROR')
+        sys.exit(1)
+
+    summary = replay(
+        readings,
+        args.plant_ids,
+        args.speed,
+        args.batch_size,
+        args.workers,
+        args.repeat
+    )
+
+    for line in summary.splitlines():
+        bridge.log(line)
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\nExiting...")
+        sys.exit(0)
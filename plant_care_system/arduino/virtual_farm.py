@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Plant Care System - Virtual Arduino Farm
+
+Стенд для end-to-end тестування bridge без фізичних плат (тільки Linux/macOS):
+створює пари псевдотерміналів (pty), кожна з яких імітує Arduino -
+надсилає рядки DATA з заданою частотою, шум (DEBUG рядки), сміттєві байти
+та періодично "від'єднується". Запускає один або кілька процесів
+arduino_bridge.py на ці порти і порівнює кількість надісланих, прочитаних
+і завантажених на API показників.
+
+Використання:
+    python virtual_farm.py --boards 20 --rate 5 --duration 60 --plant-ids 1-20
+    python virtual_farm.py --boards 40 --bridges 2 --garbage 0.05 --disconnect-every 20
+
+Bridge запускається з тим самим .env (API_BASE_URL та DEVICE_API_KEY
+або API_USERNAME і API_PASSWORD).
+"""
+
+import argparse
+import os
+import random
+import re
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from replay_log import parse_plant_ids
+
+
+BRIDGE_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'arduino_bridge.py')
+
+CAPTURED_PATTERN = re.compile(r'^\[ARDUINO (\S+)\] DATA,')
+UPLOADED_PATTERN = re.compile(r'Batch sent: (\d+) accepted, (\d+) rejected')
+
+
+class FakeBoard(threading.Thread):
+    """
+    Віртуальна Arduino на pty
+
+    Bridge відкриває стабільний symlink (link_path), який після кожного
+    "від'єднання" перенаправляється на новий pty - як плата, що
+    перепідключилась до того ж порту.
+    """
+
+    def __init__(self, link_path, plant_id, rate, noise, garbage, disconnect_every, downtime):
+        super().__init__(name=f'board-{os.path.basename(link_path)}', daemon=True)
+        self.link_path = link_path
+        self.plant_id = plant_id
+        self.rate = rate
+        self.noise = noise
+        self.garbage = garbage
+        self.disconnect_every = disconnect_every
+        self.downtime = downtime
+        self.stop_event = threading.Event()
+        self.master_fd = None
+        self.slave_fd = None
+        self.data_lines = 0
+        self.dropped_lines = 0
+        self.disconnects = 0
+
+    def plug(self):
+        """Створити новий pty та перенаправити на нього symlink"""
+        self.master_fd, self.slave_fd = os.openpty()
+        os.set_blocking(self.master_fd, False)
+        tmp_link = f'{self.link_path}.tmp'
+        if os.path.lexists(tmp_link):
+            os.remove(tmp_link)
+        os.symlink(os.ttyname(self.slave_fd), tmp_link)
+        os.replace(tmp_link, self.link_path)
+
+    def unplug(self):
+        if os.path.lexists(self.link_path):
+            os.remove(self.link_path)
+        for fd in (self.master_fd, self.slave_fd):
+            if fd is not None:
+                os.close(fd)
+        self.master_fd = self.slave_fd = None
+
+    def write(self, payload):
+        """Запис у pty; якщо bridge не встигає читати - рядок втрачається, як на справжньому Serial"""
+        try:
+            os.write(self.master_fd, payload)
+            return True
+        except (BlockingIOError, OSError):
+            return False
+
+    def next_line(self):
+        roll = random.random()
+
+        if roll < self.garbage:
+            return bytes(random.getrandbits(8) for _ in range(random.randint(1, 40))) + b'\r\n', False
+
+        if roll < self.garbage + self.noise:
+            return f'DEBUG: Temperature={random.uniform(18, 26):.2f}°C\r\n'.encode(), False
+
+        line = (
+            f'DATA,{self.plant_id},{random.uniform(18, 26):.1f},'
+            f'{random.uniform(35, 65):.2f},{random.randint(100, 1500)}\r\n'
+        )
+        return line.encode(), True
+
+    def run(self):
+        self.plug()
+        interval = 1 / self.rate
+        next_disconnect = time.time() + self.disconnect_every if self.disconnect_every else None
+
+        while not self.stop_event.wait(interval):
+            if next_disconnect and time.time() >= next_disconnect:
+                self.disconnects += 1
+                self.unplug()
+                if self.stop_event.wait(self.downtime):
+                    return
+                self.plug()
+                next_disconnect = time.time() + self.disconnect_every
+                continue
+
+            payload, is_data = self.next_line()
+            written = self.write(payload)
+
+            if is_data:
+                self.data_lines += 1
+                if not written:
+                    self.dropped_lines += 1
+
+        self.unplug()
+
+    def stop(self):
+        self.stop_event.set()
+
+
+class BridgeProcess:
+    """Процес arduino_bridge.py, прив'язаний до частини віртуальних плат"""
+
+    def __init__(self, index, ports, workdir):
+        self.index = index
+        self.ports = ports
+        self.captured = 0
+        self.accepted = 0
+        self.rejected = 0
+
+        env = dict(
+            os.environ,
+            SERIAL_PORTS=','.join(ports),
+            SPOOL_PATH=os.path.join(workdir, f'spool_{index}.sqlite3'),
+            PYTHONUNBUFFERED='1'
+        )
+        self.process = subprocess.Popen(
+            [sys.executable, BRIDGE_SCRIPT],
+            cwd=os.path.dirname(BRIDGE_SCRIPT),
+            env=env,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            errors='replace'
+        )
+        self.output_thread = threading.Thread(target=self.consume_output, daemon=True)
+        self.output_thread.start()
+
+    def consume_output(self):
+        for line in self.process.stdout:
+            if CAPTURED_PATTERN.match(line):
+                self.captured += 1
+                continue
+
+            match = UPLOADED_PATTERN.search(line)
+            if match:
+                self.accepted += int(match.group(1))
+                self.rejected += int(match.group(2))
+            elif '[ERROR]' in line or '[WARNING]' in line:
+                print(f'[bridge {self.index}] {line}', end='')
+
+    def stop(self, timeout):
+        """Ctrl+C для bridge: він дочитує чергу та відправляє spool"""
+        self.process.send_signal(signal.SIGINT)
+        try:
+            self.process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+        self.output_thread.join(timeout=5)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark arduino_bridge.py against virtual boards on ptys')
+    parser.add_argument('--boards', type=int, default=4, help='Number of virtual boards')
+    parser.add_argument('--bridges', type=int, default=1, help='Bridge processes (boards are split between them)')
+    parser.add_argument('--rate', type=float, default=1, help='Lines per second per board')
+    parser.add_argument('--duration', type=float, default=30, help='Seconds to emit data')
+    parser.add_argument('--warmup', type=float, default=5,
+                        help='Seconds for bridges to log in and open ports before counting starts')
+    parser.add_argument('--plant-ids', type=parse_plant_ids, default=[1],
+                        help='Plant ids assigned to boards round-robin, e.g. 1-20')
+    parser.add_argument('--noise', type=float, default=0.1, help='Share of DEBUG lines')
+    parser.add_argument('--garbage', type=float, default=0.0, help='Share of random-byte lines')
+    parser.add_argument('--disconnect-every', type=float, default=0,
+                        help='Unplug each board every N seconds (0 = never)')
+    parser.add_argument('--downtime', type=float, default=3, help='Seconds a board stays unplugged')
+    parser.add_argument('--drain-timeout', type=float, default=60,
+                        help='Seconds to wait for bridges to upload after boards stop')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='virtual_farm_')
+    boards = [
+        FakeBoard(
+            os.path.join(workdir, f'board{index}'),
+            args.plant_ids[index % len(args.plant_ids)],
+            args.rate,
+            args.noise,
+            args.garbage,
+            args.disconnect_every,
+            args.downtime
+        )
+        for index in range(args.boards)
+    ]
+
+    for board in boards:
+        board.start()
+    time.sleep(0.5)
+
+    bridges = [
+        BridgeProcess(index, [board.link_path for board in boards[index::args.bridges]], workdir)
+        for index in range(args.bridges)
+    ]
+
+    print(f'Farm: {args.boards} boards at {args.rate} lines/s, {args.bridges} bridge(s), workdir {workdir}')
+
+    # Ctrl+C під час warmup - у звіті всі рядки рахуються як після нього
+    warmup_lines = 0
+    try:
+        # connect_to_arduino чекає 3 с і очищає буфер - ці рядки втрачаються
+        # за задумом, тому рахуються окремо
+        time.sleep(args.warmup)
+        warmup_lines = sum(board.data_lines for board in boards)
+
+        time.sleep(args.duration)
+    except KeyboardInterrupt:
+        pass
+
+    for board in boards:
+        board.stop()
+    for board in boards:
+        board.join()
+    for bridge_process in bridges:
+        bridge_process.stop(args.drain_timeout)
+
+    emitted = sum(board.data_lines for board in boards)
+    dropped = sum(board.dropped_lines for board in boards)
+    captured = sum(bridge_process.captured for bridge_process in bridges)
+    accepted = sum(bridge_process.accepted for bridge_process in bridges)
+    rejected = sum(bridge_process.rejected for bridge_process in bridges)
+    disconnects = sum(board.disconnects for board in boards)
+
+    print('====================================')
+    measured = emitted - warmup_lines
+    print(f'DATA lines emitted:   {emitted} ({measured / args.duration:.1f}/s after warmup)')
+    print(f'  during warmup:      {warmup_lines}')
+    print(f'Dropped at pty:       {dropped}')
+    print(f'Captured by bridges:  {captured} ({captured / measured * 100 if measured else 0:.1f}% of post-warmup lines)')
+    print(f'Uploaded (accepted):  {accepted} ({accepted / captured * 100 if captured else 0:.1f}% of captured)')
+    print(f'Rejected by API:      {rejected}')
+    print(f'Board disconnects:    {disconnects}')
+    for bridge_process in bridges:
+        print(
+            f'  bridge {bridge_process.index}: {len(bridge_process.ports)} boards, '
+            f'captured {bridge_process.captured}, accepted {bridge_process.accepted}, '
+            f'exit code {bridge_process.process.returncode}'
+        )
+
+    shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
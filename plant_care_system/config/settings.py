@@ -67,6 +67,8 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / config('DATABASE_NAME', default='db.sqlite3'),
+        # Скільки секунд чекати блокування запису SQLite перед "database is locked"
+        'OPTIONS': {'timeout': config('DATABASE_TIMEOUT', default=20, cast=int)},
     }
 }
 
@@ -133,4 +135,54 @@ CORS_ALLOWED_ORIGINS = [
     "http://127.0.0.1:3000",
 ]
 
-BACKUP_DIR = BASE_DIR / 'backups'
\ No newline at end of file
+BACKUP_DIR = BASE_DIR / 'backups'
+
+# Sensors
+SENSOR_BATCH_MAX_SIZE = config('SENSOR_BATCH_MAX_SIZE', default=1000, cast=int)
+# Ліміт тіла запиту ingest після розпакування gzip (байти)
+SENSOR_MAX_DECOMPRESSED_SIZE = config('SENSOR_MAX_DECOMPRESSED_SIZE', default=5 * 1024 * 1024, cast=int)
+# Скільки секунд кешується авторизація пристрою (Premium статус, рослини)
+SENSOR_DEVICE_CACHE_TTL = config('SENSOR_DEVICE_CACHE_TTL', default=60, cast=int)
+# Наскільки час показника від пристрою може бути в майбутньому
+# (розбіжність годинників, секунди)
+SENSOR_MAX_CLOCK_SKEW = config('SENSOR_MAX_CLOCK_SKEW', default=300, cast=int)
+# Звичайний інтервал відправки Arduino (SEND_INTERVAL) та максимальна пауза
+# між heartbeat-показниками bridge з deadband (секунди)
+SENSOR_REPORT_INTERVAL = config('SENSOR_REPORT_INTERVAL', default=60, cast=int)
+SENSOR_MAX_SILENCE = config('SENSOR_MAX_SILENCE', default=900, cast=int)
+# Графік береться з найгрубших агрегатів (доба, година), які дають
+# щонайменше стільки точок за період; інакше - із сирих показників
+SENSOR_CHART_MIN_POINTS = config('SENSOR_CHART_MIN_POINTS', default=48, cast=int)
+# Зберігання (manage.py prune_sensor_data): сирі показники, погодинні та
+# добові агрегати - у днях, 0 - зберігати назавжди
+SENSOR_RETENTION_RAW_DAYS = config('SENSOR_RETENTION_RAW_DAYS', default=14, cast=int)
+SENSOR_RETENTION_HOURLY_DAYS = config('SENSOR_RETENTION_HOURLY_DAYS', default=365, cast=int)
+SENSOR_RETENTION_DAILY_DAYS = config('SENSOR_RETENTION_DAILY_DAYS', default=0, cast=int)
+# Наскільки старим (дні) може бути показник від пристрою (backfill).
+# Фактична межа - не більше SENSOR_RETENTION_RAW_DAYS: агрегат доби, сирі
+# показники якої вже обрізані, не можна перерахувати, тож старіші
+# показники відхиляються навіть з більшим значенням
+SENSOR_MAX_BACKFILL_DAYS = config(
+    'SENSOR_MAX_BACKFILL_DAYS',
+    default=SENSOR_RETENTION_RAW_DAYS or 365,
+    cast=int
+)
+# Місячні таблиці показників (apps/sensors/partitions.py): нові показники
+# пишуться в sensor_data_YYYY_MM, prune_sensor_data видаляє прострочений
+# місяць через DROP TABLE. Читання завжди охоплює і таблицю sensor_data.
+SENSOR_PARTITIONING = config('SENSOR_PARTITIONING', default=False, cast=bool)
+# Скільки фонових експортів (SensorExportJob) користувач може мати в роботі одночасно
+SENSOR_EXPORT_MAX_ACTIVE = config('SENSOR_EXPORT_MAX_ACTIVE', default=2, cast=int)
+# Експорт, що не завершився за стільки секунд (перезапуск процесу обірвав
+# потік), позначається як failed і не займає місце в SENSOR_EXPORT_MAX_ACTIVE
+# (при замовленні нового експорту або manage.py fail_stale_sensor_exports)
+SENSOR_EXPORT_TIMEOUT = config('SENSOR_EXPORT_TIMEOUT', default=3600, cast=int)
+# Файли експортів - поза MEDIA_ROOT, віддаються тільки через download з авторизацією
+SENSOR_EXPORT_DIR = config('SENSOR_EXPORT_DIR', default=str(BASE_DIR / 'sensor_exports'))
+# Group commit: показники ingest з одночасних запитів записуються одним
+# writer-потоком процесу в одній транзакції - кожні WAIT_MS мілісекунд
+# або MAX_ROWS рядків. Запит чекає COMMIT не довше TIMEOUT секунд.
+SENSOR_GROUP_COMMIT = config('SENSOR_GROUP_COMMIT', default=False, cast=bool)
+SENSOR_GROUP_COMMIT_WAIT_MS = config('SENSOR_GROUP_COMMIT_WAIT_MS', default=5, cast=int)
+SENSOR_GROUP_COMMIT_MAX_ROWS = config('SENSOR_GROUP_COMMIT_MAX_ROWS', default=2000, cast=int)
+SENSOR_GROUP_COMMIT_TIMEOUT = config('SENSOR_GROUP_COMMIT_TIMEOUT', default=30, cast=int)
\ No newline at end of file
@@ -7,7 +7,7 @@ from rest_framework_simplejwt.views import TokenRefreshView
 
 from apps.plants.views import UserPlantViewSet
 from apps.plant_types.views import PlantTypeViewSet
-from apps.sensors.views import SensorDataViewSet
+from apps.sensors.views import SensorDataViewSet, SensorDeviceViewSet, SensorExportJobViewSet
 from apps.care.views import CareLogViewSet
 from apps.administration.views import AdminUserViewSet, system_statistics, update_all_plant_statuses
 
@@ -36,6 +36,8 @@ router = DefaultRouter()
 router.register(r'plants', UserPlantViewSet, basename='plant')
 router.register(r'plant-types', PlantTypeViewSet, basename='plant-type')
 router.register(r'sensors', SensorDataViewSet, basename='sensor')
+router.register(r'sensor-devices', SensorDeviceViewSet, basename='sensor-device')
+router.register(r'sensor-exports', SensorExportJobViewSet, basename='sensor-export')
 router.register(r'care', CareLogViewSet, basename='care')
 router.register(r'admin/users', AdminUserViewSet, basename='admin-user')
 